@@ -1,16 +1,23 @@
 from pattern import Pattern
 from cal import Event
 
-from typing import Iterable
+from typing import Callable, Iterable
 from abc import ABC, abstractmethod
 
 
+CompiledAction = Callable[[Event], list[Event]]
+
+
 class Action(ABC):
     """ ABC for actions which are applied to events """
     @abstractmethod
     def resolve(self, event: Event) -> list[Event]:
         pass
 
+    def compile(self) -> CompiledAction:
+        """ returns a function that gives the same result as resolve """
+        return self.resolve
+
     def __str__(self, tabs: int = 0):
         return '\t' * tabs + 'Baseclass Action Object'
 
@@ -22,17 +29,27 @@ class ActionMultiple(Action):
 
     def resolve(self, event: Event):
         current_events = [event]
-        next_events = []
 
         for action in self.actions:
-            for event in current_events:
-                for next_event in action.resolve(event):
-                    next_events.append(next_event)
-
-            current_events = next_events
-            next_events = []
+            if len(current_events) == 1:
+                current_events = action.resolve(current_events[0])
+            else:
+                current_events = [next_event for event in current_events for next_event in action.resolve(event)]
 
         return current_events
+
+    def compile(self) -> CompiledAction:
+        compiled = [action.compile() for action in self.actions]
+
+        def resolve(event: Event) -> list[Event]:
+            current_events = [event]
+            for action in compiled:
+                if len(current_events) == 1:
+                    current_events = action(current_events[0])
+                else:
+                    current_events = [next_event for event in current_events for next_event in action(event)]
+            return current_events
+        return resolve
     
     def __str__(self, tabs: int = 0):
         name = '\t' * tabs + 'Action Multiple:\n'
@@ -48,6 +65,11 @@ class ActionRemoveField(Action):
         self.field = field
 
     def resolve(self, event: Event):
+        """ returns a copy of event without field, event itself is not changed """
+        if not event.has_field(self.field):
+            return [event]
+
+        event = event.copy()
         event.remove_field(self.field)
         return [event]
     
@@ -63,8 +85,13 @@ class ActionWriteField(Action):
         self.overwrite = overwrite
 
     def resolve(self, event: Event):
-        """ writes text to field as long as overwrite is True or event doesnt have field """
-        event.write_field(self.field, self.text, self.overwrite)
+        """ returns a copy of event with text written to field as long as overwrite is True or event doesnt have field
+        event itself is not changed """
+        if not self.overwrite and event.has_field(self.field):
+            return [event]
+
+        event = event.copy()
+        event.write_field(self.field, self.text)
         return [event]
     
     def __str__(self, tabs: int = 0):
@@ -91,7 +118,8 @@ class ActionAddEvent(Action):
         self.event_to_add = event
 
     def resolve(self, event: Event):
-        return [event, self.event_to_add]
+        """ returns event and a new copy of the event to add """
+        return [event, self.event_to_add.copy()]
     
     def __str__(self, tabs: int = 0):
         return '\t' * tabs + 'Action Add Event:\n' + self.event_to_add.__str__(tabs+1)
\ No newline at end of file
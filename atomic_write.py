@@ -0,0 +1,61 @@
+"""Module for writing files atomically.
+The data is written to a temporary file in the same directory which is then renamed over the target,
+so readers see either the old or the new file and never a half written one.
+"""
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator
+
+
+def _get_umask() -> int:
+    """ returns the umask of the process, it can only be read by setting it so it is set straight back """
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# read once, changing the umask for a moment while other threads create files could give them the wrong mode
+_UMASK = _get_umask()
+
+
+def _get_mode(path: str) -> int:
+    """ returns the permission bits the file at path should get, those of the file already at path
+    or the ones open would give a new file if there is none """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+@contextmanager
+def open_atomic(path: str, mode: str = 'w', encoding: str | None = 'utf-8', newline: str | None = None) -> Iterator[IO]:
+    """Opens a temporary file for writing that replaces the file at path when the with block ends,
+    so a file can be written piece by piece and still be replaced in one atomic step.
+    mode should be 'w' or 'wb', encoding and newline work as in open.
+    If the with block raises, the old file at path is left untouched.
+    The new file gets the permissions of the old one, or those of a file made by open if there was none.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        if 'b' in mode:
+            file = os.fdopen(file_descriptor, mode)
+        else:
+            file = os.fdopen(file_descriptor, mode, encoding=encoding, newline=newline)
+        with file:
+            yield file
+        os.chmod(temp_path, _get_mode(path))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def write_atomic(path: str, data: str | bytes, encoding: str = 'utf-8') -> None:
+    """Writes data to the file at path in one atomic step, str data is encoded with encoding.
+    If writing fails, the old file at path is left untouched.
+    """
+    with open_atomic(path, 'wb' if isinstance(data, bytes) else 'w', encoding) as file:
+        file.write(data)
@@ -0,0 +1,289 @@
+"""Benchmarks for every stage of a build on generated feeds.
+generate_feed makes a seeded ics feed shaped like the TimeEdit exports (see TimeEdit_U1.b_2024-10-10_12_41.ics),
+with escaped commas in SUMMARY and DESCRIPTIONs long enough to be folded,
+and generate_config makes an input json config shaped like input_24HT2.json with any number of filters.
+run_benchmarks times parsing, building, rebuilding, rendering, exporting and snapshotting the feed
+and reports events per second and peak memory of every stage, which can be saved as a baseline and compared later.
+Every run also times a fixed pure python reference workload, and stages are compared by their time relative to it,
+so a baseline saved on one machine can be compared on another. Baselines are machine local and not committed.
+
+    python benchmark.py --sizes 1000 10000 100000 --filters 50
+    python benchmark.py --save-baseline benchmark_baseline.json
+    python benchmark.py --compare benchmark_baseline.json
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator
+
+import cal
+import ics
+import snapshot
+from cal_raw import UnbuiltCal
+from input_json import InputJSON
+from output_term import OutputTerm
+from src_cal import SrcCalCalendar
+
+
+COURSES = ('TDDE23', 'TDDE24', 'TDDE25', 'TATA65', '9AMA57', 'TAMS42', 'TDDD27', 'TSEA28', 'TFYA86', 'TANA21')
+KINDS = (('FÖ', 'Föreläsning'), ('LE', 'Lektion'), ('LA', 'Laboration'), ('SE', 'Seminarium'), ('PROGR', 'Programmering'))
+GROUPS = ('D1\\, U1', 'U1.b', 'D1\\, U1\\, Grupp S1', 'U1.b\\, Grupp 6', 'Storgrupp 4', 'U1.b\\, Grupp 63')
+ROOMS = ('A1', 'SU02', 'SU03', 'SU04', 'SU10', 'U15', 'VAL1', 'TEMCAS', 'Ada Lovelace', 'KEY1')
+TEACHERS = ('Carl Johan Casselgren', 'Morgan Nordberg', 'Alice Lindholm', 'Daniel Varro', 'Linnéa Lindblom', 'Åsa Öberg')
+SLOTS = ((8, 15), (10, 15), (13, 15), (15, 15), (17, 15))
+FIRST_DAY = datetime(2024, 9, 23)
+DEFAULT_SIZES = (1000, 10000)
+DEFAULT_FILTERS = 11
+# stages faster than this are mostly noise and are left out of compare
+MIN_COMPARE_SECONDS = 0.01
+
+
+def iter_feed(event_count: int, seed: int = 0) -> Iterator[str]:
+    """Yields a seeded TimeEdit style ics feed with event_count events, one folded CRLF line at a time."""
+    rng = random.Random(seed)
+    events_per_day = max(len(SLOTS), event_count // 365)
+
+    yield ics.fold_line('BEGIN:VCALENDAR')
+    for line in (
+            'VERSION:2.0',
+            'METHOD:PUBLISH',
+            'X-WR-CALNAME:TimeEdit-U1.b\\, CIV ING UTB MJUKVARUTEKNIK-20241001',
+            'X-PUBLISHED-TTL:PT20M',
+            'CALSCALE:GREGORIAN',
+            'PRODID:-//TimeEdit\\\\\\, //TimeEdit//EN',
+        ):
+        yield ics.fold_line(line)
+
+    stamp = '20241010T124125Z'
+
+    for i in range(event_count):
+        day = FIRST_DAY + timedelta(days=i // events_per_day)
+        hour, minute = rng.choice(SLOTS)
+        start = day + timedelta(hours=hour - 2, minutes=minute)
+        end = start + timedelta(minutes=105)
+        course = rng.choice(COURSES)
+        kind, kind_name = rng.choice(KINDS)
+        event_id = 3_000_000 + i
+        teachers = ', '.join(rng.sample(TEACHERS, rng.randint(1, 3)))
+
+        yield ics.fold_line('BEGIN:VEVENT')
+        yield ics.fold_line('DTSTART:' + start.strftime('%Y%m%dT%H%M%SZ'))
+        yield ics.fold_line('DTEND:' + end.strftime('%Y%m%dT%H%M%SZ'))
+        yield ics.fold_line(f'UID:{event_id}--425816690-0@timeedit.com')
+        yield ics.fold_line('DTSTAMP:' + stamp)
+        yield ics.fold_line('LAST-MODIFIED:' + stamp)
+        yield ics.fold_line(f'SUMMARY:{course}\\, Undervisningstyp: {kind}\\, {rng.choice(GROUPS)}')
+        yield ics.fold_line(f'LOCATION:Lokal: {rng.choice(ROOMS)}')
+        yield ics.fold_line(f'DESCRIPTION:Lärare: {teachers.replace(",", chr(92) + ",")} \\n{kind_name}\\nID {event_id}')
+        yield ics.fold_line('END:VEVENT')
+
+    yield ics.fold_line('END:VCALENDAR')
+
+
+def generate_feed(event_count: int, seed: int = 0) -> bytes:
+    """Returns the feed of iter_feed encoded as utf-8."""
+    return ''.join(iter_feed(event_count, seed)).encode('utf-8')
+
+
+def generate_config(filter_count: int, seed: int = 0, url: str = 'https://cloud.timeedit.net/liu/web/schema/example.ics') -> dict:
+    """Returns a seeded input json config with filter_count filters on the courses of the generated feeds."""
+    rng = random.Random(seed)
+    filters = []
+    for _ in range(filter_count):
+        summary = f'{rng.choice(COURSES)}\\, Undervisningstyp: {rng.choice(KINDS)[0]}'
+        match rng.randrange(3):
+            case 0:
+                filters.append({
+                    'pattern': ['and', 'has_text', summary, 'SUMMARY', '/has_text',
+                                'not', 'has_text', rng.choice(('Grupp S1', 'Grupp 63', 'Storgrupp 4')), 'SUMMARY', '/has_text', '/not',
+                                '/and'],
+                    'action': ['remove_event'],
+                })
+            case 1:
+                filters.append({
+                    'pattern': ['has_text', summary, 'SUMMARY', '/has_text'],
+                    'action': ['multiple',
+                               'write_field', 'SUMMARY', summary.split('\\')[0] + ' ' + rng.choice(KINDS)[1],
+                               'write_field', 'DESCRIPTION', 'Featuring ' + rng.choice(TEACHERS).split()[0].upper() + '!',
+                               '/multiple'],
+                })
+            case 2:
+                filters.append({
+                    'pattern': ['or', 'has_text', summary, 'SUMMARY', '/has_text',
+                                'has_text', 'Lokal: ' + rng.choice(ROOMS), 'LOCATION', '/has_text', '/or'],
+                    'action': ['remove_field', 'LOCATION'],
+                })
+
+    return {'src_cals': ['url', url, '/url'], 'filters': filters}
+
+
+def _measure(stage: Callable[[], object], measure_memory: bool, repeat: int) -> tuple[float, float | None, object]:
+    """ runs stage repeat times, returns the fastest time in seconds, its peak memory in MB if measure_memory and what it returned
+    the time is taken without tracemalloc, which slows python down, so with measure_memory the stage is run once more """
+    seconds = float('inf')
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        start = time.perf_counter()
+        result = stage()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    peak = None
+    if measure_memory:
+        del result
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = stage()
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return seconds, peak, result
+
+
+def run_benchmark(
+        event_count: int,
+        filter_count: int = DEFAULT_FILTERS,
+        seed: int = 0,
+        measure_memory: bool = True,
+        repeat: int = 3,
+    ) -> dict[str, dict[str, float]]:
+    """Returns {stage: {'seconds', 'events_per_second', 'peak_mb'}} for a generated feed of event_count events.
+    seconds is the fastest of repeat runs and peak_mb is left out if not measure_memory.
+    """
+    feed = generate_feed(event_count, seed)
+    filters = InputJSON._get_filters(generate_config(filter_count, seed))
+    chunk_size = 64 * 1024
+    results = {}
+
+    def record(name: str, stage: Callable[[], object]) -> object:
+        seconds, peak, result = _measure(stage, measure_memory, repeat)
+        results[name] = {'seconds': seconds, 'events_per_second': event_count / seconds if seconds > 0 else float('inf')}
+        if peak is not None:
+            results[name]['peak_mb'] = peak
+        return result
+
+    calendar = record('parse', lambda: ics.read_calendar(feed[i:i + chunk_size] for i in range(0, len(feed), chunk_size)))
+    unbuilt = UnbuiltCal([SrcCalCalendar(calendar)], filters)
+    built = record('build', lambda: unbuilt.build(incremental=False))
+    unbuilt.build()
+    record('rebuild', lambda: unbuilt.build())
+
+    with tempfile.TemporaryDirectory() as directory:
+        first_day = calendar.events[0].get_start_time() if calendar.events else cal.Time(2024, 9, 23, 0, 0)
+        last_day = max((event.get_start_time() for event in calendar.events), default=first_day)
+        record('render', lambda: OutputTerm(first_day, last_day, built, directory).write_to_files())
+
+        with open(os.devnull, 'wb') as devnull:
+            record('export', lambda: ics.write_ics(devnull, built.events))
+
+        path = os.path.join(directory, 'snapshot.bin')
+        record('snapshot_save', lambda: snapshot.save_snapshot(path, built, '0' * 64))
+        record('snapshot_load', lambda: snapshot.load_snapshot_file(path))
+
+    return results
+
+
+def _reference_workload() -> object:
+    """ a fixed workload that doesnt use any module of the repo, its time is what the stages are compared relative to """
+    rng = random.Random(0)
+    rows = [{'id': i, 'name': f'{rng.choice(COURSES)} {rng.choice(ROOMS)}', 'minutes': rng.randrange(10 ** 6)} for i in range(20000)]
+    rows = json.loads(json.dumps(rows))
+    return sorted(rows, key=lambda row: (row['name'], row['minutes']))
+
+
+def run_benchmarks(
+        sizes: Iterable[int] = DEFAULT_SIZES,
+        filter_count: int = DEFAULT_FILTERS,
+        seed: int = 0,
+        measure_memory: bool = True,
+        repeat: int = 3,
+    ) -> dict:
+    """Returns the results of run_benchmark for every size, keyed by str(size) so they can be stored as json,
+    and the seconds of the reference workload measured in the same run."""
+    return {
+        'filters': filter_count,
+        'seed': seed,
+        'reference_seconds': _measure(_reference_workload, False, max(repeat, 3))[0],
+        'sizes': {str(size): run_benchmark(size, filter_count, seed, measure_memory, repeat) for size in sizes},
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.25) -> list[str]:
+    """Returns a message for every stage that is more than tolerance slower, or uses more than tolerance more memory,
+    than in baseline. Times are compared relative to the reference workload of each run, so machines of different speed
+    can be compared. Sizes and stages missing from either, and stages faster than MIN_COMPARE_SECONDS in either, are skipped.
+    """
+    regressions = []
+    for size, stages in results['sizes'].items():
+        for stage, result in stages.items():
+            try:
+                base = baseline['sizes'][size][stage]
+            except KeyError:
+                continue
+            if min(result['seconds'], base['seconds']) >= MIN_COMPARE_SECONDS:
+                relative = result['seconds'] / results['reference_seconds']
+                base_relative = base['seconds'] / baseline['reference_seconds']
+                if relative > base_relative * (1 + tolerance):
+                    regressions.append(
+                        f'{stage} ({size} events): {relative:.2f}x the reference workload, baseline {base_relative:.2f}x'
+                    )
+            if 'peak_mb' in result and 'peak_mb' in base and result['peak_mb'] > base['peak_mb'] * (1 + tolerance) + 1:
+                regressions.append(f'{stage} ({size} events): {result["peak_mb"]:.1f} MB, baseline {base["peak_mb"]:.1f} MB')
+    return regressions
+
+
+def format_results(results: dict) -> str:
+    lines = [f'{"events":>9} {"stage":<14} {"seconds":>9} {"events/s":>12} {"peak MB":>9}']
+    for size, stages in results['sizes'].items():
+        for stage, result in stages.items():
+            peak = f'{result["peak_mb"]:9.1f}' if 'peak_mb' in result else f'{"-":>9}'
+            lines.append(f'{size:>9} {stage:<14} {result["seconds"]:9.3f} {result["events_per_second"]:12.0f} {peak}')
+    lines.append(f'reference workload {results["reference_seconds"]:.3f} seconds')
+    return '\n'.join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks every stage of a build on generated TimeEdit style feeds.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='events per feed, e.g. 1000 1000000')
+    parser.add_argument('--filters', type=int, default=DEFAULT_FILTERS, help='number of generated filters')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='run every stage this many times and keep the fastest')
+    parser.add_argument('--no-memory', action='store_true', help='only measure time, skips the extra run under tracemalloc')
+    parser.add_argument('--save-baseline', metavar='PATH', help='write the results as json to PATH')
+    parser.add_argument('--compare', metavar='PATH', help='compare the results with the baseline at PATH')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='how much slower (relative to the reference workload) or larger than the baseline is allowed')
+    parser.add_argument('--write-feed', metavar='PATH', help='only write the feed of the first size to PATH and exit')
+    args = parser.parse_args(argv)
+
+    if args.write_feed is not None:
+        with open(args.write_feed, 'w', encoding='utf-8', newline='') as file:
+            file.writelines(iter_feed(args.sizes[0], args.seed))
+        return 0
+
+    results = run_benchmarks(args.sizes, args.filters, args.seed, not args.no_memory, args.repeat)
+    print(format_results(results))
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=4)
+
+    if args.compare is not None:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print('regression:', regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
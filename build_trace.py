@@ -0,0 +1,228 @@
+"""Module for tracing what the filters of a build do to selected events, to explain why an event changed or is gone.
+A BuildTracer picks events by UID, by a predicate or by a sample rate and records, for every filter they pass through,
+whether its pattern matched and which fields its action changed.
+Only picked events are traced, every other event runs through the compiled filters as usual,
+and the log keeps at most max_traces traces, so tracing can stay on at a low sample rate.
+"""
+import json
+import zlib
+from collections import deque
+from typing import Callable, IO, Iterable
+
+from cal import Event
+from filter import CompiledFilter, Filter
+
+
+# a change is (field, text before, text after), None if the field was missing before or is removed after
+Change = tuple[str, str | None, str | None]
+
+
+class TraceStep:
+    """Class for what one filter did to one traced event."""
+    __slots__ = ('filter_index', 'matched', 'outcome', 'changes')
+
+    KEPT = 'kept'
+    CHANGED = 'changed'
+    REMOVED = 'removed'
+    SPLIT = 'split'
+
+    def __init__(self, filter_index: int, matched: bool, outcome: str, changes: tuple[Change, ...] = ()):
+        """ outcome is KEPT if the event came out unchanged, CHANGED if its fields changed,
+        REMOVED if no event came out and SPLIT if more than one did (e.g. ActionAddEvent)
+        changes are the changed fields of the first event out, compared to the event in """
+        self.filter_index = filter_index
+        self.matched = matched
+        self.outcome = outcome
+        self.changes = changes
+
+    def to_dict(self) -> dict:
+        return {'filter': self.filter_index, 'matched': self.matched, 'outcome': self.outcome, 'changes': [list(change) for change in self.changes]}
+
+
+class EventTrace:
+    """Class for the trace of one source event in one build."""
+    __slots__ = ('build', 'source', 'uid', 'summary', 'reused', 'steps', 'events_out')
+
+    def __init__(self, build: int, source: str, uid: str | None, summary: str | None, reused: bool = False):
+        """ reused is True if the output of the event was reused from the last build, it then has no steps """
+        self.build = build
+        self.source = source
+        self.uid = uid
+        self.summary = summary
+        self.reused = reused
+        self.steps: list[TraceStep] = []
+        self.events_out = 0
+
+    def is_removed(self) -> bool:
+        return not self.reused and self.events_out == 0
+
+    def to_dict(self) -> dict:
+        return {
+            'build': self.build,
+            'source': self.source,
+            'uid': self.uid,
+            'summary': self.summary,
+            'reused': self.reused,
+            'events_out': self.events_out,
+            'steps': [step.to_dict() for step in self.steps],
+        }
+
+    def __str__(self, tabs: int = 0):
+        name = '\t' * tabs + f'Event {self.uid} ({self.summary}) from {self.source}, build {self.build}:'
+        if self.reused:
+            return name + '\n' + '\t' * (tabs+1) + 'reused from the last build'
+        for step in self.steps:
+            if not step.matched:
+                continue
+            name += '\n' + '\t' * (tabs+1) + f'filter {step.filter_index}: {step.outcome}'
+            for field, before, after in step.changes:
+                name += '\n' + '\t' * (tabs+2) + f'{field}: {before!r} -> {after!r}'
+        name += '\n' + '\t' * (tabs+1) + f'{self.events_out} events out'
+        return name
+
+
+def _get_changes(before: Event, after: Event) -> tuple[Change, ...]:
+    """ returns the fields that differ between before and after """
+    if after is before:
+        return ()
+    before_content = before.content
+    after_content = after.content
+    changes = []
+    for field, text in after_content.items():
+        old_text = before_content.get(field)
+        if old_text != text:
+            changes.append((field, old_text, text))
+    for field, text in before_content.items():
+        if field not in after_content:
+            changes.append((field, text, None))
+    return tuple(changes)
+
+
+class BuildTracer:
+    """Class for picking events to trace and keeping the log of their traces, give it to UnbuiltCal.build.
+    Sampling is decided by a hash of the UID, so a sampled event is traced in every build and its history can be followed.
+    """
+    def __init__(
+            self,
+            uids: Iterable[str] = (),
+            predicate: Callable[[Event], bool] | None = None,
+            sample_rate: float = 0.0,
+            max_traces: int = 10_000,
+        ):
+        """ events are traced if their UID is in uids, predicate returns True for them
+        or the hash of their UID falls within sample_rate (0 traces nothing by sampling, 1 traces every event)
+        the log keeps the last max_traces traces """
+        self.uids = frozenset(uids)
+        self.predicate = predicate
+        self.sample_rate = sample_rate
+        self._sample_limit = int(sample_rate * 2 ** 32)
+        self.traces: deque[EventTrace] = deque(maxlen=max_traces)
+        self.build_count = 0
+
+    def start_build(self) -> None:
+        """ called by UnbuiltCal.iter_events before a build """
+        self.build_count += 1
+
+    def should_trace(self, event: Event) -> bool:
+        """Returns True if event is picked for tracing."""
+        uid = event.get_field_text('UID') if event.has_field('UID') else None
+        if uid is not None:
+            if uid in self.uids:
+                return True
+            if self._sample_limit and zlib.crc32(uid.encode('utf-8')) < self._sample_limit:
+                return True
+        return self.predicate is not None and self.predicate(event)
+
+    def _start_trace(self, event: Event, source: str, reused: bool) -> EventTrace:
+        trace = EventTrace(
+            self.build_count,
+            source,
+            event.get_field_text('UID') if event.has_field('UID') else None,
+            event.get_field_text('SUMMARY') if event.has_field('SUMMARY') else None,
+            reused,
+        )
+        self.traces.append(trace)
+        return trace
+
+    def record_reused(self, event: Event, source: str) -> None:
+        """ records that the output of event was reused from the last build """
+        self._start_trace(event, source, True)
+
+    def trace(
+            self,
+            filters: list[Filter],
+            event: Event,
+            source: str,
+            checks: list[CompiledFilter] | None = None,
+        ) -> list[Event]:
+        """ runs event through filters like cal_raw.run_filters, records every step and returns the events that come out
+        events added by a filter are followed through the rest of the filters too
+        checks are the compiled filters to run the event through, one for every filter, so measured filters
+        (see filter.compile_filters) count traced events too, if None every filter is run with Filter.check """
+        trace = self._start_trace(event, source, False)
+        current_events = [event]
+        if checks is None:
+            checks = [filtr.check for filtr in filters]
+
+        for filter_index, (filtr, check) in enumerate(zip(filters, checks)):
+            next_events = []
+            for current_event in current_events:
+                matched = filtr.pattern.resolve(current_event)
+                out = check(current_event)
+                if not matched:
+                    trace.steps.append(TraceStep(filter_index, False, TraceStep.KEPT))
+                    next_events.extend(out)
+                    continue
+
+                if not out:
+                    trace.steps.append(TraceStep(filter_index, True, TraceStep.REMOVED))
+                else:
+                    changes = _get_changes(current_event, out[0])
+                    outcome = TraceStep.SPLIT if len(out) > 1 else TraceStep.CHANGED if changes else TraceStep.KEPT
+                    trace.steps.append(TraceStep(filter_index, True, outcome, changes))
+                next_events.extend(out)
+            current_events = next_events
+
+        trace.events_out = len(current_events)
+        return current_events
+
+    def query(
+            self,
+            uid: str | None = None,
+            filter_index: int | None = None,
+            matched: bool | None = None,
+            removed: bool | None = None,
+            build: int | None = None,
+        ) -> list[EventTrace]:
+        """Returns the traces in the log that fit every argument that isnt None, oldest first.
+        filter_index picks traces that reached that filter, together with matched only those where it matched or didnt.
+        removed picks traces of events that were (or werent) removed by the build.
+        """
+        found = []
+        for trace in self.traces:
+            if uid is not None and trace.uid != uid:
+                continue
+            if build is not None and trace.build != build:
+                continue
+            if removed is not None and trace.is_removed() != removed:
+                continue
+            if filter_index is not None and not any(
+                step.filter_index == filter_index and (matched is None or step.matched == matched) for step in trace.steps
+            ):
+                continue
+            if filter_index is None and matched is not None and any(step.matched for step in trace.steps) != matched:
+                continue
+            found.append(trace)
+        return found
+
+    def explain(self, uid: str) -> str:
+        """Returns a readable history of the event with uid over every build in the log."""
+        traces = self.query(uid=uid)
+        if not traces:
+            return f'Event {uid} has not been traced'
+        return '\n'.join(str(trace) for trace in traces)
+
+    def write_jsonl(self, stream: IO[str]) -> None:
+        """Writes the log to stream as one json object per line."""
+        for trace in self.traces:
+            stream.write(json.dumps(trace.to_dict(), ensure_ascii=False) + '\n')
@@ -1,43 +1,143 @@
 """Module with three main classes:
 Time class for representing time.
-Event class for representing a calendar event.
+Event class for representing a calendar event, with its fields stored compactly in EventFields.
 Calendar class for representing a calendar.
+Also IntervalIndex, used by Calendar for time range queries, and EventList, the list of events of a Calendar.
 """
-from typing import Iterable
-from functools import total_ordering
+from typing import Iterable, Mapping
+from types import MappingProxyType
+from datetime import date, timedelta
+from bisect import bisect_left
+from operator import attrgetter
+from collections import OrderedDict
+import sys
 
 
-@total_ordering
 class Time:
-    """Class for representing time."""
+    """Class for representing time.
+    Time is stored as a single int, minutes since 0001-01-01 00:00, which makes comparisons and hashing cheap.
+    """
+    __slots__ = ('_minutes',)
+
+    MINUTES_PER_DAY = 24 * 60
+
     def __init__(self, year: int, month: int, day: int, hour: int, minute: int):
-        self.year = year
-        self.month = month
-        self.day = day
-        self.hour = hour
-        self.minute = minute
+        """raises ValueError if the arguments do not make up a valid date and time."""
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(f'invalid time of day {hour}:{minute}')
+        self._minutes = date(year, month, day).toordinal() * self.MINUTES_PER_DAY + hour * 60 + minute
+
+    @classmethod
+    def from_minutes(cls, minutes: int) -> 'Time':
+        """Returns a Time object given minutes since 0001-01-01 00:00, the inverse of as_minutes."""
+        time = cls.__new__(cls)
+        time._minutes = minutes
+        return time
+
+    @classmethod
+    def from_ordinal(cls, ordinal: int, hour: int = 0, minute: int = 0) -> 'Time':
+        """Returns a Time object given a proleptic Gregorian day ordinal (as in datetime.date.toordinal) and time of day."""
+        return cls.from_minutes(ordinal * cls.MINUTES_PER_DAY + hour * 60 + minute)
+
+    def as_minutes(self) -> int:
+        """Returns time as minutes since 0001-01-01 00:00."""
+        return self._minutes
+
+    def ordinal(self) -> int:
+        """Returns the proleptic Gregorian day ordinal of time, same as datetime.date.toordinal."""
+        return self._minutes // self.MINUTES_PER_DAY
+
+    def weekday(self) -> int:
+        """Returns the day of the week where monday is 0 and sunday is 6."""
+        return (self.ordinal() + 6) % 7
+
+    def _date(self) -> date:
+        return date.fromordinal(self.ordinal())
+
+    @property
+    def year(self) -> int:
+        return self._date().year
+
+    @property
+    def month(self) -> int:
+        return self._date().month
+
+    @property
+    def day(self) -> int:
+        return self._date().day
+
+    @property
+    def hour(self) -> int:
+        return self._minutes // 60 % 24
+
+    @property
+    def minute(self) -> int:
+        return self._minutes % 60
 
     def as_tuple(self) -> tuple[int, int, int, int, int]:
         """Return time as a tuple: (year, month, day, hour, minute)."""
-        return (self.year, self.month, self.day, self.hour, self.minute)
+        day = self._date()
+        return (day.year, day.month, day.day, self.hour, self.minute)
+
+    @staticmethod
+    def _check_type(other) -> None:
+        """raises ValueError if other is not of type Time."""
+        if not isinstance(other, Time):
+            raise ValueError(f'can only compare arguments of type Time, not Time and {type(other)}')
 
     def __eq__(self, other: 'Time') -> bool:
         """Check if two Times are equal.
         If other is not of type Time, raise ValueError.
         """
-        if isinstance(other, Time):
-            return self.as_tuple() == other.as_tuple()
-        else:
-            raise ValueError(f'can only compare arguments of type Time, not Time and {type(other)}')
+        Time._check_type(other)
+        return self._minutes == other._minutes
 
     def __lt__(self, other: 'Time') -> bool:
         """Check if self comes before other.
         If other is not of type time, raise ValueError.
         """
+        Time._check_type(other)
+        return self._minutes < other._minutes
+
+    def __le__(self, other: 'Time') -> bool:
+        Time._check_type(other)
+        return self._minutes <= other._minutes
+
+    def __gt__(self, other: 'Time') -> bool:
+        Time._check_type(other)
+        return self._minutes > other._minutes
+
+    def __ge__(self, other: 'Time') -> bool:
+        Time._check_type(other)
+        return self._minutes >= other._minutes
+
+    def __hash__(self) -> int:
+        return hash(self._minutes)
+
+    @staticmethod
+    def _whole_minutes(duration: timedelta) -> int:
+        """ returns duration in whole minutes truncated towards zero, so -30 seconds is 0 minutes like +30 seconds """
+        microseconds = (duration.days * 86400 + duration.seconds) * 1_000_000 + duration.microseconds
+        minutes = abs(microseconds) // 60_000_000
+        return minutes if microseconds >= 0 else -minutes
+
+    def __add__(self, duration: timedelta) -> 'Time':
+        """Returns the time duration after self, seconds are truncated to whole minutes (towards zero)."""
+        if isinstance(duration, timedelta):
+            return Time.from_minutes(self._minutes + self._whole_minutes(duration))
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other: 'Time | timedelta') -> 'Time | timedelta':
+        """Time - Time returns the duration between them as a timedelta.
+        Time - timedelta returns the time duration before self.
+        """
         if isinstance(other, Time):
-            return self.as_tuple() < other.as_tuple()
-        else:
-            raise ValueError(f'can only compare arguments of type Time, not Time and {type(other)}')
+            return timedelta(minutes=self._minutes - other._minutes)
+        if isinstance(other, timedelta):
+            return Time.from_minutes(self._minutes - self._whole_minutes(other))
+        return NotImplemented
 
     @staticmethod
     def str2time(time_str: str) -> 'Time':
@@ -53,72 +153,271 @@ class Time:
             minute = int(time_str[11:13])
             int(time_str[14:15])
             assert time_str[15] == 'Z'
+            return Time(year, month, day, hour, minute)
         except:
             raise ValueError('time_str could not be interpreted, should be in format yyyyMMddThhmmssZ where "T" and "Z" are string Literals')
 
-        return Time(year, month, day, hour, minute)
-
     def as_str(self) -> str:
         """returns time as a stirng on format yyyyMMddThhmmssZ where 'T' and 'Z' are string literals."""
-        return f'{self.year:04}{self.month:02}{self.day:02}T{self.hour:02}{self.minute:02}00Z'
+        year, month, day, hour, minute = self.as_tuple()
+        return f'{year:04}{month:02}{day:02}T{hour:02}{minute:02}00Z'
 
     def __str__(self, tabs: int=0) -> str:
-        return '\t' * tabs + f'Time: {self.year:04}/{self.month:02}/{self.day:02} {self.hour:02}:{self.minute:02}'
+        year, month, day, hour, minute = self.as_tuple()
+        return '\t' * tabs + f'Time: {year:04}/{month:02}/{day:02} {hour:02}:{minute:02}'
 
 
-class Event:
-    """Class for Calendar Events."""
+class EventFields:
+    """Class for the compact, never changed fields of an event, shared by every copy of the event.
+    The text of the common iCalendar properties is kept in slots and any other field in an overflow dict,
+    the order of the fields is kept as one tuple that is shared by all events with the same fields in the same order.
+    Field names and the texts of the few fields with only a handful of different values (like SUMMARY and LOCATION)
+    are interned, so events with the same summary or room share one str. The interned texts are kept in a bounded
+    least recently used table, times and UIDs are almost all different so they are never interned.
+    """
+    KNOWN_FIELDS = (
+        'DTSTART', 'DTEND', 'UID', 'DTSTAMP', 'LAST-MODIFIED', 'SUMMARY',
+        'LOCATION', 'DESCRIPTION', 'RECURRENCE-ID', 'STATUS', 'CATEGORIES',
+    )
+    INTERNED_FIELDS = frozenset(('SUMMARY', 'LOCATION', 'STATUS', 'CATEGORIES'))
+    MAX_INTERNED = 10_000
+    MAX_LAYOUTS = 1_000
+
+    _SLOTS = {field: '_' + field.lower().replace('-', '_') for field in KNOWN_FIELDS}
+    __slots__ = ('_order', '_extra', *_SLOTS.values())
+
+    _interned: OrderedDict[str, str] = OrderedDict()
+    # the layout of every field order seen: the shared order tuple, (field, slot or None, interned) for every field
+    # and the slots that arent in the order
+    _layouts: dict[tuple[str, ...], tuple[tuple[str, ...], tuple[tuple[str, str | None, bool], ...], tuple[str, ...]]] = {}
+
+    @classmethod
+    def _get_layout(cls, order: tuple[str, ...]):
+        try:
+            return cls._layouts[order]
+        except KeyError:
+            if len(cls._layouts) >= cls.MAX_LAYOUTS:
+                cls._layouts.pop(next(iter(cls._layouts)), None)
+            order = tuple(sys.intern(field) for field in order)
+            fields = tuple((field, cls._SLOTS.get(field), field in cls.INTERNED_FIELDS) for field in order)
+            missing = tuple(slot for field, slot in cls._SLOTS.items() if field not in order)
+            layout = cls._layouts[order] = (order, fields, missing)
+            return layout
+
     def __init__(self, content: dict[str, str]):
-        """Content keys should be fields and content values is the text of that field."""
-        self.content = content
+        """Content keys should be fields and content values is the text of that field, content is not kept."""
+        order, fields, missing = self._get_layout(tuple(content))
+        self._order = order
+        for slot in missing:
+            setattr(self, slot, None)
+
+        interned = self._interned
+        extra = None
+        for (field, slot, intern), text in zip(fields, content.values()):
+            if intern:
+                # same as self._intern, inlined for the common case of a text that is already interned
+                shared = interned.get(text)
+                if shared is None:
+                    text = self._intern(text)
+                else:
+                    try:
+                        interned.move_to_end(text)
+                    except KeyError:
+                        pass
+                    text = shared
+            if slot is not None:
+                setattr(self, slot, text)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[field] = text
+        self._extra = extra
+
+    @classmethod
+    def _intern(cls, text: str) -> str:
+        """ returns the interned str equal to text, the least recently used text is dropped once MAX_INTERNED are kept
+        events are parsed in several threads at once, a text dropped by another thread is simply interned again """
+        interned = cls._interned
+        shared = interned.get(text)
+        if shared is None:
+            interned[text] = text
+            try:
+                while len(interned) > cls.MAX_INTERNED:
+                    interned.popitem(last=False)
+            except KeyError:
+                pass
+            return text
+        try:
+            interned.move_to_end(text)
+        except KeyError:
+            pass
+        return shared
+
+    def get(self, field: str) -> str | None:
+        """Returns the text of field, None if there is no such field."""
+        getter = _FIELD_GETTERS.get(field)
+        if getter is not None:
+            return getter(self)
+        extra = self._extra
+        return extra.get(field) if extra is not None else None
+
+    def fields(self) -> tuple[str, ...]:
+        """Returns all fields in order."""
+        return self._order
+
+    def to_dict(self) -> dict[str, str]:
+        """Returns a new dict with all fields and their text in order."""
+        get = self.get
+        return {field: get(field) for field in self._order}
+
+    def __contains__(self, field: str) -> bool:
+        return self.get(field) is not None
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, content: dict[str, str]) -> None:
+        self.__init__(content)
+
+
+_FIELD_GETTERS = {field: attrgetter(slot) for field, slot in EventFields._SLOTS.items()}
+
+
+class Event:
+    """Class for Calendar Events.
+    Events are copy-on-write: the fields given to the constructor are stored once as EventFields that are never changed
+    and shared by every copy, and every change made through write_field/remove_field is kept in a small per-event delta
+    on top of them, so copy is cheap.
+    """
+    __slots__ = ('_base', '_delta', '_times')
+
+    def __init__(self, content: dict[str, str] | EventFields):
+        """Content keys should be fields and content values is the text of that field.
+        The content is copied into EventFields, which can also be given directly to share them with other events.
+        """
+        self._base = content if isinstance(content, EventFields) else EventFields(content)
+        # both are None until the first change and the first parsed time, most events never need them
+        self._delta: dict[str, str | None] | None = None
+        self._times: dict[str, Time | str] | None = None
+
+    @classmethod
+    def with_times(cls, content: dict[str, str] | EventFields, times: dict[str, Time]) -> 'Event':
+        """Returns a new Event whose fields in times are already parsed, used for events whose times were stored with them.
+        times must match the text of their fields, they are not checked.
+        """
+        event = cls(content)
+        if times:
+            event._times = dict(times)
+        return event
+
+    @property
+    def content(self) -> Mapping[str, str]:
+        """Returns a read only view of all fields of the event and their text, made when asked for,
+        writing to it raises TypeError, use write_field/remove_field to change the event and dict(content) for a copy."""
+        content = self._base.to_dict()
+        if self._delta:
+            for field, text in self._delta.items():
+                if text is None:
+                    del content[field]
+                else:
+                    content[field] = text
+        return MappingProxyType(content)
+
+    def copy(self) -> 'Event':
+        """Returns a new Event with the same fields, the fields are shared and only the changes are copied."""
+        event = Event.__new__(Event)
+        event._base = self._base
+        event._delta = dict(self._delta) if self._delta else None
+        event._times = dict(self._times) if self._times else None
+        return event
 
     def has_field(self, field_name: str) -> bool:
         """Returns True if Event has the field 'field_name' else False."""
-        return field_name in self.content
+        return self.find_field_text(field_name) is not None
+
+    def find_field_text(self, field_name: str) -> str | None:
+        """Returns the content of field 'field_name', None if Event doesnt contain the field."""
+        delta = self._delta
+        if delta is not None and field_name in delta:
+            return delta[field_name]
+        # same as self._base.get, inlined since fields are looked up for every event by every filter
+        getter = _FIELD_GETTERS.get(field_name)
+        if getter is not None:
+            return getter(self._base)
+        extra = self._base._extra
+        return extra.get(field_name) if extra is not None else None
 
     def get_field_text(self, field_name: str) -> str:
         """Returns the content of field 'field_name'
         raises KeyError if Event doesnt contain the field 'field_name'.
         """
+        text = self.find_field_text(field_name)
+        if text is None:
+            raise KeyError(f'Event does not have the field: {field_name}')
+        return text
+
+    def _get_time(self, field: str, name: str) -> Time:
+        """Returns the parsed time of field, the field is only parsed the first time it is asked for
+        and the result (or the error message) is cached until the field is written to or removed.
+        raises ValueError if Event doesnt have the field or it is in the wrong format.
+        """
+        times = self._times
+        if times is None:
+            times = self._times = {}
         try:
-            return self.content[field_name]
+            time = times[field]
         except KeyError:
-            raise KeyError(f'Event does not have the field: {field_name}')
+            try:
+                time = Time.str2time(self.get_field_text(field))
+            except KeyError:
+                time = f'Event does not have {name}'
+            except ValueError:
+                time = f'Event does not have {name} in correct format, should be in format yyyyMMddThhmmssZ'
+            times[field] = time
+
+        if isinstance(time, str):
+            raise ValueError(time)
+        return time
 
     def get_start_time(self) -> Time:
         """Returns the start time of the Event.
         Event must have a field called 'DTSTART' and its value must be in format yyyyMMddThhmmssZ where 'T' and 'Z' are string literals.
         raises ValueError if Event doesnt have start_time or start_time is in the wrong format.
         """
-        try:
-            return Time.str2time(self.get_field_text('DTSTART'))
-        except KeyError:
-            raise ValueError('Event does not have a start time')
-        except ValueError:
-            raise ValueError('Event does not have a start time in correct format, should be in format yyyyMMddThhmmssZ')
+        return self._get_time('DTSTART', 'a start time')
 
     def get_end_time(self) -> Time:
         """Retuns the end time of the Event
         Event must have a field called 'DTEND' and its value must be in format yyyyMMddThhmmssZ where 'T' and 'Z' are string literals.
         raises ValueError if Event doesnt have end time or if it is in the wrong format.
         """
-        try:
-            return Time.str2time(self.get_field_text('DTEND'))
-        except KeyError:
-            raise ValueError('Event does not have an end time')
-        except ValueError:
-            raise ValueError('Event does not have a start time in correct format, should be in format yyyyMMddThhmmssZ')
+        return self._get_time('DTEND', 'an end time')
 
     def get_fields(self) -> Iterable[str]:
         """Returns all fields of the event."""
+        if not self._delta:
+            return self._base.fields()
         return self.content.keys()
-    
+
+    def _forget_time(self, field: str) -> None:
+        if self._times is not None:
+            self._times.pop(field, None)
+
     def remove_field(self, field: str) -> None:
         """Removes field from event, if field doesnt exist, nothing happens."""
-        try:
-            del self.content[field]
-        except KeyError:
-            pass
+        if not self.has_field(field):
+            return
+
+        if field in self._base:
+            if self._delta is None:
+                self._delta = {}
+            self._delta[field] = None
+        else:
+            del self._delta[field]
+        self._forget_time(field)
 
     def write_field(self, field: str, text: str, overwrite: bool = True) -> None:
         """Writes text to field
@@ -127,7 +426,16 @@ class Event:
         if event has field and overwrite is False, nothing happens.
         """
         if overwrite or not self.has_field(field):
-            self.content[field] = text
+            if self._delta is None:
+                self._delta = {}
+            self._delta[field] = text
+            self._forget_time(field)
+
+    def __getstate__(self):
+        return self._base, self._delta, self._times
+
+    def __setstate__(self, state) -> None:
+        self._base, self._delta, self._times = state
 
     def __str__(self, tabs: int=0) -> str:
         name = '\t' * tabs + 'Event:'
@@ -136,14 +444,134 @@ class Event:
         return name
 
 
+class IntervalIndex:
+    """Static index over the start and end times of events for fast time range queries.
+    Events are kept sorted by start time and an implicit segment tree stores the latest end time of every subrange,
+    so a query only visits the parts of the tree that contain overlapping events.
+    Events without valid DTSTART and DTEND fields are not indexed.
+    """
+    def __init__(self, events: Iterable[Event]):
+        timed_events = []
+        for position, event in enumerate(events):
+            try:
+                start = event.get_start_time().as_minutes()
+                end = event.get_end_time().as_minutes()
+            except ValueError:
+                continue
+            timed_events.append((start, position, end, event))
+        timed_events.sort(key=lambda timed_event: timed_event[:2])
+
+        self.starts = [timed_event[0] for timed_event in timed_events]
+        self.events = [timed_event[3] for timed_event in timed_events]
+
+        self.size = 1
+        while self.size < len(timed_events):
+            self.size *= 2
+        self.max_ends = [-1] * (2 * self.size)
+        for i, timed_event in enumerate(timed_events):
+            self.max_ends[self.size + i] = timed_event[2]
+        for node in range(self.size - 1, 0, -1):
+            self.max_ends[node] = max(self.max_ends[2 * node], self.max_ends[2 * node + 1])
+
+    def query(self, start: Time, end: Time) -> list[Event]:
+        """Returns all events partially or wholey inside start and end sorted by start time.
+        Same as PatternInTime, events starting/ending at the exact same time as end/start are not included.
+        """
+        start = start.as_minutes()
+        end = end.as_minutes()
+        # only events starting before end can overlap, they are all found before index last
+        last = bisect_left(self.starts, end)
+        max_ends = self.max_ends
+        found = []
+
+        # depth first, left to right traversal of the tree, stack holds (node, first leaf index of node, node width)
+        stack = [(1, 0, self.size)]
+        while stack:
+            node, first, width = stack.pop()
+            if first >= last or max_ends[node] <= start:
+                continue
+            if width == 1:
+                found.append(self.events[first])
+            else:
+                width //= 2
+                stack.append((2 * node + 1, first + width, width))
+                stack.append((2 * node, first, width))
+
+        return found
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+
+class EventList(list):
+    """List of the events of a Calendar that counts every change to it in version,
+    so Calendar.query knows when its time index is stale. Changes to the events themselves arent counted.
+    """
+    __slots__ = ('version',)
+
+    def __init__(self, events: Iterable[Event] = ()):
+        super().__init__(events)
+        self.version = 0
+
+    def __reduce__(self):
+        # pickle would otherwise add the events back with the counting extend before version is set
+        return EventList, (list(self),)
+
+
+def _counts_change(method):
+    """ returns method of list wrapped to add one to the version of the EventList first """
+    def counted(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+    counted.__name__ = method.__name__
+    counted.__doc__ = method.__doc__
+    return counted
+
+
+for _method in (
+        '__setitem__', '__delitem__', '__iadd__', '__imul__',
+        'append', 'extend', 'insert', 'pop', 'remove', 'clear', 'sort', 'reverse',
+    ):
+    setattr(EventList, _method, _counts_change(getattr(list, _method)))
+
+
 class Calendar:
     """Class for Calendars."""
     def __init__(self, events: Iterable[Event]):
         """Initializes Calendar Object."""
-        self.events = list(events)
+        self.events = events
+
+    @property
+    def events(self) -> EventList:
+        return self._events
+
+    @events.setter
+    def events(self, events: Iterable[Event]) -> None:
+        self._events = EventList(events)
+        self._index: IntervalIndex | None = None
+        self._indexed_version = 0
+
+    def reindex(self) -> None:
+        """Rebuilds the time index used by query.
+        Should be called after start or end times of events in the calendar have been changed,
+        any change to the events list itself (added, removed, replaced or reordered events) is noticed by query on its own.
+        """
+        self._index = IntervalIndex(self._events)
+        self._indexed_version = self._events.version
+
+    def query(self, start: Time, end: Time) -> list[Event]:
+        """Returns all events partially or wholey inside the timeframe start to end, sorted by start time.
+        Events that start/end at the exact same time as the timeframe ends/starts or that are missing/have invalid
+        DTSTART or DTEND fields are not returned.
+        The time index is built on the first call and after any change to events,
+        a query then walks the tree down to each of the k found events, O(k log n), and finds no events in O(log n).
+        """
+        if self._index is None or self._indexed_version != self._events.version:
+            self.reindex()
+        return self._index.query(start, end)
 
     def __str__(self, tabs: int=0) -> str:
         name = '\t' * tabs + 'Calendar:'
         for event in self.events:
             name += '\n' + event.__str__(tabs=tabs + 1)
-        return name
\ No newline at end of file
+        return name
@@ -0,0 +1,157 @@
+"""Module for a columnar view of a calendar, where time patterns are checked for all events at once with NumPy.
+A ColumnarCalendar keeps the start and end of every event as int64 minutes (see cal.Time.as_minutes),
+sorted by start time, and builds a column of field texts the first time a field is asked for.
+mask turns PatternInTime, PatternHasText and And/Or/Not combinations of them into boolean arrays over every event,
+other patterns are resolved one event at a time. select and query map the results back to the same Event objects.
+numpy is optional for the rest of the program and only imported once a ColumnarCalendar is made.
+"""
+from typing import Iterable
+
+from cal import Calendar, Event, Time
+from pattern import Pattern, PatternAnd, PatternHasText, PatternInTime, PatternNot, PatternOr
+
+
+def _import_numpy():
+    """ returns the numpy module
+    raises ImportError with a hint if numpy isnt installed """
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('ColumnarCalendar needs numpy, install it with "pip install numpy"')
+    return numpy
+
+
+class ColumnarCalendar:
+    """Class for a calendar stored as columns, made once from a Calendar and not changed after that.
+    Events are kept sorted by start time (events with the same start keep their order),
+    events without valid DTSTART and DTEND come last and never match a time pattern.
+    """
+    NO_TIME = -1
+
+    def __init__(self, calendar: Calendar | Iterable[Event]):
+        """ calendar is a cal.Calendar or any iterable of events
+        raises ImportError if numpy isnt installed """
+        np = _import_numpy()
+        self.np = np
+        events = calendar.events if isinstance(calendar, Calendar) else list(calendar)
+
+        starts = np.empty(len(events), dtype=np.int64)
+        ends = np.empty(len(events), dtype=np.int64)
+        for i, event in enumerate(events):
+            try:
+                starts[i] = event.get_start_time().as_minutes()
+                ends[i] = event.get_end_time().as_minutes()
+            except ValueError:
+                starts[i] = ends[i] = self.NO_TIME
+
+        valid = starts != self.NO_TIME
+        # valid events sorted by start first, then the rest, the sort is stable so ties keep their order
+        order = np.lexsort((starts, ~valid))
+        self.events: list[Event] = [events[i] for i in order]
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self.valid = valid[order]
+        self.timed_count = int(self.valid.sum())
+        durations = self.ends[:self.timed_count] - self.starts[:self.timed_count]
+        self.max_duration = int(durations.max()) if self.timed_count else 0
+        self._columns: dict[str, object] = {}
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def column(self, field: str):
+        """Returns a numpy object array with the text of field for every event, None where the event doesnt have it.
+        The column is built the first time the field is asked for and kept after that.
+        """
+        try:
+            return self._columns[field]
+        except KeyError:
+            column = self.np.empty(len(self.events), dtype=object)
+            column[:] = [event.find_field_text(field) for event in self.events]
+            self._columns[field] = column
+            return column
+
+    def _time_mask(self, start: int, end: int):
+        """ returns the mask of events overlapping start to end, only the range of events that can overlap is compared """
+        np = self.np
+        mask = np.zeros(len(self.events), dtype=bool)
+        first, last = self._get_candidates(start, end)
+        mask[first:last] = self.ends[first:last] > start
+        return mask
+
+    def _get_candidates(self, start: int, end: int) -> tuple[int, int]:
+        """ returns the index range of timed events that can overlap start to end
+        only events starting before end can overlap, and none starting max_duration or more before start """
+        starts = self.starts[:self.timed_count]
+        first = int(starts.searchsorted(start - self.max_duration, side='right'))
+        last = int(starts.searchsorted(end, side='left'))
+        return first, max(first, last)
+
+    def _text_mask(self, pattern: PatternHasText):
+        """ returns the mask of pattern, every distinct text of a field is only searched once """
+        np = self.np
+        fields = list(dict.fromkeys(self.get_fields() if pattern.fields is None else pattern.fields))
+        mask = np.zeros(len(self.events), dtype=bool)
+        for field in fields:
+            column = self.column(field)
+            found = {}
+            for i, text in enumerate(column):
+                if text is None:
+                    continue
+                try:
+                    match = found[text]
+                except KeyError:
+                    match = found[text] = pattern.text in text
+                if match:
+                    mask[i] = True
+        return mask
+
+    def get_fields(self) -> list[str]:
+        """Returns every field that any event has, in the order they are first seen."""
+        fields = {}
+        for event in self.events:
+            fields.update(dict.fromkeys(event.get_fields()))
+        return list(fields)
+
+    def mask(self, pattern: Pattern):
+        """Returns a numpy bool array that is True for every event in self.events that pattern resolves True for.
+        PatternInTime is compared for all events at once and And/Or/Not combine the masks of their patterns,
+        PatternHasText searches every distinct text of its fields once, any other pattern is resolved event by event.
+        """
+        np = self.np
+        if isinstance(pattern, PatternInTime):
+            return self._time_mask(pattern.time_start.as_minutes(), pattern.time_end.as_minutes())
+        if isinstance(pattern, PatternAnd):
+            mask = np.ones(len(self.events), dtype=bool)
+            for inner in pattern.patterns:
+                mask &= self.mask(inner)
+            return mask
+        if isinstance(pattern, PatternOr):
+            mask = np.zeros(len(self.events), dtype=bool)
+            for inner in pattern.patterns:
+                mask |= self.mask(inner)
+            return mask
+        if isinstance(pattern, PatternNot):
+            return ~self.mask(pattern.pattern)
+        if isinstance(pattern, PatternHasText):
+            return self._text_mask(pattern)
+        return np.fromiter((pattern.resolve(event) for event in self.events), dtype=bool, count=len(self.events))
+
+    def select(self, pattern: Pattern) -> list[Event]:
+        """Returns the events that pattern resolves True for, sorted by start time."""
+        events = self.events
+        return [events[i] for i in self.np.flatnonzero(self.mask(pattern))]
+
+    def query(self, start: Time, end: Time) -> list[Event]:
+        """Returns all events partially or wholey inside start and end sorted by start time, same as cal.Calendar.query.
+        Only the events that can overlap are compared, found with a binary search on the start times.
+        """
+        start = start.as_minutes()
+        end = end.as_minutes()
+        first, last = self._get_candidates(start, end)
+        events = self.events
+        return [events[first + i] for i in self.np.flatnonzero(self.ends[first:last] > start)]
+
+    def to_calendar(self) -> Calendar:
+        """Returns a cal.Calendar with the same events, sorted by start time."""
+        return Calendar(self.events)
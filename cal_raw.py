@@ -1,8 +1,44 @@
-from typing import Iterable
+import hashlib
+import time
+from typing import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from cal import Calendar
+from cal import Calendar, Event
 from src_cal import SrcCal
-from filter import Filter
+from filter import CompiledFilter, Filter, compile_filters, filters_fingerprint
+from metrics import BuildMetrics
+from build_trace import BuildTracer
+
+
+def run_filters(checks: list[CompiledFilter], event: Event) -> list[Event]:
+    """ returns the events that come out of running event through all checks in order """
+    current_events = [event]
+
+    for check in checks:
+        if len(current_events) == 1:
+            current_events = check(current_events[0])
+        else:
+            current_events = [next_event for current_event in current_events for next_event in check(current_event)]
+
+    return current_events
+
+
+_worker_checks: list[CompiledFilter] = []
+
+
+def _init_worker(filters: list[Filter]) -> None:
+    """ compiles the filters once in every worker process of a parallel build """
+    global _worker_checks
+    _worker_checks = compile_filters(filters)
+
+
+def _filter_chunk(events: list[Event]) -> list[list[Event]]:
+    """ runs every event of a chunk through the compiled filters of the worker process """
+    return [run_filters(_worker_checks, event) for event in events]
+
+
+# (source index, UID, LAST-MODIFIED, RECURRENCE-ID), the key a source event's filtered output is remembered by
+MemoKey = tuple[int, str, str, str | None]
 
 
 class UnbuiltCal:
@@ -10,27 +46,197 @@ class UnbuiltCal:
     def __init__(self, src_cals: Iterable[SrcCal], filters: Iterable[Filter]):
         self.src_cals = [src_cal for src_cal in src_cals]
         self.filters = [filtr for filtr in filters]
+        self._memo: dict[MemoKey, list[Event]] = {}
+        self._memo_fingerprint: str | None = None
 
-    def build(self):
-        final_events = []
+    def fetch_all(self, max_workers: int = 8) -> None:
+        """ fetches every source calendar that hasnt been fetched yet, at most max_workers at the same time
+        if any fetch fails, the exception of the first failing source (in source order) is raised once all fetches are done """
+        to_fetch = [src_cal for src_cal in self.src_cals if src_cal.needs_fetch()]
+        if not to_fetch:
+            return
+        if len(to_fetch) == 1 or max_workers <= 1:
+            for src_cal in to_fetch:
+                src_cal.fetch()
+            return
 
-        for src_cal in self.src_cals:
-            for event in src_cal.get_events():
-                current_events = [event]
-                next_events = []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(to_fetch))) as executor:
+            futures = [executor.submit(src_cal.fetch) for src_cal in to_fetch]
+
+        for future in futures:
+            future.result()
+
+    @staticmethod
+    def _get_memo_key(source_index: int, event: Event) -> MemoKey | None:
+        """ returns the key an event of the source at source_index in src_cals is remembered by between builds,
+        the source is part of the key since different sources can have events with the same UID
+        returns None for events without UID or LAST-MODIFIED, those are filtered on every build """
+        try:
+            uid = event.get_field_text('UID')
+            last_modified = event.get_field_text('LAST-MODIFIED')
+        except KeyError:
+            return None
+        recurrence_id = event.get_field_text('RECURRENCE-ID') if event.has_field('RECURRENCE-ID') else None
+        return source_index, uid, last_modified, recurrence_id
+
+    def _filter_parallel(self, events: list[Event], processes: int) -> list[list[Event]]:
+        """ runs events through the filters in a pool of processes, returns the output of every event in order """
+        chunk_size = max(1, -(-len(events) // (processes * 4)))
+        chunks = [events[i:i + chunk_size] for i in range(0, len(events), chunk_size)]
+
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(self.filters,)) as executor:
+            return [output for outputs in executor.map(_filter_chunk, chunks) for output in outputs]
+
+    def _get_memo(self, incremental: bool) -> tuple[dict, str | None]:
+        """ returns the memo of the last incremental build, empty if the filters have changed,
+        and the fingerprint of the current filters
+        if incremental is False an empty memo and None are returned and the memo is left for the next incremental build """
+        if not incremental:
+            return {}, None
+        fingerprint = filters_fingerprint(self.filters)
+        if fingerprint != self._memo_fingerprint:
+            self._memo = {}
+        return self._memo, fingerprint
+
+    def _set_memo(self, memo: dict, fingerprint: str | None, incremental: bool) -> None:
+        """ keeps memo for the next incremental build, builds that arent incremental dont change the memo """
+        if incremental:
+            self._memo = memo
+            self._memo_fingerprint = fingerprint
+
+    def iter_events(
+            self,
+            max_fetch_workers: int = 8,
+            incremental: bool = False,
+            metrics: BuildMetrics | None = None,
+            tracer: BuildTracer | None = None,
+        ) -> Iterator[Event]:
+        """ yields the built events one at a time, in the same order as build, without keeping the built calendar in memory
+        each source event is run through the filter chain when it is reached and its output is yielded right away
+        sources are fetched before the first event is yielded, see fetch_all
+        incremental works as in build but is off by default, since the memo keeps every built event in memory until the next build,
+        the memo for the next incremental build is only updated if the iterator is run to the end
+        if metrics is not None, every source and filter is measured and recorded in it, see metrics.BuildMetrics
+        if tracer is not None, the events it picks are traced through the filters into its log, see build_trace.BuildTracer """
+        start = time.perf_counter()
+        fetched = {id(src_cal) for src_cal in self.src_cals if src_cal.needs_fetch()} if metrics is not None else set()
+        self.fetch_all(max_fetch_workers)
+        if metrics is not None:
+            metrics.fetch_seconds = time.perf_counter() - start
 
-                for filtr in self.filters:
-                    for current_event in current_events:
-                        for next_event in filtr.check(current_event):
-                            next_events.append(next_event)
+        memo, fingerprint = self._get_memo(incremental)
+        next_memo = {}
+        checks = compile_filters(self.filters, metrics)
+        filtered = 0
+        events_out = 0
+        if tracer is not None:
+            tracer.start_build()
 
-                    current_events = next_events
-                    next_events = []
+        for source_index, src_cal in enumerate(self.src_cals):
+            source_events = src_cal.get_events()
+            if metrics is not None:
+                source_metrics = metrics.add_source(src_cal.get_name())
+                if id(src_cal) in fetched:
+                    source_metrics.fetch = src_cal.get_last_fetch()
+                source_events = source_metrics.count(source_events)
 
-                final_events += current_events
+            for event in source_events:
+                key = self._get_memo_key(source_index, event) if incremental else None
+                if key is not None and key in memo:
+                    events = memo[key]
+                    if tracer is not None and tracer.should_trace(event):
+                        tracer.record_reused(event, src_cal.get_name())
+                else:
+                    filtered += 1
+                    if tracer is not None and tracer.should_trace(event):
+                        events = tracer.trace(self.filters, event, src_cal.get_name(), checks)
+                    else:
+                        events = run_filters(checks, event)
 
-        return Calendar(final_events)
+                if key is not None:
+                    next_memo[key] = events
+                events_out += len(events)
+                yield from events
+
+        self._set_memo(next_memo, fingerprint, incremental)
+        if metrics is not None:
+            metrics.events_filtered = filtered
+            metrics.events_out = events_out
+            metrics.events_reused = sum(source.events for source in metrics.sources) - filtered
+            metrics.build_seconds = time.perf_counter() - start
+
+    def build(
+            self,
+            max_fetch_workers: int = 8,
+            incremental: bool = True,
+            processes: int | None = None,
+            metrics: BuildMetrics | None = None,
+            tracer: BuildTracer | None = None,
+        ):
+        """ builds the calendar by running every event of every source through the filters
+        sources are fetched concurrently first, see fetch_all, then filtered one at a time in source order
+        the filters are compiled before use, see filter.compile_filters
+        if incremental, the filtered output of every source event is remembered by its source and (UID, LAST-MODIFIED, RECURRENCE-ID)
+        and reused by the next build as long as the filters are unchanged, only new or changed events are filtered again
+        and events that are gone from the sources are forgotten. Reused events are the same Event objects as last build
+        if processes is more than 1, events are filtered in that many worker processes and put back together in order,
+        the filters and events must then be picklable
+        if metrics is not None, the build is measured and recorded in it (see metrics.BuildMetrics),
+        if tracer is not None, the events it picks are traced into its log (see build_trace.BuildTracer),
+        measured and traced builds always filter in this process since the workers cant report back
+        the source events are never changed, actions make copy-on-write copies of the events they change """
+        if metrics is not None or tracer is not None:
+            return Calendar(self.iter_events(max_fetch_workers, incremental, metrics, tracer))
+        if processes is None or processes <= 1:
+            return Calendar(self.iter_events(max_fetch_workers, incremental))
+
+        self.fetch_all(max_fetch_workers)
+        memo, fingerprint = self._get_memo(incremental)
+        next_memo = {}
+
+        # outputs holds the filtered events of every source event in order, None until the event has been filtered
+        outputs: list[list[Event] | None] = []
+        to_filter: list[tuple[int, Event, MemoKey | None]] = []
+        for source_index, src_cal in enumerate(self.src_cals):
+            for event in src_cal.get_events():
+                key = self._get_memo_key(source_index, event) if incremental else None
+                if key is not None and key in memo:
+                    outputs.append(memo[key])
+                    next_memo[key] = memo[key]
+                else:
+                    to_filter.append((len(outputs), event, key))
+                    outputs.append(None)
+
+        filtered = self._filter_parallel([event for _, event, _ in to_filter], processes) if to_filter else []
+        for (position, _, key), events in zip(to_filter, filtered):
+            outputs[position] = events
+            if key is not None:
+                next_memo[key] = events
+
+        self._set_memo(next_memo, fingerprint, incremental)
+        return Calendar(event for events in outputs for event in events)
     
+    def get_fingerprint(self, max_fetch_workers: int = 8) -> str:
+        """ returns a hash of the filters and the validator of every source (see SrcCal.get_validator),
+        the same fingerprint builds the same calendar as long as the sources send new validators when they change
+        sources that can tell without it arent fetched, e.g. url sources with a fresh cache entry, the rest are fetched first """
+        fingerprint = self.get_validator()
+        if fingerprint is None:
+            self.fetch_all(max_fetch_workers)
+            fingerprint = self.get_validator()
+        return fingerprint
+
+    def get_validator(self) -> str | None:
+        """ returns the fingerprint (see get_fingerprint) if every source can give its validator without being fetched,
+        otherwise None """
+        digest = hashlib.sha256(filters_fingerprint(self.filters).encode('ascii'))
+        for src_cal in self.src_cals:
+            validator = src_cal.get_validator()
+            if validator is None:
+                return None
+            digest.update(validator.encode('utf-8') + b'\0')
+        return digest.hexdigest()
+
     def __str__(self, tabs: int = 0):
         name = '\t' * tabs + 'Unbuilt Calendar:\n'
         
@@ -43,3 +249,56 @@ class UnbuiltCal:
             name += filter.__str__(tabs+2) + '\n'
 
         return name
+
+
+class SrcCalUnbuilt(SrcCal):
+    """ Source calendar that is the built calendar of another UnbuiltCal, to combine calendars that have their own filters """
+    def __init__(self, unbuilt_cal: UnbuiltCal):
+        self.unbuilt_cal = unbuilt_cal
+        self.calendar: Calendar | None = None
+        self._changed = False
+
+    def needs_fetch(self) -> bool:
+        return self.calendar is None
+
+    def fetch(self) -> None:
+        """ builds the inner calendar, which fetches its sources """
+        self.calendar = self.unbuilt_cal.build()
+
+    def get_events(self) -> list[Event]:
+        if self.needs_fetch():
+            self.fetch()
+        return self.calendar.events
+
+    def get_refresh_interval(self) -> float | None:
+        """ returns the shortest refresh interval of the inner sources, None if none of them change """
+        intervals = [src_cal.get_refresh_interval() for src_cal in self.unbuilt_cal.src_cals]
+        return min((interval for interval in intervals if interval is not None), default=None)
+
+    def refresh(self) -> bool:
+        """ refreshes every inner source and rebuilds the inner calendar if any of them changed, returns True if any did
+        every source is refreshed even if one fails, the first exception is raised after the rebuild
+        changes are remembered until a refresh returns them, so a change is never lost to a failing source or rebuild """
+        changed = self._changed
+        exception = None
+        for src_cal in self.unbuilt_cal.src_cals:
+            try:
+                if src_cal.refresh():
+                    changed = True
+            except Exception as error:
+                if exception is None:
+                    exception = error
+
+        self._changed = changed
+        if changed or self.calendar is None:
+            self.fetch()
+        if exception is not None:
+            raise exception
+        self._changed = False
+        return changed
+
+    def get_validator(self) -> str | None:
+        return self.unbuilt_cal.get_validator()
+
+    def __str__(self, tabs: int = 0):
+        return '\t' * tabs + 'SrcCalUnbuilt Object:\n' + self.unbuilt_cal.__str__(tabs+1)
@@ -0,0 +1,199 @@
+"""Module for publishing built calendars over HTTP.
+A CalendarServer serves the filtered calendar as ics and every week of a term as html from memory.
+Every response is rendered, gzipped and given an ETag once when a calendar is published,
+so requests never build or render anything and any number of clients can be served at the same time.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Mapping
+
+import cal
+import ics
+from output_term import OutputTerm
+
+
+class PreparedResponse:
+    """Class for a response body rendered ahead of time, with its ETag and gzipped body."""
+    MIN_GZIP_SIZE = 256
+
+    def __init__(self, body: bytes | str, content_type: str):
+        """ str bodies are encoded as utf-8 """
+        self.body = body.encode('utf-8') if isinstance(body, str) else body
+        self.content_type = content_type
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+
+        # the gzipped body is a different representation, so it gets its own ETag
+        self.gzip_body: bytes | None = None
+        self.gzip_etag: str | None = None
+        if len(self.body) >= self.MIN_GZIP_SIZE:
+            gzip_body = gzip.compress(self.body, mtime=0)
+            if len(gzip_body) < len(self.body):
+                self.gzip_body = gzip_body
+                self.gzip_etag = self.etag[:-1] + '-gzip"'
+
+    def matches(self, if_none_match: str) -> bool:
+        """Returns True if the If-None-Match header if_none_match names this response in any encoding."""
+        if if_none_match.strip() == '*':
+            return True
+        etags = {etag.strip().removeprefix('W/') for etag in if_none_match.split(',')}
+        return self.etag in etags or (self.gzip_etag is not None and self.gzip_etag in etags)
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Returns True if the Accept-Encoding header accept_encoding allows gzip."""
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.partition(';')
+        if name.strip().lower() not in ('gzip', 'x-gzip'):
+            continue
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+class _CalendarRequestHandler(BaseHTTPRequestHandler):
+    """Handler answering GET and HEAD requests from the responses of the server's CalendarServer."""
+    server_version = 'Schmanager'
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, send_body: bool) -> None:
+        path = self.path.split('?', 1)[0]
+        response = self.server.calendar_server.get_response(path)
+        if response is None:
+            body = b'Not Found'
+            self.send_response(404)
+            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+            return
+
+        use_gzip = response.gzip_body is not None and accepts_gzip(self.headers.get('Accept-Encoding', ''))
+        etag = response.gzip_etag if use_gzip else response.etag
+
+        if response.matches(self.headers.get('If-None-Match', '')):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+
+        body = response.gzip_body if use_gzip else response.body
+        self.send_response(200)
+        self.send_header('Content-Type', response.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self._send(True)
+
+    def do_HEAD(self) -> None:
+        self._send(False)
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.calendar_server.log_requests:
+            super().log_message(format, *args)
+
+
+class CalendarServer:
+    """Class for a local HTTP server publishing a built calendar.
+    publish renders a new set of responses and swaps them in at once, clients see either the old or the new set.
+    """
+    ICS_PATH = '/calendar.ics'
+    ICS_CONTENT_TYPE = 'text/calendar; charset=utf-8'
+    HTML_CONTENT_TYPE = 'text/html; charset=utf-8'
+    CSS_CONTENT_TYPE = 'text/css; charset=utf-8'
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8000, style_sheet: str = 'output_week.css', log_requests: bool = False):
+        """ port 0 picks a free port, see self.port once the server is created
+        style_sheet is the css file served next to the week pages, it is read on every publish """
+        self.style_sheet = style_sheet
+        self.log_requests = log_requests
+        self._responses: dict[str, PreparedResponse] = {}
+        self._thread: threading.Thread | None = None
+
+        self.http_server = ThreadingHTTPServer((host, port), _CalendarRequestHandler)
+        self.http_server.daemon_threads = True
+        self.http_server.calendar_server = self
+
+    @property
+    def port(self) -> int:
+        return self.http_server.server_address[1]
+
+    def get_response(self, path: str) -> PreparedResponse | None:
+        """Returns the response for path, or None if nothing is published at path."""
+        if path == '/':
+            path = '/' + OutputTerm.INDEX_FILE_NAME
+        return self._responses.get(path)
+
+    def set_responses(self, responses: Mapping[str, PreparedResponse]) -> None:
+        """Replaces every published response with responses, keyed by path."""
+        # replacing the whole dict is atomic, so handlers never see a half updated set
+        self._responses = dict(responses)
+
+    def publish(
+            self,
+            calendar: cal.Calendar,
+            first_day: cal.Time | None = None,
+            last_day: cal.Time | None = None,
+            calendar_info: dict[str, str] | None = None,
+            title: str = 'Schema',
+        ) -> None:
+        """Renders calendar as ics at ICS_PATH, and if first_day and last_day are given,
+        every week between them as html with an index page at / (see output_term.OutputTerm).
+        calendar_info are the VCALENDAR properties of the ics, see ics.iter_ics.
+        """
+        responses = {self.ICS_PATH: PreparedResponse(''.join(ics.iter_ics(calendar.events, calendar_info)), self.ICS_CONTENT_TYPE)}
+
+        if first_day is not None and last_day is not None:
+            style_sheet_name = os.path.basename(self.style_sheet)
+            term = OutputTerm(first_day, last_day, calendar, '.', style_sheet_name, title)
+            for page in term.get_pages():
+                responses['/' + os.path.basename(page.file_name)] = PreparedResponse(page.render_to_string(), self.HTML_CONTENT_TYPE)
+            try:
+                with open(self.style_sheet, 'rb') as file:
+                    responses['/' + style_sheet_name] = PreparedResponse(file.read(), self.CSS_CONTENT_TYPE)
+            except OSError:
+                pass
+
+        self.set_responses(responses)
+
+    def serve_forever(self) -> None:
+        """Serves requests until shutdown is called, blocks the calling thread."""
+        self.http_server.serve_forever()
+
+    def start(self) -> None:
+        """Serves requests in a background daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.serve_forever, name='CalendarServer', daemon=True)
+            self._thread.start()
+
+    def shutdown(self) -> None:
+        """Stops serving and closes the socket."""
+        if self._thread is not None:
+            self.http_server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.http_server.server_close()
+
+    def __enter__(self) -> 'CalendarServer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
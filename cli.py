@@ -0,0 +1,150 @@
+"""Headless command line entry point, runs without a GUI.
+
+    python cli.py build CONFIG
+    python cli.py render-week CONFIG DAY [-o FILE]
+    python cli.py export-ics CONFIG [-o FILE]
+    python cli.py serve CONFIG [--first DAY --last DAY] [--port PORT] [--refresh]
+
+CONFIG is an input json file (see input_json.InputJSON) and DAY is a date written as YYYY-MM-DD.
+Only the modules a command needs are imported when it runs, kivy is never imported
+and requests only once a source has to be fetched.
+"""
+import argparse
+import sys
+from datetime import date, timedelta
+
+import cal
+
+
+def parse_day(text: str) -> cal.Time:
+    """ returns the start of the day in text, written as YYYY-MM-DD
+    raises argparse.ArgumentTypeError if text isnt a valid date """
+    try:
+        day = date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid day "{text}", should be YYYY-MM-DD')
+    return cal.Time(day.year, day.month, day.day, 0, 0)
+
+
+def get_unbuilt_cal(args: argparse.Namespace):
+    from input_json import InputJSON
+    from fetch_cache import DEFAULT_CACHE
+    return InputJSON.get_unbuilt_cal(args.config, None if args.no_cache else DEFAULT_CACHE)
+
+
+def get_calendar(args: argparse.Namespace) -> cal.Calendar:
+    """ returns the built calendar of args.config
+    with --snapshot the snapshot is reused while the config and sources are unchanged, see snapshot.build_with_snapshot
+    with --from-snapshot the last saved snapshot is used as it is without reading the config or fetching anything """
+    if args.snapshot is not None:
+        import snapshot
+        if args.from_snapshot:
+            calendar = snapshot.load_snapshot_file(args.snapshot)
+            if calendar is None:
+                raise SystemExit(f'no valid snapshot at {args.snapshot}')
+            return calendar
+        return snapshot.build_with_snapshot(get_unbuilt_cal(args), args.snapshot)
+
+    if args.from_snapshot:
+        raise SystemExit('--from-snapshot needs --snapshot')
+    return get_unbuilt_cal(args).build(processes=args.processes)
+
+
+def command_build(args: argparse.Namespace) -> None:
+    calendar = get_calendar(args)
+    print(f'{len(calendar.events)} events')
+
+
+def command_render_week(args: argparse.Namespace) -> None:
+    from output_week import OutputWeek
+
+    monday = args.day - timedelta(days=args.day.weekday())
+    week_range = [monday + timedelta(days=day) for day in range(7)]
+    OutputWeek(week_range, get_calendar(args), args.output).write_to_file()
+
+
+def command_export_ics(args: argparse.Namespace) -> None:
+    import ics
+
+    if args.output == '-':
+        events = get_calendar(args).events if args.snapshot is not None else get_unbuilt_cal(args).iter_events(incremental=False)
+        ics.write_ics(sys.stdout.buffer, events)
+        sys.stdout.buffer.flush()
+    elif args.snapshot is not None:
+        ics.write_ics_file(args.output, get_calendar(args).events)
+    else:
+        # the built calendar is never held in memory, events are written as they come out of the filters
+        ics.write_ics_file(args.output, get_unbuilt_cal(args).iter_events(incremental=False))
+
+
+def command_serve(args: argparse.Namespace) -> None:
+    from cal_server import CalendarServer
+
+    server = CalendarServer(args.host, args.port, log_requests=True)
+
+    def publish(calendar: cal.Calendar) -> None:
+        server.publish(calendar, args.first, args.last)
+
+    daemon = None
+    if args.refresh and args.snapshot is not None:
+        # the last snapshot is served right away and replaced by every rebuild
+        import snapshot
+        daemon = snapshot.start_from_snapshot(get_unbuilt_cal(args), args.snapshot, [publish])
+    elif args.refresh:
+        from refresh import RefreshDaemon
+        daemon = RefreshDaemon(get_unbuilt_cal(args), [publish])
+        daemon.start()
+    else:
+        publish(get_calendar(args))
+
+    print(f'serving on http://{args.host}:{server.port}/')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if daemon is not None:
+            daemon.stop()
+        server.http_server.server_close()
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='schmanager', description='Builds filtered calendars without the GUI.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name: str, command, help: str) -> argparse.ArgumentParser:
+        subparser = subparsers.add_parser(name, help=help)
+        subparser.set_defaults(command=command)
+        subparser.add_argument('config', help='input json file with the sources and filters')
+        subparser.add_argument('--snapshot', help='snapshot file reused while the config and sources are unchanged')
+        subparser.add_argument('--from-snapshot', action='store_true', help='use the snapshot as it is without fetching')
+        subparser.add_argument('--processes', type=int, default=None, help='filter events in this many processes')
+        subparser.add_argument('--no-cache', action='store_true', help='dont cache fetched sources in ~/.cache/schmanager')
+        return subparser
+
+    add_command('build', command_build, 'build the calendar and print how many events it has')
+
+    render_week = add_command('render-week', command_render_week, 'write the week of a day as html')
+    render_week.add_argument('day', type=parse_day, help='any day of the week, YYYY-MM-DD')
+    render_week.add_argument('-o', '--output', default='output_week.html', help='html file to write')
+
+    export_ics = add_command('export-ics', command_export_ics, 'write the filtered calendar as ics')
+    export_ics.add_argument('-o', '--output', default='-', help='ics file to write, - for stdout')
+
+    serve = add_command('serve', command_serve, 'publish the filtered calendar over HTTP')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--first', type=parse_day, help='first day of the week pages')
+    serve.add_argument('--last', type=parse_day, help='last day of the week pages')
+    serve.add_argument('--refresh', action='store_true', help='refresh the sources in the background on their ttl')
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = get_parser().parse_args(argv)
+    args.command(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""Module for caching fetched source calendars on disk.
+Every cached URL has one file of two json lines, the first holding the HTTP validators (ETag and Last-Modified)
+of the last response, when it was fetched and how long it stays fresh, and the second the already parsed calendar,
+so the first line can be read on its own without loading the calendar (see FetchCache.load_header).
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Mapping
+
+from cal import Calendar, Event
+import ics
+from atomic_write import write_atomic
+
+
+def parse_max_age(cache_control: str | None) -> float | None:
+    """ returns the seconds a Cache-Control header lets a response be used, 0 for no-cache and no-store
+    returns None if cache_control is None or says nothing about it """
+    if cache_control is None:
+        return None
+    for directive in cache_control.split(','):
+        name, _, value = directive.strip().partition('=')
+        name = name.lower()
+        if name in ('no-cache', 'no-store'):
+            return 0.0
+        if name == 'max-age':
+            try:
+                return max(0.0, float(value.strip('"')))
+            except ValueError:
+                return None
+    return None
+
+
+class CacheEntry:
+    """Class for one cached response."""
+    def __init__(
+            self,
+            url: str,
+            calendar_info: dict[str, str],
+            events: list[Event],
+            etag: str | None = None,
+            last_modified: str | None = None,
+            fetched_at: float = 0.0,
+            ttl: float = 0.0,
+        ):
+        """ events are the parsed events, kept as compact Events and only turned into dicts while being written to disk
+        fetched_at is the time.time() of the last successful fetch or revalidation
+        ttl is how many seconds after fetched_at the entry can be used without asking the server """
+        self.url = url
+        self.calendar_info = calendar_info
+        self.events = events
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+
+    @classmethod
+    def from_calendar(
+            cls,
+            url: str,
+            calendar: Calendar,
+            calendar_info: dict[str, str],
+            etag: str | None = None,
+            last_modified: str | None = None,
+            default_ttl: float = 0.0,
+        ) -> 'CacheEntry':
+        """Returns an entry for a freshly parsed calendar.
+        ttl is read from the X-PUBLISHED-TTL property of the calendar, if missing or invalid default_ttl is used.
+        """
+        try:
+            ttl = ics.parse_duration(calendar_info['X-PUBLISHED-TTL'])
+        except (KeyError, ValueError):
+            ttl = default_ttl
+
+        return cls(
+            url,
+            dict(calendar_info),
+            [event.copy() for event in calendar.events],
+            etag,
+            last_modified,
+            time.time(),
+            ttl,
+        )
+
+    def is_fresh(self, now: float | None = None) -> bool:
+        """Returns True if the entry is still within its ttl and can be used without asking the server."""
+        if now is None:
+            now = time.time()
+        return now < self.fetched_at + self.ttl
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Updates the entry after the server answered 304 Not Modified with headers.
+        New validators replace the old ones and the entry is fresh again from now.
+        If the calendar has no X-PUBLISHED-TTL, the max-age of a Cache-Control header is used as the new ttl.
+        """
+        self.fetched_at = time.time()
+        self.etag = headers.get('ETag', self.etag)
+        self.last_modified = headers.get('Last-Modified', self.last_modified)
+        max_age = parse_max_age(headers.get('Cache-Control'))
+        if max_age is not None and 'X-PUBLISHED-TTL' not in self.calendar_info:
+            self.ttl = max_age
+
+    def get_validators(self) -> dict[str, str]:
+        """Returns the request headers that make the server answer 304 Not Modified if nothing has changed."""
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def get_calendar(self) -> Calendar:
+        """Returns a new cal.Calendar with copies of the cached events, nothing is parsed again.
+        The copies share their fields with the cached events, so the calendar takes little extra memory."""
+        return Calendar(event.copy() for event in self.events)
+
+    def get_event_dicts(self) -> list[dict[str, str]]:
+        """Returns the content of every event as a new dict, as written to disk."""
+        return [dict(event.content) for event in self.events]
+
+    def to_json(self) -> dict:
+        return {**self.get_header(), 'events': self.get_event_dicts()}
+
+    def get_header(self) -> dict:
+        """Returns everything but the events, as stored on the first line of the cache file."""
+        return {
+            'url': self.url,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'fetched_at': self.fetched_at,
+            'ttl': self.ttl,
+            'calendar_info': self.calendar_info,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'CacheEntry':
+        """raises KeyError if data is missing a key."""
+        return cls(
+            data['url'],
+            data['calendar_info'],
+            [Event(content) for content in data['events']],
+            data['etag'],
+            data['last_modified'],
+            data['fetched_at'],
+            data['ttl'],
+        )
+
+
+class FetchCache:
+    """Class for an on disk cache of fetched source calendars keyed by URL.
+    Entries are also kept in memory, so rebuilding a SrcCalURL doesnt read the file again.
+    """
+    def __init__(self, directory: str):
+        """ directory is where the cache files are kept, it is created on the first store """
+        self.directory = directory
+        self._entries: dict[str, CacheEntry] = {}
+
+    def _get_path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def load(self, url: str) -> CacheEntry | None:
+        """Returns the cached entry for url, or None if url isnt cached or the cache file cant be read."""
+        if url in self._entries:
+            return self._entries[url]
+
+        try:
+            with open(self._get_path(url), 'r', encoding='utf-8') as file:
+                header = json.loads(file.readline())
+                entry = CacheEntry.from_json({**header, 'events': json.loads(file.read())})
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        if entry.url != url:
+            return None
+        self._entries[url] = entry
+        return entry
+
+    def load_header(self, url: str) -> dict | None:
+        """Returns the header of the cached entry for url (see CacheEntry.get_header) without loading its events,
+        or None if url isnt cached or the cache file cant be read."""
+        if url in self._entries:
+            return self._entries[url].get_header()
+
+        try:
+            with open(self._get_path(url), 'r', encoding='utf-8') as file:
+                header = json.loads(file.readline())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(header, dict) or header.get('url') != url:
+            return None
+        return header
+
+    def store(self, entry: CacheEntry) -> None:
+        """Stores entry in memory and on disk.
+        The file is written to a temporary file first and then renamed, so a crash never leaves a half written entry.
+        """
+        self._entries[entry.url] = entry
+
+        os.makedirs(self.directory, exist_ok=True)
+        header = json.dumps(entry.get_header(), ensure_ascii=False)
+        write_atomic(self._get_path(entry.url), header + '\n' + json.dumps(entry.get_event_dicts(), ensure_ascii=False))
+
+    def remove(self, url: str) -> None:
+        """Removes url from the cache, if url isnt cached nothing happens."""
+        self._entries.pop(url, None)
+        try:
+            os.remove(self._get_path(url))
+        except FileNotFoundError:
+            pass
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'schmanager')
+# the cache in the home directory of the user, only used by the entry points that opt in to it (main.py and cli.py)
+DEFAULT_CACHE = FetchCache(DEFAULT_CACHE_DIR)
@@ -1,6 +1,15 @@
+from typing import Callable, Iterable
+import hashlib
+import time
+
 from cal import Event
-from pattern import Pattern
+from pattern import Pattern, PatternHasText
 from action import Action
+from text_match import TextMatcher
+from metrics import BuildMetrics, FilterMetrics
+
+
+CompiledFilter = Callable[[Event], list[Event]]
 
 
 class Filter:
@@ -14,9 +23,62 @@ class Filter:
             return self.action.resolve(event)
         else:
             return [event]
+
+    def compile(self, text_matcher: TextMatcher | None = None) -> CompiledFilter:
+        """ returns a function that gives the same result as check, see Pattern.compile """
+        pattern = self.pattern.compile(text_matcher)
+        action = self.action.compile()
+        return lambda event: action(event) if pattern(event) else [event]
+
+    def compile_measured(self, filter_metrics: FilterMetrics, text_matcher: TextMatcher | None = None) -> CompiledFilter:
+        """ returns a function that gives the same result as compile and records every call in filter_metrics """
+        pattern = self.pattern.compile(text_matcher)
+        action = self.action.compile()
+        perf_counter = time.perf_counter
+
+        def check(event: Event) -> list[Event]:
+            start = perf_counter()
+            matched = pattern(event)
+            matched_time = perf_counter()
+            filter_metrics.pattern_seconds += matched_time - start
+            filter_metrics.events_in += 1
+            if not matched:
+                filter_metrics.events_out += 1
+                return [event]
+
+            events = action(event)
+            filter_metrics.action_seconds += perf_counter() - matched_time
+            filter_metrics.matches += 1
+            filter_metrics.events_out += len(events)
+            return events
+        return check
         
     def __str__(self, tabs: int = 0):
         name = '\t' * tabs + 'Filter:\n'
         name += '\t' * (tabs+1) + 'Pattern:\n' + self.pattern.__str__(tabs+2) + '\n'
         name += '\t' * (tabs+1) + 'Action:\n' + self.action.__str__(tabs+2)
-        return name
\ No newline at end of file
+        return name
+
+
+def compile_filters(filters: Iterable[Filter], metrics: BuildMetrics | None = None) -> list[CompiledFilter]:
+    """ compiles a chain of filters
+    all PatternHasText patterns of all filters share one TextMatcher, so every field text is only scanned once
+    if metrics is not None, every filter is added to metrics and records its calls there, see Filter.compile_measured """
+    filters = list(filters)
+    text_matcher = TextMatcher(
+        pattern for filtr in filters for pattern in filtr.pattern.walk() if isinstance(pattern, PatternHasText)
+    )
+    if metrics is None:
+        return [filtr.compile(text_matcher) for filtr in filters]
+    return [
+        filtr.compile_measured(metrics.add_filter(' '.join(str(filtr.pattern).split())), text_matcher)
+        for filtr in filters
+    ]
+
+
+def filters_fingerprint(filters: Iterable[Filter]) -> str:
+    """ returns a hash of the filter chain that changes whenever a pattern, action or their order changes """
+    digest = hashlib.sha256()
+    for filtr in filters:
+        digest.update(str(filtr).encode('utf-8') + b'\0')
+    return digest.hexdigest()
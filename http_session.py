@@ -0,0 +1,207 @@
+"""Module for the HTTP layer used by all URL source calendars.
+An HTTPSession holds the default headers and timeout and sends its requests through a Transport.
+The default transport is a pooled requests.Session, which keeps connections alive between fetches,
+and LocalTransport is a stand-in that serves responses from memory so fetching can be tested offline.
+requests is only imported once the first request is sent through the default transport.
+"""
+from abc import ABC, abstractmethod
+from typing import Callable, Iterator, Mapping
+import threading
+
+
+class FetchError(Exception):
+    """Raised when a source could not be fetched, e.g. on connection errors, timeouts or 4xx/5xx responses."""
+
+
+class Response(ABC):
+    """ABC for the responses returned by a Transport, must be closed after use (or used in a with statement)."""
+    status_code: int
+    headers: Mapping[str, str]
+
+    @abstractmethod
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        """Yields the (decompressed) body in chunks of at most chunk_size bytes.
+        raises FetchError if the connection fails while reading.
+        """
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'Response':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class Transport(ABC):
+    """ABC for sending GET requests."""
+    @abstractmethod
+    def get(self, url: str, headers: dict[str, str], timeout: float | None) -> Response:
+        """Sends a GET request and returns the response once the headers are received, the body is streamed.
+        raises FetchError if the request fails or the response code is 4xx/5xx.
+        """
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class RequestsTransport(Transport):
+    """Transport using a requests.Session with keep-alive connection pooling.
+    Responses with Content-Encoding gzip or deflate are decompressed while they are read.
+    """
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 4, max_retries: int = 0):
+        """ pool_connections is how many hosts to keep connection pools for
+        pool_maxsize is the largest number of connections to one host, more concurrent requests wait for a free connection
+        max_retries is how many times failed connections are retried """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.requests = requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+            pool_block=True,
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url: str, headers: dict[str, str], timeout: float | None) -> Response:
+        exceptions = self.requests.exceptions
+        try:
+            response = self.session.get(url, headers=headers, timeout=timeout, stream=True)
+            response.raise_for_status()  # Raises an HTTPError if the response code was unsuccessful
+        except exceptions.HTTPError as http_err:
+            raise FetchError(f"HTTP error occurred: {http_err}")  # Could be a 404 or 500 error, for example
+        except exceptions.ConnectionError as conn_err:
+            raise FetchError(f"Connection error occurred: {conn_err}")
+        except exceptions.Timeout as timeout_err:
+            raise FetchError(f"Timeout error occurred: {timeout_err}")
+        except exceptions.RequestException as req_err:
+            raise FetchError(f"An error occurred: {req_err}")
+
+        return _RequestsResponse(response, exceptions.RequestException)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class _RequestsResponse(Response):
+    """Response wrapping a streamed requests.Response."""
+    def __init__(self, response, request_exception: type[Exception]):
+        self.response = response
+        self.request_exception = request_exception
+        self.status_code = response.status_code
+        self.headers = response.headers
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        try:
+            yield from self.response.iter_content(chunk_size=chunk_size)
+        except self.request_exception as req_err:
+            raise FetchError(f"An error occurred while reading the response: {req_err}")
+
+    def close(self) -> None:
+        self.response.close()
+
+
+class LocalResponse(Response):
+    """Response served from memory."""
+    def __init__(self, status_code: int = 200, body: bytes | str = b'', headers: Mapping[str, str] | None = None):
+        self.status_code = status_code
+        self.body = body.encode('utf-8') if isinstance(body, str) else body
+        self.headers = dict(headers or {})
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+class LocalTransport(Transport):
+    """Stand-in transport that answers requests from memory without using the network.
+    Every request is recorded in self.requests as a tuple (url, headers, timeout).
+    """
+    def __init__(self, responses: Mapping[str, LocalResponse | Callable[[dict[str, str]], LocalResponse]] | None = None):
+        """ responses maps URLs to a response, or to a function taking the request headers and returning a response """
+        self.responses = dict(responses or {})
+        self.requests: list[tuple[str, dict[str, str], float | None]] = []
+        self._lock = threading.Lock()
+
+    def get(self, url: str, headers: dict[str, str], timeout: float | None) -> Response:
+        with self._lock:
+            self.requests.append((url, dict(headers), timeout))
+
+        try:
+            response = self.responses[url]
+        except KeyError:
+            raise FetchError(f"HTTP error occurred: 404 Not Found for url: {url}")
+        if callable(response):
+            response = response(headers)
+
+        if response.status_code >= 400:
+            raise FetchError(f"HTTP error occurred: {response.status_code} for url: {url}")
+        return response
+
+
+class HTTPSession:
+    """Class for the HTTP settings shared by source calendars: transport, default headers and timeout."""
+    DEFAULT_HEADERS = {
+        'Accept-Encoding': 'gzip, deflate',
+        'User-Agent': 'Schmanager',
+    }
+
+    def __init__(
+            self,
+            transport: Transport | None = None,
+            timeout: float | None = 30,
+            headers: Mapping[str, str] | None = None,
+        ):
+        """ transport is used to send the requests, if None a RequestsTransport is created on the first request
+        timeout is how many seconds to wait for the server when the request doesnt say otherwise, None waits forever
+        headers are added to every request on top of DEFAULT_HEADERS """
+        self._transport = transport
+        self._transport_lock = threading.Lock()
+        self.timeout = timeout
+        self.headers = {**self.DEFAULT_HEADERS, **(headers or {})}
+
+    @property
+    def transport(self) -> Transport:
+        with self._transport_lock:
+            if self._transport is None:
+                self._transport = RequestsTransport()
+            return self._transport
+
+    def get(self, url: str, headers: Mapping[str, str] | None = None, timeout: float | None = None) -> Response:
+        """Sends a GET request with the session headers and headers, the body of the response is streamed.
+        timeout overrides the session timeout if not None.
+        raises FetchError if the request fails or the response code is 4xx/5xx.
+        """
+        return self.transport.get(
+            url,
+            {**self.headers, **(headers or {})},
+            self.timeout if timeout is None else timeout,
+        )
+
+    def close(self) -> None:
+        """Closes the transport and all its pooled connections."""
+        with self._transport_lock:
+            if self._transport is not None:
+                self._transport.close()
+                self._transport = None
+
+
+_default_session = HTTPSession()
+
+
+def get_default_session() -> HTTPSession:
+    """Returns the session used by source calendars that dont have their own."""
+    return _default_session
+
+
+def set_default_session(session: HTTPSession) -> None:
+    """Replaces the session used by source calendars that dont have their own, e.g. to set timeouts or a LocalTransport."""
+    global _default_session
+    _default_session = session
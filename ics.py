@@ -0,0 +1,227 @@
+"""Module for reading and writing iCalendar (.ics) data as a stream.
+Input is any iterable of str or bytes chunks, e.g. an open file, a socket or a response stream,
+and only the line currently being read is kept in memory.
+Output is written one content line at a time, folded to 75 octets and ended with CRLF as RFC 5545 says.
+"""
+import codecs
+import io
+import re
+from typing import IO, Iterable, Iterator
+
+from cal import Calendar, Event
+from atomic_write import open_atomic
+
+
+Chunks = Iterable[str | bytes]
+
+
+def iter_raw_lines(chunks: Chunks, encoding: str = 'utf-8') -> Iterator[str]:
+    """Yields every physical line in chunks without its line ending.
+    Both CRLF and LF line endings are accepted and bytes chunks are decoded with encoding,
+    chunks may split lines, line endings and multi byte characters anywhere.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    buffer = ''
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        buffer += chunk
+        if '\n' not in chunk:
+            continue
+
+        lines = buffer.split('\n')
+        buffer = lines.pop()
+        for line in lines:
+            yield line.removesuffix('\r')
+
+    buffer += decoder.decode(b'', final=True)
+    if buffer:
+        yield buffer.removesuffix('\r')
+
+
+def iter_lines(chunks: Chunks, encoding: str = 'utf-8') -> Iterator[str]:
+    """Yields every unfolded content line in chunks, empty lines are skipped.
+    A line starting with a space or a tab is a continuation of the line before it,
+    continuations after an empty line or at the start of chunks have no line to continue and are skipped.
+    """
+    current = None
+    for line in iter_raw_lines(chunks, encoding):
+        if line[:1] in (' ', '\t'):
+            if current is not None:
+                current += line[1:]
+            continue
+
+        if current is not None:
+            yield current
+        current = line or None
+
+    if current is not None:
+        yield current
+
+
+def iter_events(chunks: Chunks, calendar_info: dict[str, str] | None = None, encoding: str = 'utf-8') -> Iterator[Event]:
+    """Yields the VEVENTS of the first VCALENDAR in chunks one at a time as cal.Event objects.
+    If calendar_info is given, the properties of the VCALENDAR itself (e.g. X-PUBLISHED-TTL) are written to it.
+    Other components, e.g. VTIMEZONE or a VALARM inside a VEVENT, are skipped.
+    raises ValueError if a line cant be read or if chunks has no complete VCALENDAR.
+    """
+    if calendar_info is None:
+        calendar_info = {}
+    event_info: dict[str, str] | None = None
+    started_cal = False
+    nested = 0
+
+    for line in iter_lines(chunks, encoding):
+        try:
+            field, content = line.split(':', 1)
+        except ValueError:
+            raise ValueError(f'ics line could not be read, should be in format FIELD:CONTENT: {line}')
+
+        if not started_cal:
+            if (field.lstrip('\ufeff'), content) == ('BEGIN', 'VCALENDAR'):
+                started_cal = True
+            continue
+
+        match field, content:
+            case 'BEGIN', 'VEVENT' if event_info is None and nested == 0:
+                event_info = {}
+            case 'END', 'VEVENT' if event_info is not None and nested == 0:
+                yield Event(event_info)
+                event_info = None
+            case 'END', 'VCALENDAR' if event_info is None and nested == 0:
+                return
+            case 'BEGIN', _:
+                nested += 1
+            case 'END', _ if nested > 0:
+                nested -= 1
+            case _:
+                if nested:
+                    continue
+                if event_info is not None:
+                    event_info[field] = content
+                else:
+                    calendar_info[field] = content
+
+    raise ValueError('ics data could not be read or had no complete VCALENDAR')
+
+
+def read_calendar(chunks: Chunks | str | bytes, calendar_info: dict[str, str] | None = None) -> Calendar:
+    """Returns the first VCALENDAR in chunks with all its VEVENTS as a cal.Calendar.
+    chunks may also be the whole ics data as one str or bytes object.
+    raises ValueError if chunks could not be read or had no VCALENDAR.
+    """
+    if isinstance(chunks, (str, bytes)):
+        chunks = (chunks,)
+    return Calendar(iter_events(chunks, calendar_info))
+
+
+_DURATION = re.compile(
+    r'(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?'
+    r'(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?'
+)
+
+
+def parse_duration(duration: str) -> int:
+    """Returns the number of seconds in an iCalendar duration like 'PT20M', 'P1D' or '-PT1H30M'.
+    raises ValueError if duration is not in that format.
+    """
+    match = _DURATION.fullmatch(duration.strip())
+    if match is None or not any(match.group(unit) for unit in ('weeks', 'days', 'hours', 'minutes', 'seconds')):
+        raise ValueError(f'duration could not be interpreted, should be in format [+-]PnWnDTnHnMnS: {duration}')
+
+    seconds = 0
+    for unit, unit_seconds in (('weeks', 604800), ('days', 86400), ('hours', 3600), ('minutes', 60), ('seconds', 1)):
+        seconds += int(match.group(unit) or 0) * unit_seconds
+    return -seconds if match.group('sign') == '-' else seconds
+
+
+MAX_LINE_OCTETS = 75
+DEFAULT_CALENDAR_INFO = {
+    'VERSION': '2.0',
+    'PRODID': '-//Schmanager//Schmanager//EN',
+    'CALSCALE': 'GREGORIAN',
+}
+
+
+def fold_line(line: str) -> str:
+    """Returns line folded into lines of at most 75 octets, each ended with CRLF.
+    Continuation lines start with a space and multi byte characters are never split.
+    """
+    encoded = line.encode('utf-8')
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line + '\r\n'
+
+    parts = []
+    start = 0
+    limit = MAX_LINE_OCTETS
+    while len(encoded) - start > limit:
+        end = start + limit
+        # step back to the start of a character if end is inside one
+        while (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode('utf-8'))
+        start = end
+        limit = MAX_LINE_OCTETS - 1
+    parts.append(encoded[start:].decode('utf-8'))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def iter_ics(events: Iterable[Event], calendar_info: dict[str, str] | None = None) -> Iterator[str]:
+    """Yields a VCALENDAR with all events as folded ics text, one content line at a time.
+    calendar_info are the properties of the VCALENDAR, VERSION and PRODID are added if missing.
+    Field texts are written as they are, they should already be escaped like the texts read by iter_events,
+    only raw line breaks are escaped to \\n since they cant be written in a content line.
+    """
+    yield fold_line('BEGIN:VCALENDAR')
+    for field, content in {**DEFAULT_CALENDAR_INFO, **(calendar_info or {})}.items():
+        yield fold_line(f'{field}:{_escape_line_breaks(content)}')
+
+    for event in events:
+        yield fold_line('BEGIN:VEVENT')
+        for field in event.get_fields():
+            yield fold_line(f'{field}:{_escape_line_breaks(event.get_field_text(field))}')
+        yield fold_line('END:VEVENT')
+
+    yield fold_line('END:VCALENDAR')
+
+
+def _escape_line_breaks(text: str) -> str:
+    if '\n' in text or '\r' in text:
+        return text.replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    return text
+
+
+def _is_binary(stream: IO) -> bool:
+    """ returns True if stream takes bytes, streams that arent io classes are asked by writing an empty str to them """
+    if isinstance(stream, io.TextIOBase):
+        return False
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+    try:
+        stream.write('')
+    except TypeError:
+        return True
+    return False
+
+
+def write_ics(
+        stream: IO,
+        events: Iterable[Event],
+        calendar_info: dict[str, str] | None = None,
+        binary: bool | None = None,
+    ) -> None:
+    """Writes a VCALENDAR with all events to stream one line at a time, see iter_ics.
+    stream may be a binary stream or a text stream, a text file should be opened with newline='' to keep the CRLFs.
+    binary says if stream takes bytes (utf-8) or str, if None it is found out from stream.
+    events may be any iterable, e.g. UnbuiltCal.iter_events(), and is only read as far as it has been written.
+    """
+    if binary is None:
+        binary = _is_binary(stream)
+    for line in iter_ics(events, calendar_info):
+        stream.write(line.encode('utf-8') if binary else line)
+
+
+def write_ics_file(path: str, events: Iterable[Event], calendar_info: dict[str, str] | None = None) -> None:
+    """Writes a VCALENDAR with all events to the file at path, the file is replaced in one atomic step when done."""
+    with open_atomic(path, 'wb') as file:
+        write_ics(file, events, calendar_info, binary=True)
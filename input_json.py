@@ -2,6 +2,7 @@ import json
 from typing import Iterable
 
 from cal_raw import UnbuiltCal
+from fetch_cache import FetchCache
 import cal
 import src_cal
 import filter
@@ -22,16 +23,16 @@ class InputJSON():
             raise ValueError(f'invalid file_name "{file_path}", wasnt able to read or parse')
         
     @staticmethod
-    def _get_src_cals(data) -> Iterable[src_cal.SrcCal]:
+    def _get_src_cals(data, cache: FetchCache | None = None) -> Iterable[src_cal.SrcCal]:
         """ returns the src_cals from data
-        data should be a parsed json file """
+        data should be a parsed json file, cache is given to every url source (see src_cal.SrcCalURL) """
         src_cals = []
         src_cals_list = data['src_cals']
         i = 0
         while i < len(src_cals_list):
             match src_cals_list[i]:
                 case 'url':
-                    src_cals.append(src_cal.SrcCalURL(src_cals_list[i+1]))
+                    src_cals.append(src_cal.SrcCalURL(src_cals_list[i+1], cache))
                     i += 3
 
         return src_cals
@@ -141,9 +142,10 @@ class InputJSON():
         return filters
 
     @classmethod
-    def get_unbuilt_cal(cls, file_name: str) -> UnbuiltCal:
+    def get_unbuilt_cal(cls, file_name: str, cache: FetchCache | None = None) -> UnbuiltCal:
+        """ returns the unbuilt calendar of the json file at file_name, fetched sources are cached in cache if not None """
         data = cls._read_file(file_name)
-        src_cals = cls._get_src_cals(data)
+        src_cals = cls._get_src_cals(data, cache)
         filters = cls._get_filters(data)
         return UnbuiltCal(src_cals, filters)
 
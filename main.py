@@ -1,25 +1,30 @@
+import sys
+
 import cal
 import cal_raw
 import src_cal
 import input_json
 import output_week
-from kivy_main_menu import MainMenuApp
+import snapshot
+from fetch_cache import DEFAULT_CACHE
 
 
-if __name__ == '__main__':
-    unbuilt_school_calendar = input_json.InputJSON().get_unbuilt_cal('input_24HT2.json')
-    school_calendar = unbuilt_school_calendar.build()
-    src_school_calendar = src_cal.SrcCalCalendar(school_calendar)
+SNAPSHOT_PATH = 'schedule.snapshot'
+
 
+def get_unbuilt_calendar() -> cal_raw.UnbuiltCal:
+    """ returns the school calendar combined with the private calendar if there is one, each with its own filters """
+    unbuilt_school_calendar = input_json.InputJSON().get_unbuilt_cal('input_24HT2.json', DEFAULT_CACHE)
+    src_cals = [cal_raw.SrcCalUnbuilt(unbuilt_school_calendar)]
     try:
-        unbuild_private_calendar = input_json.InputJSON().get_unbuilt_cal('input_private_calendar.json')
-        private_calendar = unbuild_private_calendar.build()
-        src_private_calendar = src_cal.SrcCalCalendar(private_calendar)
-        unbuilt_calendar = cal_raw.UnbuiltCal((src_school_calendar, src_private_calendar), [])
-        calendar = unbuilt_calendar.build()
-    except:
-        calendar = school_calendar
+        unbuild_private_calendar = input_json.InputJSON().get_unbuilt_cal('input_private_calendar.json', DEFAULT_CACHE)
+        src_cals.append(cal_raw.SrcCalUnbuilt(unbuild_private_calendar))
+    except ValueError:
+        pass
+    return cal_raw.UnbuiltCal(src_cals, [])
 
+
+def write_week(calendar: cal.Calendar) -> None:
     output_week.OutputWeek(
         [
             cal.Time(2024, 11, 25, 0, 0),
@@ -31,7 +36,21 @@ if __name__ == '__main__':
             cal.Time(2024, 12, 1, 0, 0),
         ],
         calendar,
-        'output_week.html'     
+        'output_week.html'
     ).write_to_file()
 
-    MainMenuApp().run()
\ No newline at end of file
+
+if __name__ == '__main__':
+    # with arguments run headless, see cli.py
+    if len(sys.argv) > 1:
+        import cli
+        sys.exit(cli.main())
+
+    # the last good schedule is written right away and again after every rebuild in the background
+    daemon = snapshot.start_from_snapshot(get_unbuilt_calendar(), SNAPSHOT_PATH, [write_week])
+
+    from kivy_main_menu import MainMenuApp
+    try:
+        MainMenuApp().run()
+    finally:
+        daemon.stop()
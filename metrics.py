@@ -0,0 +1,145 @@
+"""Module for optional build metrics.
+Give UnbuiltCal.build (or iter_events) a BuildMetrics to find out where a build spends its time:
+how many events every source gave and how long it took to fetch and parse, and for every filter the events in and out,
+how many matched its pattern and the time spent in its pattern and action.
+Without a BuildMetrics nothing is measured and the filters run exactly as before.
+"""
+import time
+from typing import Iterable, Iterator
+
+from cal import Event
+
+
+class FetchMetrics:
+    """Class for the timing of one fetch of a SrcCalURL.
+    Parsing is done while the body is read, so fetch_seconds is the time spent waiting for the server
+    (the request and reading the body) and parse_seconds is the rest of the time spent reading the calendar.
+    """
+    def __init__(self, origin: str, fetch_seconds: float = 0.0, parse_seconds: float = 0.0):
+        """ origin is where the calendar came from: 'cache', 'not_modified' (a 304 response) or 'network' """
+        self.origin = origin
+        self.fetch_seconds = fetch_seconds
+        self.parse_seconds = parse_seconds
+
+    def to_dict(self) -> dict:
+        return {'origin': self.origin, 'fetch_seconds': self.fetch_seconds, 'parse_seconds': self.parse_seconds}
+
+
+class SourceMetrics:
+    """Class for the metrics of one source calendar in a build."""
+    def __init__(self, name: str):
+        self.name = name
+        self.events = 0
+        self.fetch: FetchMetrics | None = None
+
+    def count(self, events: Iterable[Event]) -> Iterator[Event]:
+        """ yields events and counts them """
+        for event in events:
+            self.events += 1
+            yield event
+
+    def to_dict(self) -> dict:
+        return {'source': self.name, 'events': self.events, 'fetch': None if self.fetch is None else self.fetch.to_dict()}
+
+
+class FilterMetrics:
+    """Class for the metrics of one filter in a build."""
+    def __init__(self, index: int, name: str):
+        """ index is the position of the filter in the chain and name a one line description of it """
+        self.index = index
+        self.name = name
+        self.events_in = 0
+        self.events_out = 0
+        self.matches = 0
+        self.pattern_seconds = 0.0
+        self.action_seconds = 0.0
+
+    def get_match_rate(self) -> float:
+        return self.matches / self.events_in if self.events_in else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'filter': self.index,
+            'name': self.name,
+            'events_in': self.events_in,
+            'events_out': self.events_out,
+            'matches': self.matches,
+            'match_rate': self.get_match_rate(),
+            'pattern_seconds': self.pattern_seconds,
+            'action_seconds': self.action_seconds,
+        }
+
+
+class BuildMetrics:
+    """Class for the metrics of one build, filled in by UnbuiltCal.iter_events.
+    A BuildMetrics should only be used for one build, use a new one for every build.
+    """
+    def __init__(self):
+        self.sources: list[SourceMetrics] = []
+        self.filters: list[FilterMetrics] = []
+        self.events_filtered = 0
+        self.events_reused = 0
+        self.events_out = 0
+        self.fetch_seconds = 0.0
+        self.build_seconds = 0.0
+
+    def add_source(self, name: str) -> SourceMetrics:
+        source = SourceMetrics(name)
+        self.sources.append(source)
+        return source
+
+    def add_filter(self, name: str) -> FilterMetrics:
+        filter_metrics = FilterMetrics(len(self.filters), name)
+        self.filters.append(filter_metrics)
+        return filter_metrics
+
+    def get_slowest_filters(self, count: int = 5) -> list[FilterMetrics]:
+        """Returns the count filters with the most time spent in their pattern and action, slowest first."""
+        return sorted(self.filters, key=lambda filtr: filtr.pattern_seconds + filtr.action_seconds, reverse=True)[:count]
+
+    def to_dict(self) -> dict:
+        """Returns the metrics as a dict of plain values, ready for json."""
+        return {
+            'build_seconds': self.build_seconds,
+            'fetch_seconds': self.fetch_seconds,
+            'events_filtered': self.events_filtered,
+            'events_reused': self.events_reused,
+            'events_out': self.events_out,
+            'sources': [source.to_dict() for source in self.sources],
+            'filters': [filtr.to_dict() for filtr in self.filters],
+        }
+
+    def __str__(self, tabs: int = 0):
+        name = '\t' * tabs + 'Build Metrics:\n'
+        name += '\t' * (tabs+1) + f'build {self.build_seconds:.4f} s, fetch {self.fetch_seconds:.4f} s\n'
+        name += '\t' * (tabs+1) + f'events filtered {self.events_filtered}, reused {self.events_reused}, out {self.events_out}\n'
+
+        name += '\t' * (tabs+1) + 'Sources:\n'
+        for source in self.sources:
+            name += '\t' * (tabs+2) + f'{source.name}: {source.events} events'
+            if source.fetch is not None:
+                name += f', {source.fetch.origin}, fetch {source.fetch.fetch_seconds:.4f} s, parse {source.fetch.parse_seconds:.4f} s'
+            name += '\n'
+
+        name += '\t' * (tabs+1) + 'Filters:\n'
+        for filtr in self.filters:
+            name += '\t' * (tabs+2) + (
+                f'{filtr.index}: in {filtr.events_in}, out {filtr.events_out}, matches {filtr.matches}, '
+                f'pattern {filtr.pattern_seconds:.4f} s, action {filtr.action_seconds:.4f} s, {filtr.name}\n'
+            )
+        return name
+
+
+def measure_reads(chunks: Iterable[bytes], fetch: FetchMetrics) -> Iterator[bytes]:
+    """ yields chunks and adds the time spent waiting for every chunk to fetch.fetch_seconds """
+    perf_counter = time.perf_counter
+    iterator = iter(chunks)
+    while True:
+        start = perf_counter()
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            fetch.fetch_seconds += perf_counter() - start
+            return
+        fetch.fetch_seconds += perf_counter() - start
+        yield chunk
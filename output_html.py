@@ -0,0 +1,112 @@
+"""Module with the base class for html outputs.
+Pages are written tag by tag to a text stream, which can be an in memory buffer, an open file or a socket.
+"""
+import io
+from abc import ABC, abstractmethod
+from typing import TextIO
+
+from atomic_write import write_atomic
+
+
+class OutputHTML(ABC):
+    """ ABC for outputs writing one html page """
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self._stream: TextIO | None = None
+
+    def _write(self, text: str, tabs: int = 0, new_line: bool = False) -> None:
+        """ writes text to the output stream \n
+        writes tabs amount of tabs before text \n
+        if new_line, then writes a \\n at end of text """
+        self._stream.write('\t' * tabs + text + '\n' * new_line)
+
+    def _write_tag(
+            self, 
+            tag_name: str, 
+            properties: dict[str, str] = {}, 
+            closed = False, 
+            tabs: int = 0, 
+            new_line: bool = False
+        ) -> None:
+        """ writes html tag to file \n
+        tag_name is the html tag eg. 'div', 'p', 'h3', etc. \n
+        properties are key-value pairs inside the tag like {'style': 'width: 10px;', 'class'='my-class'} \n
+        if closed is True, a slash '/' is writen before tag_name to close the element \n
+        writes tabs amount of tabs before tag \n
+        if new_line, then writes a \\n at end of tag """
+        tag = '<'
+        if closed:
+            tag += '/'
+        tag += tag_name
+        for key, val in properties.items():
+            tag += ' ' + key + '="' + val + '"'
+        tag += '>'
+
+        self._write(tag, tabs, new_line)
+
+    def _write_open_closed_tag(
+            self, 
+            tag_name: str, 
+            properties: dict[str, str] = {}, 
+            content: str = '', 
+            tabs: int = 0,
+            new_line: bool = True
+        ) -> None:
+        """ writes html open tag, then content and finally a closing tag on one line \n
+        tag_name is the html tag eg. 'div', 'p', 'h3', etc. \n
+        properties are key-value pairs inside the tag like {'style': 'width: 10px;', 'class'='my-class'} \n
+        content is the text writen between opening and closing tags \n
+        writes tabs amount of tabs before tags \n
+        if new_line, then writes a \\n at end of tags """
+        self._write_tag(tag_name, properties, tabs=tabs)
+        self._write(content)
+        self._write_tag(tag_name, closed=True, new_line=new_line)
+
+    def _write_header(self) -> None:
+        """ writes the Doctype and opening html tags """
+        self._write_tag('!Doctype html', new_line=True)
+        self._write_tag('html', {'lang': 'sv'}, new_line=True)
+
+    def _write_head(self, title: str|None = None, style_sheets: list[str] = []) -> None:
+        """ writes the head of the html document \n
+        title is the title inbetween the title tags \n
+        style_sheets is a list of all style sheets that should be linked to the document """
+        self._write_tag('head', new_line=True)
+        self._write_tag('meta', {'charset': 'UTF-8'}, tabs=1, new_line=True)
+        self._write_open_closed_tag('title', content=title, tabs=1)
+
+        for style_sheet in style_sheets:
+            self._write_open_closed_tag('link', {'rel': 'stylesheet', 'href': style_sheet}, tabs=1)
+
+        self._write_tag('head', closed=True, new_line=True)
+
+    @abstractmethod
+    def _write_document(self) -> int:
+        """ writes the whole html document
+        returns how many tabs are on the last line, which is 0 if every tag was closed """
+        pass
+
+    def render(self, stream: TextIO) -> None:
+        """ writes the page as html to stream, any writable text stream like an open file, socket file or io.StringIO """
+        self._stream = stream
+        try:
+            tabs = self._write_document()
+        finally:
+            self._stream = None
+
+        if tabs != 0:
+            if tabs > 0:
+                print('you forgot to close a tag')
+            else:
+                print('you closed one too many tags')
+
+    def render_to_string(self) -> str:
+        """ returns the page as html """
+        buffer = io.StringIO()
+        self.render(buffer)
+        return buffer.getvalue()
+
+    def write_to_file(self) -> None:
+        """ writes out the page to the html file
+        the page is rendered in memory and then written in one atomic step, so the file is never half written """
+        write_atomic(self.file_name, self.render_to_string())
@@ -0,0 +1,131 @@
+"""Module for rendering every week of a term at once.
+The events of every week are queried from the index of the calendar, then one html page is written per week,
+with arrows to the previous and next week, together with an index page linking all weeks.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import cal
+from atomic_write import write_atomic
+from output_html import OutputHTML
+from output_week import OutputWeek
+
+
+def _render_page(page: OutputHTML) -> str:
+    """ renders one page, used by the worker processes of OutputTerm.write_to_files """
+    return page.render_to_string()
+
+
+class OutputTermIndex(OutputHTML):
+    """ Class for the index page listing all weeks of a term """
+    def __init__(self, weeks: list[tuple[str, str, int]], file_name: str, title: str = 'Schema', style_sheets: list[str] = []):
+        """ weeks are (name, href, number of events) for every week """
+        super().__init__(file_name)
+        self.weeks = weeks
+        self.title = title
+        self.style_sheets = style_sheets
+
+    def _write_document(self) -> int:
+        self._write_header()
+        self._write_head(self.title, self.style_sheets)
+
+        tabs = 0
+        self._write_tag('body', tabs=tabs, new_line=True)
+        tabs += 1
+
+        self._write_open_closed_tag('h1', content=self.title, tabs=tabs)
+        self._write_tag('ul', {'class': 'index-list'}, tabs=tabs, new_line=True)
+        tabs += 1
+        for name, href, event_count in self.weeks:
+            self._write_tag('li', tabs=tabs)
+            self._write_open_closed_tag('a', {'href': href}, name, new_line=False)
+            self._write(f' ({event_count})')
+            self._write_tag('li', closed=True, new_line=True)
+        tabs -= 1
+        self._write_tag('ul', closed=True, tabs=tabs, new_line=True)
+
+        tabs -= 1
+        self._write_tag('body', closed=True, new_line=True)
+        return tabs
+
+
+class OutputTerm:
+    """ Class for writing one html page for every week between two days and an index page """
+    INDEX_FILE_NAME = 'index.html'
+
+    def __init__(
+            self,
+            first_day: cal.Time,
+            last_day: cal.Time,
+            calendar: cal.Calendar,
+            directory: str = 'output_term',
+            style_sheet: str = 'output_week.css',
+            title: str = 'Schema',
+        ):
+        """ every week from the week of first_day to the week of last_day is rendered \n
+        pages are written to directory and link to style_sheet, a path relative to the current directory """
+        self.directory = directory
+        self.style_sheet = style_sheet
+        self.title = title
+
+        first_monday = first_day.ordinal() - first_day.weekday()
+        last_monday = last_day.ordinal() - last_day.weekday()
+        self.mondays = [cal.Time.from_ordinal(ordinal) for ordinal in range(first_monday, last_monday + 1, 7)]
+        self.week_events = self._get_week_events(calendar)
+
+    def _get_week_events(self, calendar: cal.Calendar) -> list[list[cal.Event]]:
+        """ returns the events of every week, an event belongs to every week it overlaps, as in OutputWeek
+        every week is queried from the index of calendar, so the events come sorted by start time """
+        return [calendar.query(monday, monday + timedelta(days=7)) for monday in self.mondays]
+
+    @staticmethod
+    def get_week_name(monday: cal.Time) -> str:
+        year, week, _ = date.fromordinal(monday.ordinal()).isocalendar()
+        return f'{year}-W{week:02}'
+
+    def get_file_name(self, monday: cal.Time) -> str:
+        return f'week_{self.get_week_name(monday)}.html'
+
+    def get_pages(self) -> list[OutputHTML]:
+        """ returns the page of every week followed by the index page """
+        style_sheets = [os.path.relpath(self.style_sheet, self.directory).replace(os.sep, '/')]
+        pages: list[OutputHTML] = []
+
+        for i, (monday, events) in enumerate(zip(self.mondays, self.week_events)):
+            links = {'index': self.INDEX_FILE_NAME}
+            if i > 0:
+                links['prev'] = self.get_file_name(self.mondays[i - 1])
+            if i < len(self.mondays) - 1:
+                links['next'] = self.get_file_name(self.mondays[i + 1])
+
+            pages.append(OutputWeek(
+                [monday + timedelta(days=day) for day in range(7)],
+                cal.Calendar(events),
+                os.path.join(self.directory, self.get_file_name(monday)),
+                query=False,
+                title=f'{self.title} {self.get_week_name(monday)}',
+                style_sheets=style_sheets,
+                links=links,
+            ))
+
+        weeks = [
+            (self.get_week_name(monday), self.get_file_name(monday), len(events))
+            for monday, events in zip(self.mondays, self.week_events)
+        ]
+        pages.append(OutputTermIndex(weeks, os.path.join(self.directory, self.INDEX_FILE_NAME), self.title, style_sheets))
+        return pages
+
+    def write_to_files(self, processes: int | None = None) -> None:
+        """ writes every week page and the index page to self.directory, every file is written atomically \n
+        if processes is more than 1, the pages are rendered in that many worker processes """
+        pages = self.get_pages()
+        if processes is not None and processes > 1:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                rendered = list(executor.map(_render_page, pages, chunksize=max(1, len(pages) // (processes * 4))))
+        else:
+            rendered = [page.render_to_string() for page in pages]
+
+        os.makedirs(self.directory, exist_ok=True)
+        for page, html in zip(pages, rendered):
+            write_atomic(page.file_name, html)
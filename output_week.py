@@ -1,94 +1,31 @@
 import cal
-import cal_raw
-import filter
-import pattern
-import action
-import src_cal
+from output_html import OutputHTML
 
 
-class OutputWeek:
-    def __init__(self, week_range: list[cal.Time], calendar: cal.Calendar, file_name: str = 'output_week.html'):
+class OutputWeek(OutputHTML):
+    def __init__(
+            self,
+            week_range: list[cal.Time],
+            calendar: cal.Calendar,
+            file_name: str = 'output_week.html',
+            query: bool = True,
+            title: str = 'Schema',
+            style_sheets: list[str] = ['output_week.css'],
+            links: dict[str, str] | None = None,
+        ):
+        """ week_range is the start of every day in the week \n
+        if query, the events of the week are picked out of calendar, otherwise calendar should only hold the week's events \n
+        links are hrefs for the navigation bar with the keys 'prev', 'index' and 'next', if None no navigation bar is written """
         self.week_range = week_range
+        if query:
+            self.calendar = cal.Calendar(calendar.query(week_range[0], week_range[-1]))
+        else:
+            self.calendar = calendar
 
-        patrn = pattern.PatternNot(pattern.PatternInTime(week_range[0], week_range[-1]))
-        act = action.ActionRemoveEvent()
-        filtr = filter.Filter(patrn, act)
-        src_calendar = src_cal.SrcCalCalendar(calendar)
-        self.calendar = cal_raw.UnbuiltCal([src_calendar], [filtr]).build()
-
-        self.file_name = file_name
-
-    def _clear_file(self) -> None:
-        """ clears the file of any content, if file doesnt exist, file is created. """
-        with open(self.file_name, 'w') as file:
-            file.write('')
-
-    def _write(self, text: str, tabs: int = 0, new_line: bool = False) -> None:
-        """ writes text to file \n
-        writes tabs amount of tabs before text \n
-        if new_line, then writes a \\n at end of text """
-        with open(self.file_name, 'a', encoding='utf-8') as file:
-            file.write('\t' * tabs + text + '\n' * new_line)
-
-    def _write_tag(
-            self, 
-            tag_name: str, 
-            properties: dict[str, str] = {}, 
-            closed = False, 
-            tabs: int = 0, 
-            new_line: bool = False
-        ) -> None:
-        """ writes html tag to file \n
-        tag_name is the html tag eg. 'div', 'p', 'h3', etc. \n
-        properties are key-value pairs inside the tag like {'style': 'width: 10px;', 'class'='my-class'} \n
-        if closed is True, a slash '/' is writen before tag_name to close the element \n
-        writes tabs amount of tabs before tag \n
-        if new_line, then writes a \\n at end of tag """
-        tag = '<'
-        if closed:
-            tag += '/'
-        tag += tag_name
-        for key, val in properties.items():
-            tag += ' ' + key + '="' + val + '"'
-        tag += '>'
-
-        self._write(tag, tabs, new_line)
-
-    def _write_open_closed_tag(
-            self, 
-            tag_name: str, 
-            properties: dict[str, str] = {}, 
-            content: str = '', 
-            tabs: int = 0,
-            new_line: bool = True
-        ) -> None:
-        """ writes html open tag, then content and finally a closing tag on one line \n
-        tag_name is the html tag eg. 'div', 'p', 'h3', etc. \n
-        properties are key-value pairs inside the tag like {'style': 'width: 10px;', 'class'='my-class'} \n
-        content is the text writen between opening and closing tags \n
-        writes tabs amount of tabs before tags \n
-        if new_line, then writes a \\n at end of tags """
-        self._write_tag(tag_name, properties, tabs=tabs)
-        self._write(content)
-        self._write_tag(tag_name, closed=True, new_line=new_line)
-
-    def _write_header(self) -> None:
-        """ writes the Doctype and opening html tags """
-        self._write_tag('!Doctype html', new_line=True)
-        self._write_tag('html', {'lang': 'sv'}, new_line=True)
-
-    def _write_head(self, title: str|None = None, style_sheets: list[str] = []) -> None:
-        """ writes the head of the html document \n
-        title is the title inbetween the title tags \n
-        style_sheets is a list of all style sheets that should be linked to the document """
-        self._write_tag('head', new_line=True)
-        self._write_tag('meta', {'charset': 'UTF-8'}, tabs=1, new_line=True)
-        self._write_open_closed_tag('title', content=title, tabs=1)
-
-        for style_sheet in style_sheets:
-            self._write_open_closed_tag('link', {'rel': 'stylesheet', 'href': style_sheet}, tabs=1)
-
-        self._write_tag('head', closed=True, new_line=True)
+        super().__init__(file_name)
+        self.title = title
+        self.style_sheets = style_sheets
+        self.links = links
 
     def _write_day_headers(
             self,
@@ -114,18 +51,34 @@ class OutputWeek:
         tabs -= 1
         self._write_tag('div', closed=True, tabs=tabs, new_line=True)
 
+    def _write_nav(
+            self,
+            container_properties = {'class': 'week-nav'},
+            contents = (('prev', '&larr;'), ('index', 'Alla veckor'), ('next', '&rarr;')),
+            tabs: int = 0,
+        ) -> None:
+        """ writes the navigation bar with a link for every key of contents that is in self.links """
+        self._write_tag('nav', container_properties, tabs=tabs, new_line=True)
+        tabs += 1
+        for key, content in contents:
+            if key in self.links:
+                self._write_open_closed_tag('a', {'class': 'week-nav-' + key, 'href': self.links[key]}, content, tabs)
+        tabs -= 1
+        self._write_tag('nav', closed=True, tabs=tabs, new_line=True)
+
     def _write_before_events(self) -> None:
         """ writes all html that goes before calendar events 
         returns how many tabs are on the last line """
-        self._clear_file()
-
         self._write_header()
-        self._write_head('Schema', ['output_week.css'])
+        self._write_head(self.title, self.style_sheets)
 
         tabs = 0
 
         self._write_tag('body', tabs=tabs, new_line=True)
         tabs += 1
+
+        if self.links is not None:
+            self._write_nav(tabs=tabs)
         
         self._write_tag('div', {'class': 'schedule'}, tabs=tabs, new_line=True)
         tabs += 1
@@ -249,19 +202,12 @@ class OutputWeek:
         return tabs
 
 
-    def write_to_file(self) -> None:
-        """ writes out the week of events to the html file """
+    def _write_document(self) -> int:
         tabs = self._write_before_events()
 
         self._write_events(tabs)
 
-        tabs = self._write_after_events(tabs)
-
-        if tabs != 0:
-            if tabs > 0:
-                print('you forgot to close a tag')
-            else:
-                print('you closed one too many tags')
+        return self._write_after_events(tabs)
 
 
 if __name__ == '__main__':
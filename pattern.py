@@ -1,7 +1,11 @@
-from typing import Iterable
+from typing import Callable, Iterable, Iterator
 from abc import ABC, abstractmethod
 
 from cal import Event, Time
+from text_match import TextMatcher
+
+
+CompiledPattern = Callable[[Event], bool]
 
 
 class Pattern(ABC):
@@ -9,6 +13,16 @@ class Pattern(ABC):
     def resolve(self, event: Event) -> bool:
         pass
 
+    def compile(self, text_matcher: TextMatcher | None = None) -> CompiledPattern:
+        """ returns a function that gives the same result as resolve
+        subclasses return flat closures with everything that doesnt depend on the event computed up front
+        PatternHasText patterns handled by text_matcher are resolved through it """
+        return self.resolve
+
+    def walk(self) -> Iterator['Pattern']:
+        """ yields the pattern and all patterns inside it """
+        yield self
+
     @abstractmethod
     def __str__(self, tabs: int = 0):
         return 'Pattern Object'
@@ -19,7 +33,29 @@ class PatternAnd(Pattern):
         self.patterns = [pattern for pattern in patterns]
 
     def resolve(self, event: Event):
-        return all([pattern.resolve(event) for pattern in self.patterns])
+        return all(pattern.resolve(event) for pattern in self.patterns)
+
+    def compile(self, text_matcher: TextMatcher | None = None) -> CompiledPattern:
+        compiled = [pattern.compile(text_matcher) for pattern in self.patterns]
+        if not compiled:
+            return lambda event: True
+        if len(compiled) == 1:
+            return compiled[0]
+        if len(compiled) == 2:
+            first, second = compiled
+            return lambda event: first(event) and second(event)
+
+        def resolve(event: Event) -> bool:
+            for pattern in compiled:
+                if not pattern(event):
+                    return False
+            return True
+        return resolve
+
+    def walk(self) -> Iterator[Pattern]:
+        yield self
+        for pattern in self.patterns:
+            yield from pattern.walk()
     
     def __str__(self, tabs: int = 0):
         name = tabs * '\t' + 'Pattern And:\n'
@@ -35,7 +71,29 @@ class PatternOr(Pattern):
         self.patterns = [pattern for pattern in patterns]
 
     def resolve(self, event: Event):
-        return any([pattern.resolve(event) for pattern in self.patterns])
+        return any(pattern.resolve(event) for pattern in self.patterns)
+
+    def compile(self, text_matcher: TextMatcher | None = None) -> CompiledPattern:
+        compiled = [pattern.compile(text_matcher) for pattern in self.patterns]
+        if not compiled:
+            return lambda event: False
+        if len(compiled) == 1:
+            return compiled[0]
+        if len(compiled) == 2:
+            first, second = compiled
+            return lambda event: first(event) or second(event)
+
+        def resolve(event: Event) -> bool:
+            for pattern in compiled:
+                if pattern(event):
+                    return True
+            return False
+        return resolve
+
+    def walk(self) -> Iterator[Pattern]:
+        yield self
+        for pattern in self.patterns:
+            yield from pattern.walk()
     
     def __str__(self, tabs: int = 0):
         name = tabs * '\t' + 'Pattern Or:\n'
@@ -52,6 +110,14 @@ class PatternNot(Pattern):
 
     def resolve(self, event: Event):
         return not self.pattern.resolve(event)
+
+    def compile(self, text_matcher: TextMatcher | None = None) -> CompiledPattern:
+        compiled = self.pattern.compile(text_matcher)
+        return lambda event: not compiled(event)
+
+    def walk(self) -> Iterator[Pattern]:
+        yield self
+        yield from self.pattern.walk()
     
     def __str__(self, tabs: int = 0):
         return tabs * '\t' + 'Pattern Not:\n' + self.pattern.__str__(tabs+1)
@@ -80,6 +146,38 @@ class PatternHasText(Pattern):
                 return True
 
         return False
+
+    def compile(self, text_matcher: TextMatcher | None = None) -> CompiledPattern:
+        if text_matcher is not None and text_matcher.has_pattern(self):
+            return text_matcher.compile(self)
+
+        text = self.text
+        if self.fields is None:
+            def resolve(event: Event) -> bool:
+                for field in event.get_fields():
+                    if text in event.get_field_text(field):
+                        return True
+                return False
+            return resolve
+
+        fields = tuple(dict.fromkeys(self.fields))
+        if not fields:
+            return lambda event: False
+        if len(fields) == 1:
+            field, = fields
+
+            def resolve_one(event: Event) -> bool:
+                field_text = event.find_field_text(field)
+                return field_text is not None and text in field_text
+            return resolve_one
+
+        def resolve(event: Event) -> bool:
+            for field in fields:
+                field_text = event.find_field_text(field)
+                if field_text is not None and text in field_text:
+                    return True
+            return False
+        return resolve
     
     def __str__(self, tabs: int = 0):
         name = tabs * '\t' + 'Pattern Has Text:\n'
@@ -106,6 +204,17 @@ class PatternInTime(Pattern):
             return event_start < self.time_end and event_end > self.time_start
         except ValueError:
             return False
+
+    def compile(self, text_matcher: TextMatcher | None = None) -> CompiledPattern:
+        start = self.time_start.as_minutes()
+        end = self.time_end.as_minutes()
+
+        def resolve(event: Event) -> bool:
+            try:
+                return event.get_start_time().as_minutes() < end and event.get_end_time().as_minutes() > start
+            except ValueError:
+                return False
+        return resolve
         
     def __str__(self, tabs: int = 0):
         name = tabs * '\t' + 'Pattern in Time:\n'
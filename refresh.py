@@ -0,0 +1,186 @@
+"""Module for keeping a built calendar up to date while the program runs.
+A RefreshDaemon refreshes every source of an UnbuiltCal on its own interval in a background thread,
+and when a source has changed it rebuilds the calendar once and hands it to every listener.
+"""
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from cal import Calendar
+from cal_raw import UnbuiltCal
+from src_cal import SrcCal
+
+
+Listener = Callable[[Calendar], None]
+
+
+class RefreshDaemon:
+    """Class for refreshing the sources of an UnbuiltCal in the background and rebuilding it when they change.
+    Listeners are called from the daemon thread, a GUI listener should hand the calendar over to its own main loop,
+    e.g. with kivy.clock.Clock.schedule_once. While the daemon runs it is the only one that should fetch or build unbuilt_cal.
+    """
+    MIN_INTERVAL = 30.0
+    RETRY_INTERVAL = 5 * 60.0
+
+    def __init__(
+            self,
+            unbuilt_cal: UnbuiltCal,
+            listeners: list[Listener] | None = None,
+            jitter: float = 0.1,
+            coalesce_delay: float = 2.0,
+            max_fetch_workers: int = 8,
+            on_error: Callable[[SrcCal | None, Exception], None] | None = None,
+            seed: int | None = None,
+        ):
+        """ listeners are called with the new calendar after every rebuild
+        every refresh interval is moved by a random part of at most jitter of itself, so sources with the same ttl spread out
+        coalesce_delay is how many seconds to wait after a change before rebuilding, changes within that time share one rebuild
+        on_error is called with the source and exception when a refresh fails, the source is then retried after
+        at most RETRY_INTERVAL seconds, a failed rebuild is reported with None as the source and retried after
+        RETRY_INTERVAL seconds, if None the error is printed """
+        self.unbuilt_cal = unbuilt_cal
+        self.listeners = list(listeners or [])
+        self.jitter = jitter
+        self.coalesce_delay = coalesce_delay
+        self.max_fetch_workers = max_fetch_workers
+        self.on_error = on_error
+        self.calendar: Calendar | None = None
+        self.build_count = 0
+
+        self._random = random.Random(seed)
+        self._wake = threading.Condition()
+        self._stopped = False
+        self._refresh_all = False
+        self._thread: threading.Thread | None = None
+
+    def add_listener(self, listener: Listener) -> None:
+        """Adds listener, if a calendar has been built already it is called with it right away."""
+        self.listeners.append(listener)
+        if self.calendar is not None:
+            listener(self.calendar)
+
+    def _get_delay(self, src_cal: SrcCal, failed: bool = False) -> float | None:
+        """ returns how many seconds to wait before refreshing src_cal again, None if it is never refreshed """
+        interval = src_cal.get_refresh_interval()
+        if interval is None:
+            return None
+        if failed:
+            interval = min(interval, self.RETRY_INTERVAL)
+        interval = max(interval, self.MIN_INTERVAL)
+        return interval * (1 + self._random.uniform(-self.jitter, self.jitter))
+
+    def _build(self) -> None:
+        """ rebuilds the calendar and notifies every listener """
+        self.calendar = self.unbuilt_cal.build(self.max_fetch_workers)
+        self.build_count += 1
+        for listener in list(self.listeners):
+            listener(self.calendar)
+
+    def _report(self, src_cal: SrcCal | None, exception: Exception) -> None:
+        """ reports a failed refresh of src_cal, or a failed rebuild if src_cal is None """
+        if self.on_error is not None:
+            self.on_error(src_cal, exception)
+        elif src_cal is None:
+            print(f'could not rebuild the calendar: {exception}')
+        else:
+            print(f'could not refresh {src_cal}: {exception}')
+
+    def _refresh(self, executor: ThreadPoolExecutor, src_cals: list[SrcCal]) -> list[tuple[SrcCal, bool, bool]]:
+        """ refreshes src_cals at the same time, returns (source, changed, failed) for every source """
+        futures = [executor.submit(src_cal.refresh) for src_cal in src_cals]
+        results = []
+        for src_cal, future in zip(src_cals, futures):
+            try:
+                results.append((src_cal, future.result(), False))
+            except Exception as exception:
+                self._report(src_cal, exception)
+                results.append((src_cal, False, True))
+        return results
+
+    def _run(self) -> None:
+        rebuild_at: float | None = None
+        try:
+            self._build()
+        except Exception as exception:
+            # a source that couldnt be fetched is rebuilt once its retry succeeds, anything else is retried as a rebuild
+            failed = [src_cal for src_cal in self.unbuilt_cal.src_cals if src_cal.needs_fetch()]
+            for src_cal in failed:
+                self._report(src_cal, exception)
+            if not failed:
+                self._report(None, exception)
+                rebuild_at = time.monotonic() + self.RETRY_INTERVAL
+
+        # due is a heap of (when, source index), sources whose interval is None are never in it
+        due: list[tuple[float, int]] = []
+        now = time.monotonic()
+        for i, src_cal in enumerate(self.unbuilt_cal.src_cals):
+            delay = self._get_delay(src_cal, src_cal.needs_fetch())
+            if delay is not None:
+                due.append((now + delay, i))
+        heapq.heapify(due)
+
+        with ThreadPoolExecutor(max_workers=self.max_fetch_workers) as executor:
+            while True:
+                with self._wake:
+                    now = time.monotonic()
+                    times = [due[0][0]] if due else []
+                    if rebuild_at is not None:
+                        times.append(rebuild_at)
+                    next_time = min(times, default=None)
+                    if not self._stopped and not self._refresh_all and (next_time is None or next_time > now):
+                        self._wake.wait(None if next_time is None else next_time - now)
+                    if self._stopped:
+                        return
+                    refresh_all = self._refresh_all
+                    self._refresh_all = False
+
+                now = time.monotonic()
+                to_refresh: list[int] = []
+                if refresh_all:
+                    to_refresh = [i for _, i in due]
+                    due = []
+                while due and due[0][0] <= now:
+                    to_refresh.append(heapq.heappop(due)[1])
+
+                src_cals = [self.unbuilt_cal.src_cals[i] for i in to_refresh]
+                for (src_cal, changed, failed), i in zip(self._refresh(executor, src_cals), to_refresh):
+                    if changed:
+                        # a rebuild waiting for its retry is moved up to the coalesced rebuild of the change
+                        coalesced_at = time.monotonic() + self.coalesce_delay
+                        rebuild_at = coalesced_at if rebuild_at is None else min(rebuild_at, coalesced_at)
+                    delay = self._get_delay(src_cal, failed)
+                    if delay is not None:
+                        heapq.heappush(due, (time.monotonic() + delay, i))
+
+                if rebuild_at is not None and rebuild_at <= time.monotonic():
+                    rebuild_at = None
+                    try:
+                        self._build()
+                    except Exception as exception:
+                        self._report(None, exception)
+                        rebuild_at = time.monotonic() + self.RETRY_INTERVAL
+
+    def start(self) -> None:
+        """Builds the calendar and starts refreshing in a background daemon thread, returns right away."""
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name='RefreshDaemon', daemon=True)
+            self._thread.start()
+
+    def refresh_now(self) -> None:
+        """Makes the daemon refresh every source right away instead of waiting for their intervals."""
+        with self._wake:
+            self._refresh_all = True
+            self._wake.notify()
+
+    def stop(self) -> None:
+        """Stops the daemon and waits for the refreshes in progress to finish."""
+        with self._wake:
+            self._stopped = True
+            self._wake.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,211 @@
+"""Module for saving built calendars as compact binary snapshots that load without parsing or filtering.
+Every distinct string (field names and field texts) is stored once in a string table and events refer to it by index,
+start and end times are stored packed as minutes so they dont have to be parsed again.
+A snapshot is tagged with the fingerprint of the UnbuiltCal it was built from (see UnbuiltCal.get_fingerprint)
+and is only used as long as the fingerprint is the same. The fingerprint is made from the filters and the cached ETag and
+Last-Modified of the sources, so checking it doesnt fetch or parse anything while the cache entries are fresh.
+start_from_snapshot shows the last saved calendar right away and rebuilds it in the background.
+
+Layout, all integers little endian:
+    MAGIC, fingerprint (64 ascii hex digits), string count, event count, field count (uint32 each)
+    string table: string count + 1 offsets into the text (uint32), text byte length (uint32), utf-8 text of all strings
+    field counts: number of fields of every event (uint32)
+    fields: (name index, text index) of every field of every event (uint32)
+    times: start and end of every event in minutes, NO_TIME if missing or invalid (int64)
+"""
+import os
+import struct
+import sys
+import warnings
+from array import array
+from typing import Callable
+
+from cal import Calendar, Event, Time
+from cal_raw import UnbuiltCal
+from refresh import RefreshDaemon
+from atomic_write import write_atomic
+
+
+MAGIC = b'SCHSNAP1'
+NO_TIME = -1
+_HEADER = struct.Struct('<8s64sIII')
+
+
+def _to_bytes(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode: str, data: bytes | memoryview) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _get_minutes(event: Event, field: str) -> int:
+    try:
+        return (event.get_start_time() if field == 'DTSTART' else event.get_end_time()).as_minutes()
+    except ValueError:
+        return NO_TIME
+
+
+def dump_snapshot(calendar: Calendar, fingerprint: str) -> bytes:
+    """Returns calendar as a snapshot tagged with fingerprint, a sha256 hex digest."""
+    string_indices: dict[str, int] = {}
+    field_counts = array('I')
+    fields = array('I')
+    times = array('q')
+
+    for event in calendar.events:
+        content = event.content
+        field_counts.append(len(content))
+        for field, text in content.items():
+            fields.append(string_indices.setdefault(field, len(string_indices)))
+            fields.append(string_indices.setdefault(text, len(string_indices)))
+        times.append(_get_minutes(event, 'DTSTART'))
+        times.append(_get_minutes(event, 'DTEND'))
+
+    # offsets are in characters of the decoded text, so loading decodes the text once and slices it
+    offsets = array('I', [0])
+    for string in string_indices:
+        offsets.append(offsets[-1] + len(string))
+    text = ''.join(string_indices).encode('utf-8')
+
+    return b''.join((
+        _HEADER.pack(MAGIC, fingerprint.encode('ascii'), len(string_indices), len(calendar.events), len(fields) // 2),
+        _to_bytes(offsets),
+        struct.pack('<I', len(text)),
+        text,
+        _to_bytes(field_counts),
+        _to_bytes(fields),
+        _to_bytes(times),
+    ))
+
+
+def read_fingerprint(data: bytes) -> str | None:
+    """Returns the fingerprint of a snapshot, or None if data isnt a snapshot."""
+    if len(data) < _HEADER.size:
+        return None
+    magic, fingerprint, _, _, _ = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        return None
+    return fingerprint.decode('ascii')
+
+
+def load_snapshot(data: bytes) -> Calendar:
+    """Returns the calendar in a snapshot, events with the same field texts share the same str objects.
+    raises ValueError if data isnt a valid snapshot.
+    """
+    try:
+        magic, _, string_count, event_count, field_count = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('not a calendar snapshot')
+        view = memoryview(data)
+        position = _HEADER.size
+
+        offsets = _from_bytes('I', view[position:position + 4 * (string_count + 1)])
+        position += 4 * (string_count + 1)
+        text_length, = struct.unpack_from('<I', data, position)
+        position += 4
+        text = str(view[position:position + text_length], 'utf-8')
+        position += text_length
+        strings = [text[offsets[i]:offsets[i + 1]] for i in range(string_count)]
+
+        field_counts = _from_bytes('I', view[position:position + 4 * event_count])
+        position += 4 * event_count
+        fields = _from_bytes('I', view[position:position + 8 * field_count])
+        position += 8 * field_count
+        times = _from_bytes('q', view[position:position + 16 * event_count])
+        position += 16 * event_count
+        if position != len(data) or len(times) != 2 * event_count or len(fields) != 2 * field_count:
+            raise ValueError('snapshot has the wrong length')
+
+        events = []
+        field_position = 0
+        for i, count in enumerate(field_counts):
+            end = field_position + 2 * count
+            content = {strings[fields[j]]: strings[fields[j + 1]] for j in range(field_position, end, 2)}
+            field_position = end
+
+            event_times = {}
+            if times[2 * i] != NO_TIME:
+                event_times['DTSTART'] = Time.from_minutes(times[2 * i])
+            if times[2 * i + 1] != NO_TIME:
+                event_times['DTEND'] = Time.from_minutes(times[2 * i + 1])
+            events.append(Event.with_times(content, event_times))
+    except (struct.error, IndexError, UnicodeDecodeError) as error:
+        raise ValueError(f'invalid calendar snapshot: {error}')
+
+    return Calendar(events)
+
+
+def save_snapshot(path: str, calendar: Calendar, fingerprint: str) -> None:
+    """Writes calendar as a snapshot tagged with fingerprint to path in one atomic step."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    write_atomic(path, dump_snapshot(calendar, fingerprint))
+
+
+def load_snapshot_file(path: str, fingerprint: str | None = None) -> Calendar | None:
+    """Returns the calendar in the snapshot at path, or None if there is no valid snapshot at path.
+    if fingerprint is not None, None is also returned if the snapshot was saved with another fingerprint,
+    with fingerprint None the last saved calendar is returned whatever it was built from, e.g. to show it while rebuilding.
+    """
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except OSError:
+        return None
+
+    if fingerprint is not None and read_fingerprint(data) != fingerprint:
+        return None
+    try:
+        return load_snapshot(data)
+    except ValueError:
+        return None
+
+
+def build_with_snapshot(unbuilt_cal: UnbuiltCal, path: str, max_fetch_workers: int = 8) -> Calendar:
+    """Returns the built calendar of unbuilt_cal, loaded from the snapshot at path if it was built from the same
+    filters and source content, otherwise the calendar is built and saved to path as the new snapshot.
+    Sources with fresh cache entries arent fetched at all when the snapshot is still valid, see UnbuiltCal.get_fingerprint.
+    """
+    fingerprint = unbuilt_cal.get_fingerprint(max_fetch_workers)
+    calendar = load_snapshot_file(path, fingerprint)
+    if calendar is None:
+        calendar = unbuilt_cal.build(max_fetch_workers)
+        save_snapshot(path, calendar, fingerprint)
+    return calendar
+
+
+def start_from_snapshot(
+        unbuilt_cal: UnbuiltCal,
+        path: str,
+        listeners: list[Callable[[Calendar], None]],
+        **daemon_options,
+    ) -> RefreshDaemon:
+    """Calls every listener with the last calendar saved at path right away, whatever it was built from,
+    then starts a refresh.RefreshDaemon that builds unbuilt_cal in the background, calls the listeners with every
+    new calendar and saves it to path. Returns the started daemon, stop it when done.
+    If there is no valid snapshot at path the listeners are only called once the first build is done.
+    daemon_options are given to RefreshDaemon.
+    """
+    calendar = load_snapshot_file(path)
+    if calendar is not None:
+        for listener in listeners:
+            listener(calendar)
+
+    def save(calendar: Calendar) -> None:
+        try:
+            save_snapshot(path, calendar, unbuilt_cal.get_fingerprint())
+        except OSError as exception:
+            warnings.warn(f'could not save the snapshot {path}: {exception}', RuntimeWarning)
+
+    daemon = RefreshDaemon(unbuilt_cal, [*listeners, save], **daemon_options)
+    daemon.start()
+    return daemon
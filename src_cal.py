@@ -1,8 +1,15 @@
-import requests
+import hashlib
+import json
+import time
+import warnings
 from abc import ABC, abstractmethod
 from typing import Iterable
 
 from cal import Calendar, Event, Time
+import ics
+from fetch_cache import CacheEntry, FetchCache, parse_max_age
+from http_session import HTTPSession, get_default_session
+from metrics import FetchMetrics, measure_reads
 
 
 class SrcCal(ABC):
@@ -10,14 +17,72 @@ class SrcCal(ABC):
     def get_events(self) -> Iterable[Event]:
         pass
 
+    def needs_fetch(self) -> bool:
+        """ returns True if get_events would have to fetch the source first """
+        return False
+
+    def fetch(self) -> None:
+        """ fetches the source, sources that dont need to be fetched do nothing """
+        pass
+
+    def get_refresh_interval(self) -> float | None:
+        """ returns how many seconds to wait between refreshes of the source, None if the source never changes """
+        return None
+
+    def refresh(self) -> bool:
+        """ fetches the source again, returns True if its events or calendar info changed """
+        return False
+
+    def get_name(self) -> str:
+        """ returns a short name for the source, used in reports """
+        return type(self).__name__
+
+    def get_last_fetch(self) -> FetchMetrics | None:
+        """ returns the timing of the last fetch, None for sources that arent fetched """
+        return None
+
+    def get_fingerprint(self) -> str:
+        """ returns a hash of the content of every event, fetches the source first if needed """
+        digest = hashlib.sha256()
+        for event in self.get_events():
+            digest.update(json.dumps(dict(event.content), ensure_ascii=False).encode('utf-8') + b'\0')
+        return digest.hexdigest()
+
+    def get_validator(self) -> str | None:
+        """ returns a short str that is only the same again while the events of the source are the same,
+        without fetching or parsing anything, None if the source cant tell without being fetched
+        sources that dont need to be fetched return their fingerprint """
+        return None if self.needs_fetch() else self.get_fingerprint()
+
     def __str__(self, tabs: int = 0):
         return '\t' * (tabs) + 'Baseclass SrcCal Object'
 
 
 class SrcCalURL(SrcCal):
-    def __init__(self, url: str):
+    CHUNK_SIZE = 64 * 1024
+    DEFAULT_REFRESH_INTERVAL = 60 * 60
+
+    def __init__(
+            self,
+            url: str,
+            cache: FetchCache | None = None,
+            session: HTTPSession | None = None,
+            timeout: float | None = None,
+            refresh_interval: float | None = None,
+        ):
+        """ cache is where responses are cached between fetches and runs of the program, if None nothing is cached
+        (fetch_cache.DEFAULT_CACHE is the shared cache in the home directory of the user)
+        session is used to send the requests, if None the shared default session is used
+        timeout is how many seconds to wait for the server before giving up, if None the timeout of the session is used
+        refresh_interval is how many seconds to wait between refreshes, if None the X-PUBLISHED-TTL of the source is used """
         self.url = url
+        self.cache = cache
+        self.session = session
+        self.timeout = timeout
+        self.refresh_interval = refresh_interval
         self.cal = None
+        self.calendar_info: dict[str, str] = {}
+        self.last_fetch: FetchMetrics | None = None
 
     @staticmethod
     def str_to_time(time: str):
@@ -28,68 +93,120 @@ class SrcCalURL(SrcCal):
         minute = int(time[11:13])
         return Time(year, month, day, hour, minute)
 
-    def read_ics(self, file_raw: str):
-        """ reads an ics file and returns the first VCALENDAR in file with all its VEVENTS in the cal.Calendar format """
-        file_raw = file_raw.replace('\r\n ', '')
-        calendars: list[Calendar] = []
-        current_calendar_info: dict|None = None
-        current_calendar_events: list[Event]|None = None
-        current_event_info: dict|None = None
-        started_cal = started_event = False
-        
-        for line in file_raw.split('\r\n'):
-            if not line:
-                continue
-
-            field, content = line.split(':', 1)
-
-            match field, content:
-                case 'BEGIN', 'VCALENDAR':
-                    current_calendar_events = []
-                    current_calendar_info = {}
-                    started_cal = True
-                case 'BEGIN', 'VEVENT':
-                    current_event_info = {}
-                    started_event = True
-                case 'END', 'VCALENDAR':
-                    calendars.append(Calendar(current_calendar_events))
-                    started_cal = False
-                case 'END', 'VEVENT':
-                    current_calendar_events.append(Event(current_event_info))
-                    started_event = False
-                case _:
-                    if started_event:
-                        current_event_info[field] = content
-                    elif started_cal:
-                        current_calendar_info[field] = content
-
-        try:
-            return calendars[0]
-        except IndexError:
-            raise ValueError('input argument file_raw could not be read or had no VCALENDAR')
+    def read_ics(self, file_raw: ics.Chunks | str | bytes) -> Calendar:
+        """ reads an ics file and returns the first VCALENDAR in file with all its VEVENTS in the cal.Calendar format
+        file_raw may be the whole file as one str/bytes or any iterable of str/bytes chunks, which are parsed as they are read
+        the properties of the VCALENDAR are stored in self.calendar_info """
+        calendar_info = {}
+        calendar = ics.read_calendar(file_raw, calendar_info)
+        self.calendar_info = calendar_info
+        return calendar
             
     def fetch(self):
-        """ Fetches the source file, reads in the first VCALENDAR and stores it as a cal.Calendar in self.cal """
-        
+        """ Fetches the source file, reads in the first VCALENDAR and stores it as a cal.Calendar in self.cal
+        raises http_session.FetchError if the source could not be fetched
+        if the source is cached and still within its X-PUBLISHED-TTL, the cached calendar is used without any request
+        otherwise the request is conditional and if the server answers 304 Not Modified the cached calendar is reused """
+        self._fetch(use_fresh_cache=True)
+
+    def _fetch(self, use_fresh_cache: bool) -> None:
+        """ fetches the source as described in fetch, if not use_fresh_cache a request is sent even if the cache is fresh
+        the timing of the fetch is stored in self.last_fetch """
+        start = time.perf_counter()
+        entry = self.cache.load(self.url) if self.cache is not None else None
+        if entry is not None and use_fresh_cache and entry.is_fresh():
+            self._use_cache_entry(entry)
+            self.last_fetch = FetchMetrics('cache', parse_seconds=time.perf_counter() - start)
+            return
+
+        headers = entry.get_validators() if entry is not None else {}
+        session = self.session if self.session is not None else get_default_session()
+
+        with session.get(self.url, headers, self.timeout) as response:
+            if response.status_code == 304 and entry is not None:
+                entry.update(response.headers)
+                self._store_cache(entry)
+                self._use_cache_entry(entry)
+                self.last_fetch = FetchMetrics('not_modified', fetch_seconds=time.perf_counter() - start)
+                return
+
+            request_seconds = time.perf_counter() - start
+            fetch = FetchMetrics('network', fetch_seconds=request_seconds)
+            read_start = time.perf_counter()
+            self.cal = self.read_ics(measure_reads(response.iter_content(chunk_size=self.CHUNK_SIZE), fetch))
+            # measure_reads added the time spent waiting for the body, the rest of the read is parsing
+            fetch.parse_seconds = time.perf_counter() - read_start - (fetch.fetch_seconds - request_seconds)
+
+        if self.cache is not None:
+            self._store_cache(CacheEntry.from_calendar(
+                self.url,
+                self.cal,
+                self.calendar_info,
+                response.headers.get('ETag'),
+                response.headers.get('Last-Modified'),
+                parse_max_age(response.headers.get('Cache-Control')) or 0.0,
+            ))
+        self.last_fetch = fetch
+
+    def _store_cache(self, entry: CacheEntry) -> None:
+        """ stores entry in the cache, if it cant be written (e.g. a read only or full disk) a RuntimeWarning is given
+        and the fetch goes on, the calendar has already been received """
         try:
-            response = requests.get(self.url)
-            response.raise_for_status()  # Raises an HTTPError if the response code was unsuccessful
-        except requests.exceptions.HTTPError as http_err:
-            raise Exception(f"HTTP error occurred: {http_err}")  # Could be a 404 or 500 error, for example
-        except requests.exceptions.ConnectionError as conn_err:
-            raise Exception(f"Connection error occurred: {conn_err}")
-        except requests.exceptions.Timeout as timeout_err:
-            raise Exception(f"Timeout error occurred: {timeout_err}")
-        except requests.exceptions.RequestException as req_err:
-            raise Exception(f"An error occurred: {req_err}")
-
-        file_raw = response.content.decode('utf-8')
-
-        self.cal = self.read_ics(file_raw)
+            self.cache.store(entry)
+        except OSError as exception:
+            warnings.warn(f'could not cache {self.url}: {exception}', RuntimeWarning)
+
+    def _use_cache_entry(self, entry: CacheEntry) -> None:
+        """ sets self.cal and self.calendar_info from a cache entry """
+        self.cal = entry.get_calendar()
+        self.calendar_info = dict(entry.calendar_info)
+
+    def needs_fetch(self) -> bool:
+        return self.cal is None
+
+    def get_name(self) -> str:
+        return self.url
+
+    def get_last_fetch(self) -> FetchMetrics | None:
+        return self.last_fetch
+
+    def get_validator(self) -> str | None:
+        """ returns the ETag and Last-Modified of the cached response while it is fresh, read without loading the calendar,
+        otherwise the fingerprint of the events if they have been fetched, or None """
+        header = self.cache.load_header(self.url) if self.cache is not None else None
+        if header is not None and (header['etag'] is not None or header['last_modified'] is not None):
+            if time.time() < header['fetched_at'] + header['ttl']:
+                return json.dumps([self.url, header['etag'], header['last_modified']])
+        return super().get_validator()
+
+    def get_refresh_interval(self) -> float:
+        """ returns refresh_interval if set, otherwise the X-PUBLISHED-TTL of the source or DEFAULT_REFRESH_INTERVAL """
+        if self.refresh_interval is not None:
+            return self.refresh_interval
+        try:
+            ttl = ics.parse_duration(self.calendar_info['X-PUBLISHED-TTL'])
+        except (KeyError, ValueError):
+            return self.DEFAULT_REFRESH_INTERVAL
+        return ttl if ttl > 0 else self.DEFAULT_REFRESH_INTERVAL
+
+    def refresh(self) -> bool:
+        """ sends a conditional request for the source even if the cache is fresh and replaces self.cal
+        returns True if the events or calendar info are different from before, a 304 Not Modified is never a change
+        raises http_session.FetchError if the source could not be fetched and ValueError if it isnt a valid calendar,
+        self.cal and self.calendar_info are then left as they were """
+        old_cal = self.cal
+        old_calendar_info = self.calendar_info
+        self._fetch(use_fresh_cache=False)
+
+        if old_cal is None:
+            return True
+        if self.calendar_info != old_calendar_info or len(self.cal.events) != len(old_cal.events):
+            return True
+        return any(new.content != old.content for new, old in zip(self.cal.events, old_cal.events))
 
     def get_events(self):
         """ returns all calendar events, if source calendar hasnt been fetched yet, self.fetch() is called. """
-        if self.cal == None:
+        if self.needs_fetch():
             self.fetch()
 
         return self.cal.events
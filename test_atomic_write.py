@@ -0,0 +1,52 @@
+import atomic_write
+
+import os
+import stat
+import tempfile
+import unittest
+
+
+class TestAtomicWrite(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'out.html')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get_mode(self) -> int:
+        return stat.S_IMODE(os.stat(self.path).st_mode)
+
+    def test_write(self):
+        atomic_write.write_atomic(self.path, 'första')
+        atomic_write.write_atomic(self.path, 'andra')
+        with open(self.path, encoding='utf-8') as file:
+            self.assertEqual(file.read(), 'andra')
+        self.assertEqual(os.listdir(self.directory.name), ['out.html'])
+
+    def test_failed_write(self):
+        """ tests that the old file is kept and the temporary file removed if the with block raises """
+        atomic_write.write_atomic(self.path, 'old')
+        with self.assertRaises(RuntimeError):
+            with atomic_write.open_atomic(self.path) as file:
+                file.write('new')
+                raise RuntimeError
+        with open(self.path, encoding='utf-8') as file:
+            self.assertEqual(file.read(), 'old')
+        self.assertEqual(os.listdir(self.directory.name), ['out.html'])
+
+    @unittest.skipIf(os.name != 'posix', 'permission bits are only kept on posix')
+    def test_mode(self):
+        """ tests that a new file gets the same permissions as one made by open and a replaced file keeps its own """
+        atomic_write.write_atomic(self.path, 'new')
+        umask = os.umask(0)
+        os.umask(umask)
+        self.assertEqual(self.get_mode(), 0o666 & ~umask)
+
+        os.chmod(self.path, 0o640)
+        atomic_write.write_atomic(self.path, b'replaced')
+        self.assertEqual(self.get_mode(), 0o640)
+
+
+if __name__ == '__main__':
+    unittest.main()
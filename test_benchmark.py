@@ -0,0 +1,77 @@
+import benchmark
+import ics
+from input_json import InputJSON
+from cal_raw import UnbuiltCal
+from src_cal import SrcCalCalendar
+
+import unittest
+
+
+class TestGenerators(unittest.TestCase):
+    def test_feed(self):
+        """ tests that the feed is seeded, parses and has folded lines and escaped commas like the TimeEdit feeds """
+        feed = benchmark.generate_feed(300, seed=1)
+        self.assertEqual(feed, benchmark.generate_feed(300, seed=1))
+        self.assertNotEqual(feed, benchmark.generate_feed(300, seed=2))
+        self.assertIn(b'\r\n ', feed)
+        self.assertIn(b'\\, Undervisningstyp: ', feed)
+
+        calendar_info = {}
+        events = ics.read_calendar(feed, calendar_info).events
+        self.assertEqual(len(events), 300)
+        self.assertEqual(calendar_info['X-PUBLISHED-TTL'], 'PT20M')
+        for event in events:
+            self.assertLess(event.get_start_time(), event.get_end_time())
+            self.assertIn('\\nID ', event.get_field_text('DESCRIPTION'))
+
+    def test_config(self):
+        """ tests that generated configs parse and that their filters change the generated feed """
+        config = benchmark.generate_config(40, seed=1)
+        self.assertEqual(config, benchmark.generate_config(40, seed=1))
+        filters = InputJSON._get_filters(config)
+        self.assertEqual(len(filters), 40)
+        self.assertEqual(len(InputJSON._get_src_cals(config)), 1)
+
+        source = SrcCalCalendar(ics.read_calendar(benchmark.generate_feed(500)))
+        built = UnbuiltCal([source], filters).build()
+        self.assertNotEqual([event.content for event in built.events], [event.content for event in source.get_events()])
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_run_and_compare(self):
+        results = benchmark.run_benchmarks([200], 5, measure_memory=True, repeat=1)
+        stages = results['sizes']['200']
+        self.assertEqual(list(stages), ['parse', 'build', 'rebuild', 'render', 'export', 'snapshot_save', 'snapshot_load'])
+        for result in stages.values():
+            self.assertGreater(result['events_per_second'], 0)
+            self.assertIn('peak_mb', result)
+        self.assertGreater(results['reference_seconds'], 0)
+        self.assertEqual(benchmark.compare(results, results), [])
+
+    def test_compare(self):
+        """ tests that times are compared relative to the reference workload and that fast stages are skipped """
+        baseline = {'reference_seconds': 0.1, 'sizes': {'1000': {
+            'parse': {'seconds': 0.2, 'peak_mb': 5.0},
+            'build': {'seconds': 0.2, 'peak_mb': 5.0},
+            'rebuild': {'seconds': 0.005, 'peak_mb': 1.0},
+        }}}
+        # a machine twice as slow, every stage takes twice as long
+        slower_machine = {'reference_seconds': 0.2, 'sizes': {'1000': {
+            stage: {**result, 'seconds': result['seconds'] * 2} for stage, result in baseline['sizes']['1000'].items()
+        }}}
+        self.assertEqual(benchmark.compare(slower_machine, baseline), [])
+
+        slower = {'reference_seconds': 0.1, 'sizes': {'1000': {
+            'parse': {'seconds': 0.4, 'peak_mb': 5.0},
+            'build': {'seconds': 0.2, 'peak_mb': 12.0},
+            'rebuild': {'seconds': 0.009, 'peak_mb': 1.0},
+            'render': {'seconds': 1.0, 'peak_mb': 1.0},
+        }}}
+        regressions = benchmark.compare(slower, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('parse'))
+        self.assertTrue(regressions[1].startswith('build'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import build_trace
+import cal_raw
+import ics
+import src_cal
+from input_json import InputJSON
+
+import io
+import json
+import unittest
+
+
+class TestBuildTracer(unittest.TestCase):
+    def setUp(self):
+        with open('TimeEdit_U1.b_2024-10-10_12_41.ics', 'rb') as file:
+            self.calendar = ics.read_calendar(file.read())
+        self.filters = InputJSON._get_filters(InputJSON._read_file('input_24HT2.json'))
+        self.unbuilt = cal_raw.UnbuiltCal([src_cal.SrcCalCalendar(self.calendar)], self.filters)
+        self.kept = '3277676--425816690-0@timeedit.com'
+        self.removed = '3277677--425816690-0@timeedit.com'
+
+    def test_uids(self):
+        """ tests the traces of a renamed and a removed seminar and that tracing doesnt change the build """
+        tracer = build_trace.BuildTracer(uids=[self.kept, self.removed])
+        built = self.unbuilt.build(incremental=False, tracer=tracer)
+        expected = cal_raw.UnbuiltCal([src_cal.SrcCalCalendar(self.calendar)], self.filters).build(incremental=False)
+        self.assertEqual([event.content for event in built.events], [event.content for event in expected.events])
+        self.assertEqual(len(tracer.traces), 2)
+
+        kept, = tracer.query(uid=self.kept)
+        self.assertEqual(kept.events_out, 1)
+        self.assertEqual([step.filter_index for step in kept.steps], list(range(len(self.filters))))
+        renamed = [step for step in kept.steps if step.outcome == build_trace.TraceStep.CHANGED]
+        self.assertEqual([step.filter_index for step in renamed], [1])
+        self.assertIn(('SUMMARY', 'TDDE24\\, Undervisningstyp: SE\\, D1\\, U1\\, Grupp S1', 'TDDE24 Seminarium'), renamed[0].changes)
+
+        removed, = tracer.query(removed=True)
+        self.assertEqual(removed.uid, self.removed)
+        self.assertEqual(len(removed.steps), 1)
+        self.assertEqual((removed.steps[0].filter_index, removed.steps[0].matched, removed.steps[0].outcome), (0, True, 'removed'))
+        self.assertEqual(tracer.query(filter_index=0, matched=False), [kept])
+        self.assertIn('filter 0: removed', tracer.explain(self.removed))
+
+    def test_sampling(self):
+        """ tests that sampling picks the same events every build and that reused events are recorded as such """
+        tracer = build_trace.BuildTracer(sample_rate=0.25)
+        self.unbuilt.build(tracer=tracer)
+        first = [trace.uid for trace in tracer.query(build=1)]
+        self.assertTrue(0 < len(first) < len(self.calendar.events))
+
+        self.unbuilt.build(tracer=tracer)
+        second = tracer.query(build=2)
+        self.assertEqual([trace.uid for trace in second], first)
+        self.assertTrue(all(trace.reused and not trace.steps for trace in second))
+
+        everything = build_trace.BuildTracer(sample_rate=1.0)
+        self.unbuilt.build(incremental=False, tracer=everything)
+        self.assertEqual(len(everything.traces), len(self.calendar.events))
+        self.assertFalse(build_trace.BuildTracer().should_trace(self.calendar.events[0]))
+
+    def test_bounded_log(self):
+        tracer = build_trace.BuildTracer(predicate=lambda event: True, max_traces=10)
+        self.unbuilt.build(incremental=False, tracer=tracer)
+        self.assertEqual(len(tracer.traces), 10)
+        self.assertEqual(tracer.traces[-1].uid, self.calendar.events[-1].get_field_text('UID'))
+
+        stream = io.StringIO()
+        tracer.write_jsonl(stream)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(json.loads(lines[-1])['uid'], tracer.traces[-1].uid)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,8 @@
 import cal
 
+from datetime import date, timedelta
+import pickle
+import random
 import unittest
 
 
@@ -35,6 +38,35 @@ class TestTime(unittest.TestCase):
         for i in range(1, 4):
             self.assertGreaterEqual(cal.Time(*mid_times[:i], high_times[i], *low_times[i+1:]), cal.Time(*mid_times))
 
+    def test_arithmetic(self):
+        """Tests adding and subtracting durations."""
+        time = cal.Time(2024, 12, 31, 23, 30)
+        self.assertEqual(time + timedelta(minutes=45), cal.Time(2025, 1, 1, 0, 15))
+        self.assertEqual(time - timedelta(days=31), cal.Time(2024, 11, 30, 23, 30))
+        self.assertEqual(cal.Time(2025, 1, 1, 0, 15) - time, timedelta(minutes=45))
+
+        midnight = cal.Time(2025, 1, 1, 0, 0)
+        self.assertEqual(midnight + timedelta(seconds=-30), midnight)
+        self.assertEqual(midnight - timedelta(seconds=30), midnight)
+        self.assertEqual(midnight + timedelta(seconds=-90), midnight - timedelta(seconds=90))
+        self.assertEqual(midnight - timedelta(seconds=90), cal.Time(2024, 12, 31, 23, 59))
+        self.assertEqual(midnight + timedelta(seconds=90), cal.Time(2025, 1, 1, 0, 1))
+
+    def test_ordinal_and_weekday(self):
+        """Tests 'ordinal', 'weekday' and 'from_ordinal'."""
+        time = cal.Time(2024, 11, 25, 8, 15)
+        self.assertEqual(time.ordinal(), date(2024, 11, 25).toordinal())
+        self.assertEqual(time.weekday(), 0)
+        self.assertEqual((time + timedelta(days=6)).weekday(), 6)
+        self.assertEqual(cal.Time.from_ordinal(time.ordinal(), 8, 15), time)
+        self.assertEqual(cal.Time.from_minutes(time.as_minutes()), time)
+
+    def test_invalid(self):
+        """Tests that invalid dates and times are rejected."""
+        self.assertRaises(ValueError, cal.Time, 2024, 2, 30, 0, 0)
+        self.assertRaises(ValueError, cal.Time, 2024, 2, 3, 24, 0)
+        self.assertRaises(ValueError, cal.Time.str2time, '20241301T120000Z')
+
     # Tests for method 'str2time'
     def test_parsing(self):
         """Tests normal case for str2time."""
@@ -113,6 +145,23 @@ class TestEvent(unittest.TestCase):
             self.assertRaises(ValueError, method, cal.Event({wrong_field: time}))
             self.assertRaises(ValueError, method, cal.Event({field: wrong_time}))
 
+    def test_get_time_cache(self):
+        """Tests that cached start and end times follow 'write_field' and 'remove_field'."""
+        event = cal.Event({'DTSTART': '20250113T120000Z'})
+        self.assertEqual(event.get_start_time(), cal.Time(2025, 1, 13, 12, 0))
+        self.assertRaises(ValueError, event.get_end_time)
+
+        event.write_field('DTSTART', '20250114T080000Z')
+        event.write_field('DTEND', '20250114T100000Z')
+        self.assertEqual(event.get_start_time(), cal.Time(2025, 1, 14, 8, 0))
+        self.assertEqual(event.get_end_time(), cal.Time(2025, 1, 14, 10, 0))
+
+        event.write_field('DTSTART', '20250115T080000Z', False)
+        self.assertEqual(event.get_start_time(), cal.Time(2025, 1, 14, 8, 0))
+
+        event.remove_field('DTSTART')
+        self.assertRaises(ValueError, event.get_start_time)
+
     def fields_equal(self, event: cal.Event, fields: dict[str, str]):
         """Helper method that tests if event.get_fields() is the same as fields."""
         event_fields = event.get_fields()
@@ -163,6 +212,115 @@ class TestEvent(unittest.TestCase):
         event.write_field(key2, val2, False)
         self.fields_equal(event, {key1: val2, key2: val2})
 
+    def test_copy_on_write(self):
+        """Tests that changes never reach the content given to the constructor or other copies."""
+        content = {'SUMMARY': 'TDDE24', 'LOCATION': 'SU02'}
+        event = cal.Event(content)
+        copy = event.copy()
+        copy.write_field('SUMMARY', 'TDDE24 Labb')
+        copy.remove_field('LOCATION')
+        copy.write_field('DESCRIPTION', 'Featuring ALBIN!')
+
+        self.assertEqual(content, {'SUMMARY': 'TDDE24', 'LOCATION': 'SU02'})
+        self.assertEqual(event.content, content)
+        self.assertEqual(copy.content, {'SUMMARY': 'TDDE24 Labb', 'DESCRIPTION': 'Featuring ALBIN!'})
+        self.assertFalse(copy.has_field('LOCATION'))
+        self.assertRaises(KeyError, copy.get_field_text, 'LOCATION')
+
+        copy.remove_field('DESCRIPTION')
+        copy.write_field('LOCATION', 'SU03')
+        self.fields_equal(copy, {'SUMMARY': 'TDDE24 Labb', 'LOCATION': 'SU03'})
+
+    def test_compact_fields(self):
+        """Tests that fields keep their order, unknown fields work and that repeated texts and field orders are shared."""
+        first = cal.Event({'SUMMARY': ''.join(['TDDE24', ' Labb']), 'X-CUSTOM': 'a', 'UID': '1'})
+        second = cal.Event({'SUMMARY': ''.join(['TDDE24', ' Labb']), 'X-CUSTOM': 'b', 'UID': '2'})
+        self.assertEqual(list(first.get_fields()), ['SUMMARY', 'X-CUSTOM', 'UID'])
+        self.assertEqual(first.content, {'SUMMARY': 'TDDE24 Labb', 'X-CUSTOM': 'a', 'UID': '1'})
+        self.assertIs(first.get_field_text('SUMMARY'), second.get_field_text('SUMMARY'))
+        self.assertIs(first.get_fields(), second.get_fields())
+        self.assertEqual(second.get_field_text('X-CUSTOM'), 'b')
+        self.assertIsNone(first.find_field_text('LOCATION'))
+        self.assertFalse(first.has_field('X-OTHER'))
+
+        second.write_field('X-CUSTOM', 'c')
+        second.remove_field('UID')
+        self.assertEqual(second.content, {'SUMMARY': 'TDDE24 Labb', 'X-CUSTOM': 'c'})
+        with self.assertRaises(TypeError):
+            second.content['X-CUSTOM'] = 'd'
+        self.assertEqual(pickle.loads(pickle.dumps(second)).content, second.content)
+        self.assertEqual(pickle.loads(pickle.dumps(first)).content, first.content)
+
+    def test_interned_bounded(self):
+        """Tests that only repeating fields are interned and that the least recently used texts are dropped first."""
+        max_interned = cal.EventFields.MAX_INTERNED
+        cal.EventFields.MAX_INTERNED = 10
+        try:
+            kept = cal.Event({'SUMMARY': ''.join(['kept', ' summary'])}).get_field_text('SUMMARY')
+            for i in range(30):
+                cal.Event({'SUMMARY': f'summary {i}', 'LOCATION': ''.join(['kept', ' summary']), 'DTSTART': f'20240101T{i:02}0000Z'})
+                self.assertLessEqual(len(cal.EventFields._interned), 10)
+            self.assertIs(cal.Event({'SUMMARY': ''.join(['kept', ' summary'])}).get_field_text('SUMMARY'), kept)
+            self.assertNotIn('20240101T000000Z', cal.EventFields._interned)
+        finally:
+            cal.EventFields.MAX_INTERNED = max_interned
+
+
+class TestCalendar(unittest.TestCase):
+    """Class for testing the Calendar class methods."""
+    @staticmethod
+    def make_event(start: cal.Time, end: cal.Time) -> cal.Event:
+        return cal.Event({'DTSTART': start.as_str(), 'DTEND': end.as_str()})
+
+    def test_query(self):
+        """Tests 'query' against checking every event by hand."""
+        rng = random.Random(1)
+        first = cal.Time(2024, 9, 2, 0, 0)
+        events = []
+        for _ in range(500):
+            start = first + timedelta(minutes=15 * rng.randrange(4 * 24 * 120))
+            events.append(self.make_event(start, start + timedelta(minutes=15 * rng.randrange(1, 40))))
+        events.append(self.make_event(first, first + timedelta(days=200)))
+        events.append(cal.Event({'DTSTART': 'NaN', 'DTEND': first.as_str()}))
+        calendar = cal.Calendar(events)
+
+        for _ in range(50):
+            start = first + timedelta(hours=rng.randrange(24 * 130))
+            end = start + timedelta(hours=rng.randrange(1, 24 * 8))
+            expected = [event for event in events if event.has_field('DTSTART') and event.get_field_text('DTSTART') != 'NaN'
+                        and event.get_start_time() < end and event.get_end_time() > start]
+            found = calendar.query(start, end)
+            self.assertCountEqual(found, expected)
+            self.assertEqual(found, sorted(found, key=cal.Event.get_start_time))
+
+    def test_query_edges(self):
+        """Tests 'query' when events start/end at the same time as the timeframe ends/starts and on empty calendars."""
+        time1, time2, time3 = cal.Time(2024, 1, 1, 8, 0), cal.Time(2024, 1, 1, 10, 0), cal.Time(2024, 1, 1, 12, 0)
+        calendar = cal.Calendar([self.make_event(time1, time2)])
+        self.assertEqual(calendar.query(time2, time3), [])
+        self.assertEqual(len(calendar.query(time1, time3)), 1)
+
+        calendar.events.append(self.make_event(time2, time3))
+        self.assertEqual(len(calendar.query(time2, time3)), 1)
+        self.assertEqual(cal.Calendar([]).query(time1, time3), [])
+
+    def test_query_changed_events(self):
+        """Tests that 'query' notices events that are replaced in place, swapped for others or a new events list."""
+        time1, time2, time3 = cal.Time(2024, 1, 1, 8, 0), cal.Time(2024, 1, 1, 10, 0), cal.Time(2024, 1, 1, 12, 0)
+        morning, noon = self.make_event(time1, time2), self.make_event(time2, time3)
+        calendar = cal.Calendar([morning])
+        self.assertEqual(calendar.query(time1, time2), [morning])
+
+        calendar.events[0] = noon
+        self.assertEqual(calendar.query(time1, time2), [])
+        calendar.events.pop()
+        calendar.events.append(morning)
+        self.assertEqual(calendar.query(time1, time2), [morning])
+        calendar.events = [noon]
+        self.assertEqual(calendar.query(time2, time3), [noon])
+        self.assertEqual(pickle.loads(pickle.dumps(calendar)).query(time2, time3)[0].content, noon.content)
+
+
 def test_visuals():
     """Function for testing the __str__ method for Time, Event and Cal."""
     time = cal.Time(2025, 1, 13, 12, 0)
@@ -0,0 +1,74 @@
+import benchmark
+import cal
+import ics
+from pattern import PatternAnd, PatternHasText, PatternInTime, PatternNot, PatternOr
+
+import unittest
+
+try:
+    import numpy
+    import cal_columns
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestColumnarCalendar(unittest.TestCase):
+    def setUp(self):
+        self.calendar = ics.read_calendar(benchmark.generate_feed(2000, seed=3))
+        self.calendar.events[5].write_field('DTSTART', 'not a time')
+        self.calendar.events[6].remove_field('DTEND')
+        self.columns = cal_columns.ColumnarCalendar(self.calendar)
+        self.start = self.calendar.events[100].get_start_time()
+        self.end = self.calendar.events[400].get_start_time()
+
+    def assert_same_as_resolve(self, pattern):
+        expected = [event for event in self.columns.events if pattern.resolve(event)]
+        selected = self.columns.select(pattern)
+        self.assertEqual(len(selected), len(expected))
+        for event, expected_event in zip(selected, expected):
+            self.assertIs(event, expected_event)
+
+    def test_query(self):
+        """ tests that query returns the same events in the same order as Calendar.query """
+        for start, end in ((self.start, self.end), (self.end, self.start), (cal.Time(2000, 1, 1, 0, 0), cal.Time(2100, 1, 1, 0, 0))):
+            found = self.columns.query(start, end)
+            expected = self.calendar.query(start, end)
+            self.assertEqual(len(found), len(expected))
+            for event, expected_event in zip(found, expected):
+                self.assertIs(event, expected_event)
+
+    def test_sorted(self):
+        """ tests that events are sorted by start time with untimed events last """
+        self.assertEqual(len(self.columns), len(self.calendar.events))
+        self.assertEqual(self.columns.timed_count, len(self.calendar.events) - 2)
+        self.assertTrue((numpy.diff(self.columns.starts[:self.columns.timed_count]) >= 0).all())
+        self.assertFalse(self.columns.valid[self.columns.timed_count:].any())
+
+    def test_mask(self):
+        """ tests that masks of time, text and combined patterns give the same events as resolve """
+        in_time = PatternInTime(self.start, self.end)
+        has_text = PatternHasText('Föreläsning', ['SUMMARY'])
+        self.assert_same_as_resolve(in_time)
+        self.assert_same_as_resolve(PatternNot(in_time))
+        self.assert_same_as_resolve(has_text)
+        self.assert_same_as_resolve(PatternHasText('Lokal'))
+        self.assert_same_as_resolve(PatternAnd([in_time, PatternNot(has_text)]))
+        self.assert_same_as_resolve(PatternOr([PatternInTime(self.end, self.start), has_text, PatternAnd([])]))
+
+    def test_column(self):
+        """ tests that a column has the text of every event and None for missing fields """
+        column = self.columns.column('DTEND')
+        self.assertIs(column, self.columns.column('DTEND'))
+        for event, text in zip(self.columns.events, column):
+            self.assertEqual(text, event.find_field_text('DTEND'))
+        self.assertIn(None, list(column))
+
+    def test_to_calendar(self):
+        """ tests that the calendar has the same events in the sorted order """
+        calendar = self.columns.to_calendar()
+        self.assertEqual(calendar.events, self.columns.events)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,17 @@
 import pattern
 import cal
+import cal_raw
+import ics
+import src_cal
+import text_match
+import filter
+import action
+import metrics
+import build_trace
+from input_json import InputJSON
 
+from datetime import timedelta
+import random
 import unittest
 
 
@@ -91,5 +102,262 @@ class TestPatternInTime(unittest.TestCase):
         self.assertFalse(pat.resolve(event))
 
 
+class TestCompile(unittest.TestCase):
+    """ tests that compiled patterns and filters give the same results as the interpreted ones """
+    def setUp(self):
+        with open('TimeEdit_U1.b_2024-10-10_12_41.ics', 'rb') as file:
+            self.file_raw = file.read()
+        self.events = ics.read_calendar(self.file_raw).events
+
+    def random_pattern(self, rng: random.Random, depth: int = 0) -> pattern.Pattern:
+        kind = rng.choice(('has_text', 'in_time') if depth > 3 else ('has_text', 'in_time', 'and', 'or', 'not'))
+        match kind:
+            case 'has_text':
+                text = rng.choice(('TDDE', 'LA', 'Grupp 6', 'Lokal', 'FÖ', 'nothing'))
+                fields = rng.choice((None, [], ['SUMMARY'], ['LOCATION', 'SUMMARY', 'SUMMARY'], ['MISSING']))
+                return pattern.PatternHasText(text, fields)
+            case 'in_time':
+                start = cal.Time(2024, 10, 7, 0, 0) + rng.randrange(30) * timedelta(days=1)
+                return pattern.PatternInTime(start, start + rng.randrange(1, 10) * timedelta(days=1))
+            case 'and':
+                return pattern.PatternAnd(self.random_pattern(rng, depth + 1) for _ in range(rng.randrange(4)))
+            case 'or':
+                return pattern.PatternOr(self.random_pattern(rng, depth + 1) for _ in range(rng.randrange(4)))
+            case 'not':
+                return pattern.PatternNot(self.random_pattern(rng, depth + 1))
+
+    def test_patterns(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            pat = self.random_pattern(rng)
+            text_matcher = text_match.TextMatcher(
+                has_text for has_text in pat.walk() if isinstance(has_text, pattern.PatternHasText)
+            )
+            compiled = pat.compile()
+            compiled_with_matcher = pat.compile(text_matcher)
+            for event in self.events:
+                self.assertEqual(compiled(event), pat.resolve(event))
+                self.assertEqual(compiled_with_matcher(event), pat.resolve(event))
+
+    def test_build(self):
+        """ tests that build gives the same calendar as running Filter.check on every event by hand """
+        filters = InputJSON._get_filters(InputJSON._read_file('input_24HT2.json'))
+
+        expected = []
+        for event in ics.read_calendar(self.file_raw).events:
+            current_events = [event]
+            for filtr in filters:
+                current_events = [next_event for current_event in current_events for next_event in filtr.check(current_event)]
+            expected += [event.content for event in current_events]
+
+        source = src_cal.SrcCalCalendar(ics.read_calendar(self.file_raw))
+        built = cal_raw.UnbuiltCal([source], filters).build()
+        self.assertEqual([event.content for event in built.events], expected)
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        with open('TimeEdit_U1.b_2024-10-10_12_41.ics', 'rb') as file:
+            self.file_raw = file.read()
+        self.filters = InputJSON._get_filters(InputJSON._read_file('input_24HT2.json'))
+
+    def make_source(self) -> src_cal.SrcCalCalendar:
+        return src_cal.SrcCalCalendar(ics.read_calendar(self.file_raw))
+
+    def test_reuse(self):
+        """ tests that unchanged events are reused, changed and new ones are filtered and removed ones are dropped """
+        source = self.make_source()
+        unbuilt = cal_raw.UnbuiltCal([source], self.filters)
+        first = unbuilt.build()
+
+        source.calendar = ics.read_calendar(self.file_raw)
+        changed, removed = source.calendar.events[0], source.calendar.events.pop(1)
+        changed.write_field('LAST-MODIFIED', '20241011T080000Z')
+        changed.write_field('SUMMARY', 'TDDE24\\, Undervisningstyp: SE\\, Grupp S2')
+        second = unbuilt.build()
+
+        first_ids = {id(event) for event in first.events}
+        self.assertTrue(all(id(event) in first_ids for event in second.events))
+        self.assertNotIn(removed.get_field_text('UID'), [event.get_field_text('UID') for event in second.events])
+        self.assertNotIn(changed.get_field_text('UID'), [event.get_field_text('UID') for event in second.events])
+
+        source.calendar = ics.read_calendar(self.file_raw)
+        source.calendar.events.pop(1)
+        source.calendar.events[0].write_field('SUMMARY', 'TDDE24\\, Undervisningstyp: SE\\, Grupp S2')
+        expected = cal_raw.UnbuiltCal([source], self.filters).build(incremental=False)
+        self.assertEqual([event.content for event in second.events], [event.content for event in expected.events])
+
+    def test_parallel(self):
+        """ tests that a build in worker processes gives the same calendar in the same order """
+        expected = cal_raw.UnbuiltCal([self.make_source()], self.filters).build()
+        source = self.make_source()
+        original = [dict(event.content) for event in source.get_events()]
+        built = cal_raw.UnbuiltCal([source, self.make_source()], self.filters).build(processes=2)
+        self.assertEqual([event.content for event in built.events], [event.content for event in expected.events] * 2)
+        self.assertEqual([event.content for event in source.get_events()], original)
+
+    def test_iter_events(self):
+        """ tests that iter_events gives the same events as build and only reads the sources as far as needed """
+        expected = cal_raw.UnbuiltCal([self.make_source()], self.filters).build()
+        unbuilt = cal_raw.UnbuiltCal([self.make_source()], self.filters)
+        self.assertEqual([event.content for event in unbuilt.iter_events()], [event.content for event in expected.events])
+
+        read = []
+
+        class SrcCalCounting(src_cal.SrcCal):
+            def get_events(inner_self):
+                for event in ics.iter_events((self.file_raw,)):
+                    read.append(event)
+                    yield event
+
+        stream = cal_raw.UnbuiltCal([SrcCalCounting()], self.filters).iter_events()
+        first = next(stream)
+        self.assertLess(len(read), 5)
+        self.assertEqual(first.content, expected.events[0].content)
+
+    def test_sources_unchanged(self):
+        """ tests that building never changes the source events and that added events are new events every time """
+        source = self.make_source()
+        original = [dict(event.content) for event in source.get_events()]
+        added = cal.Event({'SUMMARY': 'added'})
+        filters = self.filters + [filter.Filter(pattern.PatternHasText('TDDE'), action.ActionAddEvent(added))]
+        built = cal_raw.UnbuiltCal([source], filters).build()
+
+        self.assertEqual([event.content for event in source.get_events()], original)
+        added_events = [event for event in built.events if event.content == {'SUMMARY': 'added'}]
+        self.assertGreater(len(added_events), 1)
+        self.assertEqual(len({id(event) for event in added_events}), len(added_events))
+
+    def test_shared_uid(self):
+        """ tests that events of different sources with the same UID and LAST-MODIFIED are never mixed up """
+        def make_source(summary: str) -> src_cal.SrcCalCalendar:
+            return src_cal.SrcCalCalendar(cal.Calendar([cal.Event({'UID': 'same', 'LAST-MODIFIED': '20241010T080000Z', 'SUMMARY': summary})]))
+
+        unbuilt = cal_raw.UnbuiltCal([make_source('first'), make_source('second')], [])
+        for processes in (None, None, 2):
+            built = unbuilt.build(processes=processes)
+            self.assertEqual([event.get_field_text('SUMMARY') for event in built.events], ['first', 'second'])
+
+    def test_src_cal_unbuilt(self):
+        """ tests that a built calendar can be a source of another with its own filters """
+        inner = cal_raw.UnbuiltCal([self.make_source()], self.filters)
+        expected = cal_raw.UnbuiltCal([self.make_source()], self.filters).build()
+        source = cal_raw.SrcCalUnbuilt(inner)
+        self.assertTrue(source.needs_fetch())
+        built = cal_raw.UnbuiltCal([source, self.make_source()], []).build()
+        self.assertEqual(len(built.events), len(expected.events) + len(self.make_source().get_events()))
+        self.assertEqual(source.get_validator(), inner.get_fingerprint())
+        self.assertIsNone(source.get_refresh_interval())
+        self.assertFalse(source.refresh())
+
+    def test_src_cal_unbuilt_failing_refresh(self):
+        """ tests that a change of one inner source reaches the built calendar even if another inner source fails """
+        class SrcCalChanging(src_cal.SrcCalCalendar):
+            def refresh(inner_self) -> bool:
+                inner_self.calendar = cal.Calendar(inner_self.calendar.events[1:])
+                return True
+
+        class SrcCalFailing(src_cal.SrcCalCalendar):
+            def refresh(inner_self) -> bool:
+                raise RuntimeError('broken')
+
+        changing = SrcCalChanging(ics.read_calendar(self.file_raw))
+        source = cal_raw.SrcCalUnbuilt(cal_raw.UnbuiltCal([changing, SrcCalFailing(cal.Calendar([]))], []))
+        source.fetch()
+        self.assertRaises(RuntimeError, source.refresh)
+        self.assertEqual(len(source.get_events()), len(changing.get_events()))
+        self.assertRaises(RuntimeError, source.refresh)
+        source.unbuilt_cal.src_cals.pop()
+        self.assertTrue(source.refresh())
+        self.assertFalse(cal_raw.SrcCalUnbuilt(cal_raw.UnbuiltCal([], [])).refresh())
+
+    def test_filters_changed(self):
+        """ tests that nothing is reused once the filters change """
+        unbuilt = cal_raw.UnbuiltCal([self.make_source()], self.filters)
+        first = unbuilt.build()
+        unbuilt.filters = self.filters[:-1]
+        unbuilt.src_cals = [self.make_source()]
+        second = unbuilt.build()
+        self.assertFalse({id(event) for event in first.events} & {id(event) for event in second.events})
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        with open('TimeEdit_U1.b_2024-10-10_12_41.ics', 'rb') as file:
+            self.calendar = ics.read_calendar(file.read())
+        self.filters = InputJSON._get_filters(InputJSON._read_file('input_24HT2.json'))
+
+    def test_counts(self):
+        """ tests that the counts of a measured build add up and that the calendar is the same as without metrics """
+        unbuilt = cal_raw.UnbuiltCal([src_cal.SrcCalCalendar(self.calendar)], self.filters)
+        build_metrics = metrics.BuildMetrics()
+        built = unbuilt.build(incremental=False, metrics=build_metrics)
+        expected = cal_raw.UnbuiltCal([src_cal.SrcCalCalendar(self.calendar)], self.filters).build(incremental=False)
+        self.assertEqual([event.content for event in built.events], [event.content for event in expected.events])
+
+        self.assertEqual(build_metrics.sources[0].events, len(self.calendar.events))
+        self.assertEqual(build_metrics.events_filtered, len(self.calendar.events))
+        self.assertEqual(build_metrics.events_out, len(built.events))
+        self.assertEqual(len(build_metrics.filters), len(self.filters))
+
+        events = list(self.calendar.events)
+        for filtr, filter_metrics in zip(self.filters, build_metrics.filters):
+            self.assertEqual(filter_metrics.events_in, len(events))
+            self.assertEqual(filter_metrics.matches, len([event for event in events if filtr.pattern.resolve(event)]))
+            events = [next_event for event in events for next_event in filtr.check(event)]
+            self.assertEqual(filter_metrics.events_out, len(events))
+        self.assertGreater(sum(filtr.pattern_seconds for filtr in build_metrics.filters), 0)
+
+        report = build_metrics.to_dict()
+        self.assertEqual(report['filters'][0]['events_in'], len(self.calendar.events))
+        self.assertEqual(report['sources'][0]['source'], 'SrcCalCalendar')
+        self.assertIn('Filters:', str(build_metrics))
+
+    def test_iter_events_out(self):
+        """ tests that iter_events reports the events out """
+        expected = metrics.BuildMetrics()
+        cal_raw.UnbuiltCal([src_cal.SrcCalCalendar(self.calendar)], self.filters).build(metrics=expected)
+        streamed = metrics.BuildMetrics()
+        events = list(cal_raw.UnbuiltCal([src_cal.SrcCalCalendar(self.calendar)], self.filters).iter_events(metrics=streamed))
+        self.assertEqual(streamed.events_out, len(events))
+        self.assertEqual(streamed.events_out, expected.events_out)
+
+    def test_memo_kept(self):
+        """ tests that builds and streams that arent incremental leave the memo for the next incremental build """
+        unbuilt = cal_raw.UnbuiltCal([src_cal.SrcCalCalendar(self.calendar)], self.filters)
+        unbuilt.build()
+        list(unbuilt.iter_events())
+        unbuilt.build(incremental=False)
+        build_metrics = metrics.BuildMetrics()
+        unbuilt.build(metrics=build_metrics)
+        self.assertEqual(build_metrics.events_reused, len(self.calendar.events))
+
+    def test_traced(self):
+        """ tests that traced events are run through the measured filters and counted by them """
+        expected = metrics.BuildMetrics()
+        cal_raw.UnbuiltCal([src_cal.SrcCalCalendar(self.calendar)], self.filters).build(metrics=expected)
+        traced = metrics.BuildMetrics()
+        tracer = build_trace.BuildTracer(sample_rate=1.0)
+        events = list(cal_raw.UnbuiltCal([src_cal.SrcCalCalendar(self.calendar)], self.filters).iter_events(metrics=traced, tracer=tracer))
+
+        self.assertEqual(len(tracer.traces), len(self.calendar.events))
+        self.assertEqual(traced.events_out, len(events))
+        for filter_metrics, expected_metrics in zip(traced.filters, expected.filters):
+            self.assertEqual(
+                (filter_metrics.events_in, filter_metrics.matches, filter_metrics.events_out),
+                (expected_metrics.events_in, expected_metrics.matches, expected_metrics.events_out),
+            )
+
+    def test_reused(self):
+        """ tests that events reused by an incremental build are counted and not run through the filters """
+        unbuilt = cal_raw.UnbuiltCal([src_cal.SrcCalCalendar(self.calendar)], self.filters)
+        unbuilt.build()
+        build_metrics = metrics.BuildMetrics()
+        unbuilt.build(metrics=build_metrics)
+        self.assertEqual(build_metrics.events_reused, len(self.calendar.events))
+        self.assertEqual(build_metrics.events_filtered, 0)
+        self.assertTrue(all(filtr.events_in == 0 for filtr in build_metrics.filters))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,84 @@
+import cal_server
+import cal
+import ics
+
+import gzip
+import http.client
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TestCalendarServer(unittest.TestCase):
+    def setUp(self):
+        with open('TimeEdit_U1.b_2024-10-10_12_41.ics', 'rb') as file:
+            self.calendar_info = {}
+            self.calendar = ics.read_calendar(file.read(), self.calendar_info)
+
+        self.server = cal_server.CalendarServer(port=0)
+        self.server.publish(self.calendar, cal.Time(2024, 10, 7, 0, 0), cal.Time(2024, 10, 20, 0, 0), self.calendar_info)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def _get(self, path: str, headers: dict[str, str] = {}, method: str = 'GET') -> tuple[int, dict[str, str], bytes]:
+        connection = http.client.HTTPConnection('127.0.0.1', self.server.port, timeout=10)
+        try:
+            connection.request(method, path, headers=headers)
+            response = connection.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        finally:
+            connection.close()
+
+    def test_ics(self):
+        """ tests that the published ics can be read back """
+        status, headers, body = self._get('/calendar.ics')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertNotIn('Content-Encoding', headers)
+        events = ics.read_calendar(body).events
+        self.assertEqual([event.content for event in events], [event.content for event in self.calendar.events])
+
+    def test_pages(self):
+        status, _, body = self._get('/')
+        self.assertEqual(status, 200)
+        self.assertIn(b'href="week_2024-W41.html"', body)
+
+        status, _, body = self._get('/week_2024-W42.html')
+        self.assertEqual(status, 200)
+        self.assertIn(b'href="output_week.css"', body)
+        self.assertEqual(self._get('/output_week.css')[0], 200)
+        self.assertEqual(self._get('/week_2024-W43.html')[0], 404)
+
+    def test_etag_and_gzip(self):
+        """ tests conditional requests and gzip for both encodings """
+        _, headers, body = self._get('/calendar.ics')
+        self.assertEqual(self._get('/calendar.ics', {'If-None-Match': headers['ETag']})[0], 304)
+
+        status, gzip_headers, gzip_body = self._get('/calendar.ics', {'Accept-Encoding': 'gzip'})
+        self.assertEqual(status, 200)
+        self.assertEqual(gzip_headers['Content-Encoding'], 'gzip')
+        self.assertNotEqual(gzip_headers['ETag'], headers['ETag'])
+        self.assertEqual(gzip.decompress(gzip_body), body)
+        self.assertEqual(self._get('/calendar.ics', {'If-None-Match': gzip_headers['ETag'], 'Accept-Encoding': 'gzip'})[0], 304)
+        self.assertNotIn('Content-Encoding', self._get('/calendar.ics', {'Accept-Encoding': 'gzip;q=0'})[1])
+
+        status, head_headers, head_body = self._get('/calendar.ics', method='HEAD')
+        self.assertEqual((status, head_body), (200, b''))
+        self.assertEqual(head_headers['ETag'], headers['ETag'])
+
+        # a new calendar changes the ETag so clients get the new version
+        self.server.publish(cal.Calendar(self.calendar.events[:10]))
+        self.assertEqual(self._get('/calendar.ics', {'If-None-Match': headers['ETag']})[0], 200)
+        self.assertEqual(self._get('/')[0], 404)
+
+    def test_concurrent(self):
+        _, _, expected = self._get('/calendar.ics')
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: self._get('/calendar.ics'), range(32)))
+        for status, _, body in results:
+            self.assertEqual((status, body), (200, expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import cli
+import cal
+import cal_raw
+import ics
+import snapshot
+import src_cal
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+class TestCli(unittest.TestCase):
+    """ tests the commands on a snapshot of the example calendar, so nothing is fetched """
+    def setUp(self):
+        with open('TimeEdit_U1.b_2024-10-10_12_41.ics', 'rb') as file:
+            self.calendar = ics.read_calendar(file.read())
+        self.directory = tempfile.TemporaryDirectory()
+        self.snapshot = os.path.join(self.directory.name, 'snapshot.bin')
+        snapshot.save_snapshot(self.snapshot, self.calendar, '0' * 64)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_cli(self, command: str, *args: str) -> None:
+        cli.main([command, 'input_24HT2.json', '--snapshot', self.snapshot, '--from-snapshot', *args])
+
+    def test_export_ics(self):
+        output = os.path.join(self.directory.name, 'out.ics')
+        self.run_cli('export-ics', '-o', output)
+        with open(output, 'rb') as file:
+            events = ics.read_calendar(file.read()).events
+        self.assertEqual([event.content for event in events], [event.content for event in self.calendar.events])
+
+    def test_export_ics_streamed(self):
+        """ tests that exporting without a snapshot streams the events and keeps no memo of the built calendar """
+        unbuilt = cal_raw.UnbuiltCal([src_cal.SrcCalCalendar(self.calendar)], [])
+        output = os.path.join(self.directory.name, 'out.ics')
+        get_unbuilt_cal, cli.get_unbuilt_cal = cli.get_unbuilt_cal, lambda args: unbuilt
+        try:
+            cli.main(['export-ics', 'input_24HT2.json', '-o', output])
+        finally:
+            cli.get_unbuilt_cal = get_unbuilt_cal
+        with open(output, 'rb') as file:
+            events = ics.read_calendar(file.read()).events
+        self.assertEqual(len(events), len(self.calendar.events))
+        self.assertEqual(unbuilt._memo, {})
+
+    def test_render_week(self):
+        output = os.path.join(self.directory.name, 'week.html')
+        self.run_cli('render-week', '2024-10-09', '-o', output)
+        with open(output, encoding='utf-8') as file:
+            html = file.read()
+        week = self.calendar.query(cal.Time(2024, 10, 7, 0, 0), cal.Time(2024, 10, 14, 0, 0))
+        self.assertEqual(html.count('class="event"'), len(week))
+
+    def test_invalid(self):
+        with open(os.devnull, 'w') as devnull:
+            stderr, sys.stderr = sys.stderr, devnull
+            try:
+                self.assertRaises(SystemExit, cli.main, ['render-week', 'input_24HT2.json', '2024-13-01'])
+                self.assertRaises(SystemExit, cli.main, ['build', 'input_24HT2.json', '--from-snapshot'])
+            finally:
+                sys.stderr = stderr
+
+    def test_heavy_imports(self):
+        """ tests that the headless path never imports the GUI or HTTP libraries """
+        code = (
+            'import sys\n'
+            'import cli\n'
+            f'cli.main(["export-ics", "input_24HT2.json", "--snapshot", {self.snapshot!r}, "--from-snapshot", "-o", {os.path.join(self.directory.name, "out.ics")!r}])\n'
+            'heavy = sorted(name for name in sys.modules if name.split(".")[0] in ("kivy", "requests", "urllib3", "numpy"))\n'
+            'print(heavy)\n'
+        )
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import fetch_cache
+import cal
+
+import os
+import tempfile
+import unittest
+
+
+class TestFetchCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.url = 'https://cloud.timeedit.net/liu/web/schema/example.ics'
+        self.calendar = cal.Calendar([cal.Event({'SUMMARY': 'TDDE24', 'DTSTART': '20241007T061500Z'})])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_ttl(self):
+        """ tests that the ttl is read from X-PUBLISHED-TTL """
+        entry = fetch_cache.CacheEntry.from_calendar(self.url, self.calendar, {'X-PUBLISHED-TTL': 'PT20M'})
+        self.assertEqual(entry.ttl, 20 * 60)
+        self.assertTrue(entry.is_fresh())
+        self.assertFalse(entry.is_fresh(entry.fetched_at + 20 * 60))
+
+        entry = fetch_cache.CacheEntry.from_calendar(self.url, self.calendar, {}, default_ttl=5)
+        self.assertEqual(entry.ttl, 5)
+
+    def test_validators(self):
+        entry = fetch_cache.CacheEntry.from_calendar(self.url, self.calendar, {}, '"abc"', 'Thu, 10 Oct 2024 12:41:25 GMT')
+        self.assertEqual(entry.get_validators(), {
+            'If-None-Match': '"abc"',
+            'If-Modified-Since': 'Thu, 10 Oct 2024 12:41:25 GMT',
+        })
+        self.assertEqual(fetch_cache.CacheEntry.from_calendar(self.url, self.calendar, {}).get_validators(), {})
+
+    def test_store_load(self):
+        """ tests that entries survive a new cache object, i.e. a restart of the program """
+        entry = fetch_cache.CacheEntry.from_calendar(self.url, self.calendar, {'X-PUBLISHED-TTL': 'PT20M'}, '"abc"')
+        fetch_cache.FetchCache(self.directory.name).store(entry)
+
+        loaded = fetch_cache.FetchCache(self.directory.name).load(self.url)
+        self.assertEqual(loaded.to_json(), entry.to_json())
+        self.assertEqual([event.content for event in loaded.get_calendar().events], [self.calendar.events[0].content])
+        self.assertIsNone(fetch_cache.FetchCache(self.directory.name).load(self.url + '?other'))
+
+    def test_calendar_is_copy(self):
+        """ tests that changing a calendar from the cache doesnt change the cache and that the fields are shared """
+        entry = fetch_cache.CacheEntry.from_calendar(self.url, self.calendar, {})
+        self.assertIs(entry.get_calendar().events[0]._base, self.calendar.events[0]._base)
+        self.calendar.events[0].write_field('SUMMARY', 'changed')
+        self.assertEqual(entry.get_calendar().events[0].get_field_text('SUMMARY'), 'TDDE24')
+        entry.get_calendar().events[0].write_field('SUMMARY', 'changed')
+        self.assertEqual(entry.get_calendar().events[0].get_field_text('SUMMARY'), 'TDDE24')
+
+    def test_corrupt(self):
+        """ tests that a broken cache file is treated as a missing entry """
+        cache = fetch_cache.FetchCache(self.directory.name)
+        cache.store(fetch_cache.CacheEntry.from_calendar(self.url, self.calendar, {}))
+        path, = [os.path.join(self.directory.name, name) for name in os.listdir(self.directory.name)]
+        with open(path, 'w') as file:
+            file.write('{not json')
+        self.assertIsNone(fetch_cache.FetchCache(self.directory.name).load(self.url))
+
+        cache.remove(self.url)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
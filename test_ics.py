@@ -0,0 +1,164 @@
+import ics
+
+import io
+import os
+import tempfile
+import unittest
+
+
+class TestReadIcs(unittest.TestCase):
+    """Class for testing the streaming ics reader."""
+    def setUp(self):
+        with open('TimeEdit_U1.b_2024-10-10_12_41.ics', 'rb') as file:
+            self.file_raw = file.read()
+
+    def test_file(self):
+        """Tests reading the TimeEdit example file in one piece."""
+        calendar_info = {}
+        calendar = ics.read_calendar(self.file_raw, calendar_info)
+        self.assertEqual(len(calendar.events), self.file_raw.count(b'BEGIN:VEVENT'))
+        self.assertEqual(calendar_info['X-PUBLISHED-TTL'], 'PT20M')
+
+        event = calendar.events[0]
+        self.assertEqual(event.get_field_text('SUMMARY'), '9AMA57\\, TATA65\\, Undervisningstyp: FÖ\\, D1\\, U1')
+        self.assertEqual(event.get_field_text('DESCRIPTION'), 'Lärare: Carl Johan Casselgren \\nFöreläsning\\nID 3234768')
+
+    def test_chunks(self):
+        """Tests that the result doesnt depend on how the input is split into chunks."""
+        expected = [event.content for event in ics.read_calendar(self.file_raw).events]
+        for size in (1, 2, 3, 7, 1000):
+            chunks = (self.file_raw[i:i + size] for i in range(0, len(self.file_raw), size))
+            self.assertEqual([event.content for event in ics.iter_events(chunks)], expected)
+
+    def test_line_endings(self):
+        """Tests LF line endings and tab folded lines."""
+        lf_file = self.file_raw.decode('utf-8').replace('\r\n\t', '\r\n ').replace('\r\n', '\n')
+        tab_file = self.file_raw.decode('utf-8').replace('\r\n ', '\r\n\t')
+        expected = [event.content for event in ics.read_calendar(self.file_raw).events]
+        self.assertEqual([event.content for event in ics.read_calendar(lf_file).events], expected)
+        self.assertEqual([event.content for event in ics.read_calendar(tab_file).events], expected)
+
+    def test_empty_lines(self):
+        """Tests that empty lines are skipped together with continuation lines right after them."""
+        file_raw = '\r\n'.join((
+            'BEGIN:VCALENDAR',
+            'BEGIN:VEVENT',
+            'SUMMARY:ev',
+            ' ent',
+            '',
+            ' orphan continuation',
+            'LOCATION:room',
+            '',
+            'END:VEVENT',
+            'END:VCALENDAR',
+        ))
+        self.assertEqual(list(ics.iter_lines(file_raw))[2:4], ['SUMMARY:event', 'LOCATION:room'])
+        events = ics.read_calendar(file_raw).events
+        self.assertEqual([event.content for event in events], [{'SUMMARY': 'event', 'LOCATION': 'room'}])
+
+    def test_nested(self):
+        """Tests that components inside the calendar other than VEVENT are skipped."""
+        file_raw = '\r\n'.join((
+            'BEGIN:VCALENDAR',
+            'X-WR-CALNAME:cal',
+            'BEGIN:VTIMEZONE',
+            'TZID:Europe/Stockholm',
+            'END:VTIMEZONE',
+            'BEGIN:VEVENT',
+            'SUMMARY:event',
+            'BEGIN:VALARM',
+            'ACTION:DISPLAY',
+            'END:VALARM',
+            'END:VEVENT',
+            'END:VCALENDAR',
+        ))
+        calendar_info = {}
+        events = ics.read_calendar(file_raw, calendar_info).events
+        self.assertEqual([event.content for event in events], [{'SUMMARY': 'event'}])
+        self.assertEqual(calendar_info, {'X-WR-CALNAME': 'cal'})
+
+    def test_invalid(self):
+        """Tests input without a complete VCALENDAR."""
+        self.assertRaises(ValueError, ics.read_calendar, '')
+        self.assertRaises(ValueError, ics.read_calendar, 'BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\n')
+        self.assertRaises(ValueError, ics.read_calendar, 'BEGIN:VCALENDAR\r\nnot a line\r\nEND:VCALENDAR')
+
+
+class TestParseDuration(unittest.TestCase):
+    def test_valid(self):
+        self.assertEqual(ics.parse_duration('PT20M'), 20 * 60)
+        self.assertEqual(ics.parse_duration('P1DT2H'), 26 * 3600)
+        self.assertEqual(ics.parse_duration('P2W'), 14 * 86400)
+        self.assertEqual(ics.parse_duration('-PT30S'), -30)
+
+    def test_invalid(self):
+        for duration in ('', 'P', 'PT', '20M', 'PT20X'):
+            self.assertRaises(ValueError, ics.parse_duration, duration)
+
+
+class TestWriteIcs(unittest.TestCase):
+    """Class for testing the streaming ics writer."""
+    def setUp(self):
+        with open('TimeEdit_U1.b_2024-10-10_12_41.ics', 'rb') as file:
+            self.calendar_info = {}
+            self.calendar = ics.read_calendar(file.read(), self.calendar_info)
+
+    def test_round_trip(self):
+        """Tests that writing and reading a calendar gives back the same events and calendar info."""
+        stream = io.BytesIO()
+        ics.write_ics(stream, self.calendar.events, self.calendar_info)
+
+        calendar_info = {}
+        calendar = ics.read_calendar(stream.getvalue(), calendar_info)
+        self.assertEqual([event.content for event in calendar.events], [event.content for event in self.calendar.events])
+        self.assertEqual(calendar_info, self.calendar_info)
+
+    def test_folding(self):
+        """Tests that every line is at most 75 octets, ends with CRLF and that characters are never split."""
+        event = self.calendar.events[0].copy()
+        event.write_field('DESCRIPTION', 'åäö' * 100 + 'x' * 200)
+        event.write_field('LOCATION', 'raw\nline break')
+        text = ''.join(ics.iter_ics([event]))
+
+        self.assertTrue(text.endswith('\r\n'))
+        for line in text[:-2].split('\r\n'):
+            self.assertLessEqual(len(line.encode('utf-8')), 75)
+        self.assertNotIn('\n', text.replace('\r\n', ''))
+
+        written = ics.read_calendar(text).events[0]
+        self.assertEqual(written.get_field_text('DESCRIPTION'), 'åäö' * 100 + 'x' * 200)
+        self.assertEqual(written.get_field_text('LOCATION'), 'raw\\nline break')
+
+    def test_text_stream_and_file(self):
+        """Tests that text streams, files and lazy iterables all give the same output."""
+        stream = io.BytesIO()
+        ics.write_ics(stream, self.calendar.events)
+        text_stream = io.StringIO(newline='')
+        ics.write_ics(text_stream, iter(self.calendar.events))
+        self.assertEqual(text_stream.getvalue().encode('utf-8'), stream.getvalue())
+
+        class Writer:
+            """ a text writer that isnt an io class """
+            def __init__(self):
+                self.parts = []
+
+            def write(self, text: str) -> None:
+                self.parts.append(text + '')
+
+        writer = Writer()
+        ics.write_ics(writer, self.calendar.events)
+        self.assertEqual(''.join(writer.parts).encode('utf-8'), stream.getvalue())
+        writer = Writer()
+        ics.write_ics(writer, self.calendar.events, binary=False)
+        self.assertEqual(''.join(writer.parts).encode('utf-8'), stream.getvalue())
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'out.ics')
+            ics.write_ics_file(path, (event for event in self.calendar.events))
+            with open(path, 'rb') as file:
+                self.assertEqual(file.read(), stream.getvalue())
+            self.assertEqual(os.listdir(directory), ['out.ics'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import output_term
+import cal
+import ics
+
+import os
+from datetime import timedelta
+import tempfile
+import unittest
+
+
+class TestOutputTerm(unittest.TestCase):
+    def setUp(self):
+        with open('TimeEdit_U1.b_2024-10-10_12_41.ics', 'rb') as file:
+            self.calendar = ics.read_calendar(file.read())
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_weeks(self):
+        """ tests that every week has the events that overlap it """
+        term = output_term.OutputTerm(cal.Time(2024, 10, 9, 0, 0), cal.Time(2024, 10, 27, 0, 0), self.calendar, self.directory.name)
+        self.assertEqual([monday.as_tuple()[:3] for monday in term.mondays], [(2024, 10, 7), (2024, 10, 14), (2024, 10, 21)])
+        for monday, events in zip(term.mondays, term.week_events):
+            self.assertEqual(events, self.calendar.query(monday, monday + timedelta(days=7)))
+            for event in events:
+                self.assertLess(event.get_start_time(), monday + timedelta(days=7))
+                self.assertGreater(event.get_end_time(), monday)
+
+    def test_week_boundary(self):
+        """ tests that an event crossing a week boundary is in both weeks, also when it starts before the first week """
+        crossing = cal.Event({'SUMMARY': 'Crossing', 'DTSTART': '20241013T220000Z', 'DTEND': '20241014T020000Z'})
+        before = cal.Event({'SUMMARY': 'Before', 'DTSTART': '20241006T200000Z', 'DTEND': '20241007T010000Z'})
+        calendar = cal.Calendar([crossing, before])
+        term = output_term.OutputTerm(cal.Time(2024, 10, 7, 0, 0), cal.Time(2024, 10, 14, 0, 0), calendar, self.directory.name)
+        self.assertEqual(term.week_events, [[before, crossing], [crossing]])
+
+    def test_write(self):
+        """ tests the written pages, their navigation links and rendering in worker processes """
+        term = output_term.OutputTerm(cal.Time(2024, 10, 7, 0, 0), cal.Time(2024, 10, 20, 0, 0), self.calendar, self.directory.name)
+        term.write_to_files()
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ['index.html', 'week_2024-W41.html', 'week_2024-W42.html'])
+
+        with open(os.path.join(self.directory.name, 'week_2024-W41.html'), encoding='utf-8') as file:
+            first_week = file.read()
+        self.assertIn('href="week_2024-W42.html"', first_week)
+        self.assertNotIn('week-nav-prev', first_week)
+        self.assertEqual(first_week.count('class="event"'), len(term.week_events[0]))
+
+        with open(os.path.join(self.directory.name, 'index.html'), encoding='utf-8') as file:
+            self.assertIn('href="week_2024-W42.html"', file.read())
+
+        pages = {}
+        for name in os.listdir(self.directory.name):
+            with open(os.path.join(self.directory.name, name), encoding='utf-8') as file:
+                pages[name] = file.read()
+        term.write_to_files(processes=2)
+        for name, page in pages.items():
+            with open(os.path.join(self.directory.name, name), encoding='utf-8') as file:
+                self.assertEqual(file.read(), page)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import output_week
+import cal
+import ics
+
+import io
+import os
+import tempfile
+import unittest
+
+
+class TestOutputWeek(unittest.TestCase):
+    def setUp(self):
+        with open('TimeEdit_U1.b_2024-10-10_12_41.ics', 'rb') as file:
+            self.calendar = ics.read_calendar(file.read())
+        self.week_range = [cal.Time(2024, 10, 7 + i, 0, 0) for i in range(7)]
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.directory.name, 'output_week.html')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_render(self):
+        """ tests that rendering to a stream, a string and a file give the same page """
+        output = output_week.OutputWeek(self.week_range, self.calendar, self.file_name)
+        stream = io.StringIO()
+        output.render(stream)
+        page = output.render_to_string()
+        self.assertEqual(stream.getvalue(), page)
+        self.assertTrue(page.startswith('<!Doctype html>\n'))
+        self.assertEqual(page.count('class="event"'), len(self.calendar.query(self.week_range[0], self.week_range[-1])))
+
+        output.write_to_file()
+        with open(self.file_name, 'r', encoding='utf-8') as file:
+            self.assertEqual(file.read(), page)
+        self.assertEqual(os.listdir(self.directory.name), ['output_week.html'])
+
+
+if __name__ == '__main__':
+    unittest.main()
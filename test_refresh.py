@@ -0,0 +1,124 @@
+import refresh
+import cal_raw
+import src_cal
+import http_session
+
+import threading
+import unittest
+
+
+class TestRefreshDaemon(unittest.TestCase):
+    """ tests the daemon with sources served from a LocalTransport, the sources are only refreshed by refresh_now
+    and the tests wait for the requests or listeners with a timeout instead of sleeping """
+    def setUp(self):
+        with open('TimeEdit_U1.b_2024-10-10_12_41.ics', 'rb') as file:
+            self.file_raw = file.read()
+        self.body = self.file_raw
+        self.url = 'https://cloud.timeedit.net/liu/web/schema/example.ics'
+        self.requests = 0
+        self.served = threading.Condition()
+
+        def handler(headers):
+            with self.served:
+                self.requests += 1
+                self.served.notify_all()
+            return http_session.LocalResponse(200, self.body)
+
+        session = http_session.HTTPSession(http_session.LocalTransport({self.url: handler}))
+        self.src_cals = [src_cal.SrcCalURL(self.url, None, session, refresh_interval=60 * 60) for _ in range(2)]
+        self.calendars = []
+        self.built = threading.Event()
+
+        def listener(calendar):
+            self.calendars.append(calendar)
+            self.built.set()
+
+        self.daemon = refresh.RefreshDaemon(cal_raw.UnbuiltCal(self.src_cals, []), [listener], coalesce_delay=0, seed=0)
+        self.daemon.start()
+        self.assertTrue(self.built.wait(5))
+        self.built.clear()
+
+    def tearDown(self):
+        self.daemon.stop()
+
+    def refresh(self):
+        """ refreshes every source and waits until all of them have been requested """
+        with self.served:
+            expected = self.requests + len(self.src_cals)
+            self.daemon.refresh_now()
+            self.assertTrue(self.served.wait_for(lambda: self.requests >= expected, 5))
+
+    def test_unchanged(self):
+        """ tests that refreshing sources that havent changed doesnt rebuild """
+        # the daemon builds in the same round as the refresh that changed a source,
+        # so once the second round has been requested the first round is done
+        self.refresh()
+        self.refresh()
+        self.assertEqual(self.daemon.build_count, 1)
+        self.assertEqual(len(self.calendars), 1)
+        self.assertEqual(len(self.calendars[0].events), 2 * self.file_raw.count(b'BEGIN:VEVENT'))
+
+    def test_changed(self):
+        """ tests that both sources changing at once gives one rebuild with the new events """
+        first_event = self.file_raw.index(b'BEGIN:VEVENT')
+        second_event = self.file_raw.index(b'BEGIN:VEVENT', first_event + 1)
+        self.body = self.file_raw[:first_event] + self.file_raw[second_event:]
+
+        self.refresh()
+        self.assertTrue(self.built.wait(5))
+        self.refresh()
+        self.assertEqual(self.daemon.build_count, 2)
+        self.assertEqual(len(self.calendars), 2)
+        self.assertEqual(len(self.calendars[-1].events), 2 * (self.file_raw.count(b'BEGIN:VEVENT') - 1))
+
+    def test_error(self):
+        """ tests that a failing refresh is reported and the old calendar is kept """
+        errors = []
+        reported = threading.Event()
+
+        def on_error(source, exception):
+            errors.append(exception)
+            if len(errors) == len(self.src_cals):
+                reported.set()
+
+        self.daemon.on_error = on_error
+        self.body = b'not a calendar'
+        self.daemon.refresh_now()
+        self.assertTrue(reported.wait(5))
+        self.refresh()
+        self.assertTrue(all(isinstance(error, ValueError) for error in errors))
+        self.assertEqual(self.daemon.build_count, 1)
+        self.assertEqual(len(self.src_cals[0].cal.events), self.file_raw.count(b'BEGIN:VEVENT'))
+
+
+class TestRebuildRetry(unittest.TestCase):
+    def test_failed_rebuild(self):
+        """ tests that a failed rebuild is reported with None as the source and retried after RETRY_INTERVAL """
+        failures = [RuntimeError('broken')]
+
+        class SrcCalFailing(src_cal.SrcCal):
+            def get_events(self):
+                if failures:
+                    raise failures.pop()
+                return []
+
+        errors = []
+        built = threading.Event()
+        daemon = refresh.RefreshDaemon(
+            cal_raw.UnbuiltCal([SrcCalFailing()], []),
+            [lambda calendar: built.set()],
+            on_error=lambda source, exception: errors.append((source, exception)),
+        )
+        daemon.RETRY_INTERVAL = 0.1
+        daemon.start()
+        try:
+            self.assertTrue(built.wait(5))
+        finally:
+            daemon.stop()
+        self.assertEqual(len(errors), 1)
+        self.assertIsNone(errors[0][0])
+        self.assertEqual(daemon.build_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import snapshot
+import cal
+import cal_raw
+import ics
+import src_cal
+import fetch_cache
+import http_session
+from input_json import InputJSON
+
+import os
+import tempfile
+import threading
+import unittest
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        with open('TimeEdit_U1.b_2024-10-10_12_41.ics', 'rb') as file:
+            self.file_raw = file.read()
+        self.filters = InputJSON._get_filters(InputJSON._read_file('input_24HT2.json'))
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'snapshot.bin')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_unbuilt(self, file_raw: bytes) -> cal_raw.UnbuiltCal:
+        return cal_raw.UnbuiltCal([src_cal.SrcCalCalendar(ics.read_calendar(file_raw))], self.filters)
+
+    def test_round_trip(self):
+        """ tests that a loaded snapshot has the same events, times and shared strings """
+        calendar = self.make_unbuilt(self.file_raw).build()
+        calendar.events[0].write_field('DTSTART', 'not a time')
+        data = snapshot.dump_snapshot(calendar, '0' * 64)
+        self.assertEqual(snapshot.read_fingerprint(data), '0' * 64)
+
+        loaded = snapshot.load_snapshot(data)
+        self.assertEqual([event.content for event in loaded.events], [event.content for event in calendar.events])
+        self.assertRaises(ValueError, loaded.events[0].get_start_time)
+        for event, expected in zip(loaded.events[1:], calendar.events[1:]):
+            self.assertEqual(event.get_start_time(), expected.get_start_time())
+            self.assertEqual(event.get_end_time(), expected.get_end_time())
+
+        first_week = (cal.Time(2024, 10, 7, 0, 0), cal.Time(2024, 10, 14, 0, 0))
+        self.assertEqual([event.content for event in loaded.query(*first_week)], [event.content for event in calendar.query(*first_week)])
+        self.assertIs(list(loaded.events[1].get_fields())[0], list(loaded.events[2].get_fields())[0])
+
+    def test_invalid(self):
+        data = snapshot.dump_snapshot(cal.Calendar([]), '0' * 64)
+        self.assertEqual(snapshot.load_snapshot(data).events, [])
+        for broken in (b'', b'not a snapshot' * 10, data[:-1], data + b'\0'):
+            self.assertRaises(ValueError, snapshot.load_snapshot, broken)
+        self.assertIsNone(snapshot.load_snapshot_file(self.path))
+
+    def test_build_with_snapshot(self):
+        """ tests that the snapshot is reused while the sources are unchanged and rebuilt when they change """
+        unbuilt = self.make_unbuilt(self.file_raw)
+        built = snapshot.build_with_snapshot(unbuilt, self.path)
+        fingerprint = unbuilt.get_fingerprint()
+        self.assertIsNotNone(snapshot.load_snapshot_file(self.path, fingerprint))
+
+        reloaded = snapshot.build_with_snapshot(self.make_unbuilt(self.file_raw), self.path)
+        self.assertEqual([event.content for event in reloaded.events], [event.content for event in built.events])
+        self.assertIsNot(reloaded.events[0].content, built.events[0].content)
+
+        first_event = self.file_raw.index(b'BEGIN:VEVENT')
+        second_event = self.file_raw.index(b'BEGIN:VEVENT', first_event + 1)
+        changed = self.make_unbuilt(self.file_raw[:first_event] + self.file_raw[second_event:])
+        self.assertNotEqual(changed.get_fingerprint(), fingerprint)
+        self.assertIsNone(snapshot.load_snapshot_file(self.path, changed.get_fingerprint()))
+        self.assertIsNotNone(snapshot.load_snapshot_file(self.path))
+
+        rebuilt = snapshot.build_with_snapshot(changed, self.path)
+        self.assertEqual([event.content for event in rebuilt.events], [event.content for event in changed.build(incremental=False).events])
+        self.assertIsNotNone(snapshot.load_snapshot_file(self.path, changed.get_fingerprint()))
+
+
+    def test_fresh_cache_not_fetched(self):
+        """ tests that a snapshot of sources with fresh cache entries is used without fetching or parsing them """
+        url = 'https://cloud.timeedit.net/liu/web/schema/example.ics'
+        transport = http_session.LocalTransport({url: http_session.LocalResponse(200, self.file_raw, {'ETag': '"v1"'})})
+        session = http_session.HTTPSession(transport)
+        cache_directory = os.path.join(self.directory.name, 'cache')
+
+        def make_unbuilt() -> cal_raw.UnbuiltCal:
+            source = src_cal.SrcCalURL(url, fetch_cache.FetchCache(cache_directory), session)
+            return cal_raw.UnbuiltCal([source], self.filters)
+
+        built = snapshot.build_with_snapshot(make_unbuilt(), self.path)
+        self.assertEqual(len(transport.requests), 1)
+
+        unbuilt = make_unbuilt()
+        loaded = snapshot.build_with_snapshot(unbuilt, self.path)
+        self.assertEqual(len(transport.requests), 1)
+        self.assertTrue(unbuilt.src_cals[0].needs_fetch())
+        self.assertEqual([event.content for event in loaded.events], [event.content for event in built.events])
+
+        unbuilt.filters = self.filters[:-1]
+        self.assertIsNone(snapshot.load_snapshot_file(self.path, unbuilt.get_fingerprint()))
+
+    def test_start_from_snapshot(self):
+        """ tests that the saved calendar is shown right away and that the background build replaces and saves it """
+        snapshot.save_snapshot(self.path, cal.Calendar([]), '0' * 64)
+        calendars = []
+        built = threading.Event()
+
+        def listener(calendar: cal.Calendar) -> None:
+            calendars.append(calendar)
+            if len(calendars) == 2:
+                built.set()
+
+        unbuilt = self.make_unbuilt(self.file_raw)
+        daemon = snapshot.start_from_snapshot(unbuilt, self.path, [listener])
+        try:
+            self.assertTrue(built.wait(5))
+        finally:
+            daemon.stop()
+        self.assertEqual(calendars[0].events, [])
+        self.assertGreater(len(calendars[1].events), 0)
+        saved = snapshot.load_snapshot_file(self.path, unbuilt.get_fingerprint())
+        self.assertEqual(len(saved.events), len(calendars[1].events))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import src_cal
+import fetch_cache
+import http_session
+from input_json import InputJSON
+
+import os
+import tempfile
+import unittest
+
+
+class TestSrcCalURL(unittest.TestCase):
+    """ tests fetching through a LocalTransport, nothing is sent over the network """
+    def setUp(self):
+        with open('TimeEdit_U1.b_2024-10-10_12_41.ics', 'rb') as file:
+            self.file_raw = file.read()
+        self.url = 'https://cloud.timeedit.net/liu/web/schema/example.ics'
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = fetch_cache.FetchCache(self.directory.name)
+
+        def respond(headers: dict[str, str]) -> http_session.LocalResponse:
+            if headers.get('If-None-Match') == '"v1"':
+                return http_session.LocalResponse(304)
+            return http_session.LocalResponse(200, self.file_raw, {'ETag': '"v1"'})
+
+        self.transport = http_session.LocalTransport({self.url: respond})
+        self.session = http_session.HTTPSession(self.transport, timeout=5)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_src_cal(self, cache: fetch_cache.FetchCache | None) -> src_cal.SrcCalURL:
+        return src_cal.SrcCalURL(self.url, cache, self.session)
+
+    def test_fetch(self):
+        """ tests a plain fetch and the headers sent with it """
+        source = self.make_src_cal(None)
+        self.assertTrue(source.needs_fetch())
+        events = source.get_events()
+        self.assertEqual(len(events), self.file_raw.count(b'BEGIN:VEVENT'))
+        self.assertEqual(source.calendar_info['X-PUBLISHED-TTL'], 'PT20M')
+
+        (url, headers, timeout), = self.transport.requests
+        self.assertEqual(url, self.url)
+        self.assertEqual(timeout, 5)
+        self.assertIn('gzip', headers['Accept-Encoding'])
+        self.assertNotIn('If-None-Match', headers)
+
+        fetch = source.get_last_fetch()
+        self.assertEqual(fetch.origin, 'network')
+        self.assertGreater(fetch.parse_seconds, 0)
+        self.assertGreaterEqual(fetch.fetch_seconds, 0)
+
+    def test_fresh_cache(self):
+        """ tests that no request is sent while the cached source is within its X-PUBLISHED-TTL """
+        self.make_src_cal(self.cache).fetch()
+        source = self.make_src_cal(fetch_cache.FetchCache(self.directory.name))
+        source.fetch()
+        self.assertEqual(len(self.transport.requests), 1)
+        self.assertEqual(len(source.cal.events), self.file_raw.count(b'BEGIN:VEVENT'))
+        self.assertEqual(source.get_last_fetch().origin, 'cache')
+
+    def test_not_modified(self):
+        """ tests that an expired cache entry is revalidated and reused on 304 Not Modified """
+        self.make_src_cal(self.cache).fetch()
+        entry = self.cache.load(self.url)
+        entry.fetched_at -= entry.ttl
+        expected = [event.content for event in entry.get_calendar().events]
+
+        source = self.make_src_cal(self.cache)
+        source.fetch()
+        self.assertEqual(self.transport.requests[-1][1]['If-None-Match'], '"v1"')
+        self.assertEqual([event.content for event in source.cal.events], expected)
+        self.assertEqual(source.get_last_fetch().origin, 'not_modified')
+        self.assertTrue(self.cache.load(self.url).is_fresh())
+
+    def test_not_modified_headers(self):
+        """ tests that a 304 Not Modified response updates the validators and ttl of the cache entry """
+        self.make_src_cal(self.cache).fetch()
+        entry = self.cache.load(self.url)
+        entry.calendar_info.pop('X-PUBLISHED-TTL')
+        transport = http_session.LocalTransport({self.url: http_session.LocalResponse(304, headers={'ETag': '"v2"', 'Cache-Control': 'max-age=60'})})
+        source = src_cal.SrcCalURL(self.url, self.cache, http_session.HTTPSession(transport))
+        source.refresh()
+
+        entry = fetch_cache.FetchCache(self.directory.name).load(self.url)
+        self.assertEqual(entry.etag, '"v2"')
+        self.assertEqual(entry.ttl, 60)
+        self.assertEqual(fetch_cache.parse_max_age('private, no-cache'), 0)
+        self.assertIsNone(fetch_cache.parse_max_age('private'))
+
+    def test_cache_not_writable(self):
+        """ tests that a fetch still gives the calendar if the cache cant be written """
+        not_a_directory = os.path.join(self.directory.name, 'file')
+        with open(not_a_directory, 'w'):
+            pass
+        cache = fetch_cache.FetchCache(not_a_directory)
+        source = self.make_src_cal(cache)
+        with self.assertWarns(RuntimeWarning):
+            source.fetch()
+        self.assertEqual(len(source.cal.events), self.file_raw.count(b'BEGIN:VEVENT'))
+
+        cache.load(self.url).fetched_at = 0
+        with self.assertWarns(RuntimeWarning):
+            self.assertFalse(source.refresh())
+        self.assertEqual(source.get_last_fetch().origin, 'not_modified')
+
+    def test_refresh(self):
+        """ tests that refresh always asks the server and only reports real changes """
+        source = self.make_src_cal(self.cache)
+        self.assertTrue(source.refresh())
+        self.assertEqual(source.get_refresh_interval(), 20 * 60)
+        self.assertFalse(source.refresh())
+        self.assertEqual(len(self.transport.requests), 2)
+        self.assertEqual(self.transport.requests[-1][1]['If-None-Match'], '"v1"')
+
+        source.refresh_interval = 10
+        self.assertEqual(source.get_refresh_interval(), 10)
+
+    def test_no_default_cache(self):
+        """ tests that sources only use a cache on disk if they are given one """
+        self.assertIsNone(src_cal.SrcCalURL(self.url).cache)
+        unbuilt = InputJSON.get_unbuilt_cal('input_24HT2.json')
+        self.assertTrue(all(source.cache is None for source in unbuilt.src_cals))
+        unbuilt = InputJSON.get_unbuilt_cal('input_24HT2.json', self.cache)
+        self.assertTrue(all(source.cache is self.cache for source in unbuilt.src_cals))
+
+    def test_error(self):
+        """ tests that a missing source raises FetchError """
+        source = src_cal.SrcCalURL(self.url + '?missing', None, self.session)
+        self.assertRaises(http_session.FetchError, source.fetch)
+
+
+if __name__ == '__main__':
+    unittest.main()
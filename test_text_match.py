@@ -0,0 +1,25 @@
+import text_match
+
+import random
+import unittest
+
+
+class TestAhoCorasick(unittest.TestCase):
+    def test_search(self):
+        """ tests search against the in operator for every needle """
+        rng = random.Random(0)
+        for _ in range(1000):
+            needles = [''.join(rng.choice('ab') for _ in range(rng.randrange(4))) for _ in range(rng.randrange(1, 6))]
+            text = ''.join(rng.choice('abc') for _ in range(rng.randrange(12)))
+            expected = sum(1 << i for i, needle in enumerate(needles) if needle in text)
+            self.assertEqual(text_match.AhoCorasick(needles).search(text), expected)
+
+    def test_overlapping(self):
+        """ tests needles that are inside each other """
+        automaton = text_match.AhoCorasick(['TDDE24', 'DE2', 'E24\\, Undervisningstyp: LA', 'Grupp 6'])
+        self.assertEqual(automaton.search('TDDE24\\, Undervisningstyp: LA\\, Grupp 63'), 0b1111)
+        self.assertEqual(automaton.search('TDDE25\\, Undervisningstyp: LA'), 0b0010)
+
+
+if __name__ == '__main__':
+    unittest.main()
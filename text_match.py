@@ -0,0 +1,126 @@
+"""Module for matching many texts at once, used to resolve all PatternHasText patterns of a build together.
+AhoCorasick finds every one of a set of needles in a text in one pass over the text.
+TextMatcher keeps one automaton per field and remembers the result for every field text it has seen,
+so events sharing a summary or location are only scanned once no matter how many filters look at them.
+"""
+from typing import Callable, Iterable, TYPE_CHECKING
+
+from cal import Event
+
+if TYPE_CHECKING:
+    from pattern import PatternHasText
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton over a list of needles.
+    search returns a bitmask where bit i is set if needles[i] is in the text.
+    """
+    def __init__(self, needles: Iterable[str]):
+        self.needles = list(needles)
+        goto: list[dict[str, int]] = [{}]
+        outputs = [0]
+
+        for i, needle in enumerate(self.needles):
+            state = 0
+            for char in needle:
+                if char not in goto[state]:
+                    goto.append({})
+                    outputs.append(0)
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            outputs[state] |= 1 << i
+
+        # breadth first, so the fail state of a state is always done before the state itself
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                outputs[next_state] |= outputs[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+
+    def search(self, text: str) -> int:
+        """Returns a bitmask of all needles in text."""
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        state = 0
+        found = outputs[0]
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            found |= outputs[state]
+        return found
+
+
+class TextMatcher:
+    """Class for resolving many PatternHasText patterns with one scan per field text.
+    Patterns with fields = None share one automaton that is run on every field.
+    """
+    MAX_CACHED_TEXTS = 100_000
+
+    def __init__(self, patterns: Iterable['PatternHasText']):
+        """ patterns are the PatternHasText patterns that compile should be able to handle """
+        needles: dict[str | None, dict[str, int]] = {}
+        for pat in patterns:
+            for field in ([None] if pat.fields is None else pat.fields):
+                field_needles = needles.setdefault(field, {})
+                field_needles.setdefault(pat.text, len(field_needles))
+
+        self._needles = needles
+        self._automata = {field: AhoCorasick(field_needles) for field, field_needles in needles.items()}
+        self._masks: dict[str | None, dict[str, int]] = {field: {} for field in needles}
+
+    def has_pattern(self, pat: 'PatternHasText') -> bool:
+        """Returns True if pat was one of the patterns the matcher was made from."""
+        return all(
+            pat.text in self._needles.get(field, ())
+            for field in ([None] if pat.fields is None else pat.fields)
+        )
+
+    def get_mask(self, field: str | None, text: str) -> int:
+        """Returns the bitmask of all needles for field (None for patterns on all fields) that are in text."""
+        masks = self._masks[field]
+        try:
+            return masks[text]
+        except KeyError:
+            if len(masks) >= self.MAX_CACHED_TEXTS:
+                masks.clear()
+            mask = masks[text] = self._automata[field].search(text)
+            return mask
+
+    def compile(self, pat: 'PatternHasText') -> Callable[[Event], bool]:
+        """Returns a function giving the same result as pat.resolve using the shared automata.
+        pat must be one of the patterns the matcher was made from, see has_pattern.
+        """
+        get_mask = self.get_mask
+        if pat.fields is None:
+            bit = 1 << self._needles[None][pat.text]
+
+            def resolve(event: Event) -> bool:
+                for field in event.get_fields():
+                    if get_mask(None, event.get_field_text(field)) & bit:
+                        return True
+                return False
+            return resolve
+
+        parts = tuple((field, 1 << self._needles[field][pat.text]) for field in dict.fromkeys(pat.fields))
+        if not parts:
+            return lambda event: False
+
+        def resolve(event: Event) -> bool:
+            for field, bit in parts:
+                text = event.find_field_text(field)
+                if text is not None and get_mask(field, text) & bit:
+                    return True
+            return False
+        return resolve
+